@@ -4,7 +4,7 @@ from n3fit.backends.keras_backend.internal_state import (
     set_eager
 )
 from n3fit.backends.keras_backend.MetaLayer import MetaLayer
-from n3fit.backends.keras_backend.MetaModel import MetaModel
+from n3fit.backends.keras_backend.MetaModel import MetaModel, stacked_prediction_function
 from n3fit.backends.keras_backend.base_layers import (
     Input,
     concatenate,
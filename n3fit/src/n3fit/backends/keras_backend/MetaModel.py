@@ -155,7 +155,10 @@ class MetaModel(Model):
 
         self.target_tensors = None
         self.compute_losses_function = None
+        self.train_chunk_function = None
         self._scaler = scaler
+        self._monitored_outputs = {}
+        self._pre_step_weights = []
 
     def _parse_input(self, extra_input=None):
         """Returns the input data the model was compiled with.
@@ -169,7 +172,7 @@ class MetaModel(Model):
             extra_input = [self._scaler(i) for i in extra_input]
         return _fill_placeholders(self.x_in, extra_input)
 
-    def perform_fit(self, x=None, y=None, epochs=1, **kwargs):
+    def perform_fit(self, x=None, y=None, epochs=1, epochs_per_call=None, **kwargs):
         """
         Performs forward (and backwards) propagation for the model for a given number of epochs.
 
@@ -179,6 +182,10 @@ class MetaModel(Model):
         If the model was compiled with input and output data, they will not be passed through.
         In this case by default the number of `epochs` will be set to 1
 
+        By default the fit is driven by the backend ``fit`` method, which goes back to python
+        after every epoch. If ``epochs_per_call`` is given, the fit is run instead by a compiled
+        loop which runs ``epochs_per_call`` epochs per call (see ``_perform_compiled_fit``).
+
         ex:
             {'loss': [100], 'dataset_a_loss1' : [67], 'dataset_2_loss': [33]}
 
@@ -190,10 +197,199 @@ class MetaModel(Model):
         x = self._parse_input(x)
         if y is None:
             y = self.target_tensors
+        if epochs_per_call is not None:
+            return self._perform_compiled_fit(
+                x, y, epochs, epochs_per_call, callbacks=kwargs.get("callbacks")
+            )
         history = super().fit(x=x, y=y, epochs=epochs, **kwargs)
         loss_dict = history.history
         return loss_dict
 
+    def _minimize_step(self, x, y):
+        """Performs one step (i.e., one epoch) of full-batch training,
+        stores the value of the monitored outputs (if any) and returns the total loss
+        and the list of the outputs of the model"""
+        with tf.GradientTape() as tape:
+            y_pred = self(x, training=True)
+            if len(self.output_names) == 1:
+                y_pred = [y_pred]
+            loss = self.compiled_loss(y, y_pred, regularization_losses=self.losses)
+        for variable, snapshot in self._pre_step_weights:
+            snapshot.assign(variable)
+        self.optimizer.minimize(loss, self.trainable_variables, tape=tape)
+        for idx, _, variable in self._monitored_outputs.values():
+            variable.assign(y_pred[idx])
+        return loss, y_pred
+
+    def _generate_train_chunk_function(self):
+        """Generates a compiled function which runs a given number of epochs (>= 1)
+        in a ``tf.while_loop`` and returns the losses of every epoch stacked"""
+
+        def _epoch_losses(loss, y_pred):
+            # Total loss and loss per output summed over replicas, as reported by ``fit``
+            # (this assumes the outputs are the losses, i.e., the model uses the default loss)
+            return [loss] + [tf.reduce_sum(i) for i in y_pred]
+
+        @tf.function
+        def train_chunk(x, y, epochs):
+            # The first epoch is run outside of the loop so that any variable that
+            # needs to be created (such as the slots of the optimizer) is created on the first call
+            first_losses = _epoch_losses(*self._minimize_step(x, y))
+            history = [tf.TensorArray(i.dtype, size=epochs).write(0, i) for i in first_losses]
+
+            def one_epoch(epoch, history):
+                losses = _epoch_losses(*self._minimize_step(x, y))
+                return epoch + 1, [h.write(epoch, i) for h, i in zip(history, losses)]
+
+            _, history = tf.while_loop(
+                lambda epoch, _: epoch < epochs, one_epoch, (tf.constant(1), history)
+            )
+            return [h.stack() for h in history]
+
+        return train_chunk
+
+    def _perform_compiled_fit(self, x, y, epochs, epochs_per_call, callbacks=None):
+        """
+        Alternative to the backend ``fit`` where the epochs are run, ``epochs_per_call`` at a time,
+        by a compiled loop which accumulates the losses of every epoch and returns them in bulk.
+        This removes the python overhead of every epoch which can be a large fraction
+        of the time per epoch for small fits.
+
+        The callbacks are called only at the end of every call, i.e., ``on_epoch_end``
+        is called with the index and logs of the last epoch of the call.
+        Other hooks but ``on_train_begin`` and ``on_train_end`` are not called.
+        With ``epochs_per_call=1`` the results are the same as with the backend ``fit``.
+
+        Returns
+        -------
+            loss_dict: dict
+                a dictionary with all partial losses of the model for every epoch
+        """
+        if int(tf_version[0]) == 2 and int(tf_version[1]) < 4:
+            raise NotImplementedError("The compiled training loop needs TF >= 2.4")
+        if self.train_chunk_function is None:
+            self.train_chunk_function = self._generate_train_chunk_function()
+        if callbacks is None:
+            callbacks = []
+        x = {k: tf.convert_to_tensor(i) for k, i in x.items()}
+        y = [tf.convert_to_tensor(i) for i in y]
+
+        loss_names = ["loss"] + [f"{i}_loss" for i in self.output_names]
+        loss_dict = {name: [] for name in loss_names}
+
+        self.stop_training = False
+        for callback in callbacks:
+            callback.set_model(self)
+            callback.on_train_begin()
+
+        epoch = 0
+        while epoch < epochs and not self.stop_training:
+            n_epochs = min(epochs_per_call, epochs - epoch)
+            chunk = _to_numpy_or_python_type(self.train_chunk_function(x, y, tf.constant(n_epochs)))
+            for name, values in zip(loss_names, chunk):
+                loss_dict[name] += list(values)
+            epoch += n_epochs
+            logs = {name: values[-1] for name, values in loss_dict.items()}
+            for callback in callbacks:
+                callback.on_epoch_end(epoch - 1, logs)
+
+        for callback in callbacks:
+            callback.on_train_end()
+        return loss_dict
+
+    def train_step(self, data):
+        """
+        Training step called by ``fit`` once per epoch.
+        If the model has no monitored outputs this is just the backend default.
+
+        Otherwise the forward pass computes all outputs at once, the loss being minimized
+        only receives contributions from the non-monitored outputs (these are compiled with a
+        loss weight of 0) and the per-replica value of the monitored outputs is stored
+        so that it can be retrieved with ``get_monitored_losses``.
+        Note that, as for the rest of the losses reported by ``fit``, the monitored values
+        correspond to the weights before the update, which can be retrieved
+        with ``get_pre_step_weights``.
+        """
+        if not self._monitored_outputs:
+            return super().train_step(data)
+        x, y = data[0], data[1]
+        _, y_pred = self._minimize_step(x, y)
+        self.compiled_metrics.update_state(y, y_pred)
+        return {m.name: m.result() for m in self.metrics}
+
+    def set_monitored_outputs(self, monitored_outputs):
+        """
+        Flags a set of outputs of the model as monitored.
+        Monitored outputs are computed in the same forward pass as the rest of the model
+        during ``perform_fit`` but they don't enter the loss to be minimized.
+        It is responsibility of the caller to disconnect them from the gradient
+        (by using ``operations.stop_gradient``) if their backpropagation is to be avoided.
+
+        This method must be called before ``compile``.
+
+        Parameters
+        ----------
+            monitored_outputs: dict
+                dictionary of ``{output_name: reported_name}``, the value of the output
+                ``output_name`` will be reported as ``{reported_name}_loss``
+                by ``get_monitored_losses``
+        """
+        if int(tf_version[0]) == 2 and int(tf_version[1]) < 4:
+            raise NotImplementedError("Monitored outputs need TF >= 2.4")
+        self._monitored_outputs = {}
+        for output_name, reported_name in monitored_outputs.items():
+            idx = self.output_names.index(output_name)
+            variable = tf.Variable(
+                tf.zeros(self.outputs[idx].shape),
+                trainable=False,
+                name=f"{output_name}_monitor",
+            )
+            self._monitored_outputs[output_name] = (idx, reported_name, variable)
+        # Keep a copy of the weights from before the last update since those are
+        # the weights that produced the values of the monitored outputs
+        self._pre_step_weights = []
+        for variable in self.trainable_variables:
+            name = variable.name.split(":")[0]
+            snapshot = tf.Variable(variable, trainable=False, name=f"{name}_pre_step")
+            self._pre_step_weights.append((variable, snapshot))
+
+    def get_monitored_losses(self):
+        """
+        Returns the value of the monitored outputs as computed during the last training step
+        in the same format as ``compute_losses``, i.e., a dictionary of partial losses per replica
+        where the entry ``loss`` contains the sum of all of them.
+
+        Returns
+        -------
+            dict
+                a dictionary with all the partial monitored losses
+        """
+        ret = {f"{name}_loss": var.numpy() for _, name, var in self._monitored_outputs.values()}
+        ret["loss"] = np.sum(list(ret.values()), axis=0)
+        return ret
+
+    def get_pre_step_weights(self, model=None):
+        """
+        Returns the weights of ``model`` (by default this model) as they were before
+        the last training step, i.e., the weights which produced the values of the
+        monitored outputs returned by ``get_monitored_losses``.
+        The output is in the same format as ``get_weights`` and can be given to ``set_weights``.
+
+        Parameters
+        ----------
+            model: MetaModel
+                a model sharing its weights with this one, e.g., one of the PDF models
+
+        Returns
+        -------
+            list(np.ndarray)
+                the weights of ``model`` before the last update
+        """
+        if model is None:
+            model = self
+        snapshots = {variable.ref(): snapshot for variable, snapshot in self._pre_step_weights}
+        return [snapshots.get(w.ref(), w).numpy() for w in model.weights]
+
     def predict(self, x=None, **kwargs):
         """ Call super().predict with the right input arguments """
         x = self._parse_input(x)
@@ -303,7 +499,12 @@ class MetaModel(Model):
                 target_output = [target_output]
             self.target_tensors = target_output
 
-        super().compile(optimizer=opt, loss=loss)
+        # Monitored outputs must not contribute to the loss
+        loss_weights = None
+        if self._monitored_outputs:
+            loss_weights = [float(i not in self._monitored_outputs) for i in self.output_names]
+
+        super().compile(optimizer=opt, loss=loss, loss_weights=loss_weights)
 
     def set_masks_to(self, names, val=0.0):
         """Set all mask value to the selected value
@@ -356,3 +557,49 @@ class MetaModel(Model):
         """ Get all layers matching the given regular expression """
         check = lambda x: re.match(regex, x.name)
         return list(filter(check, self.layers))
+
+
+def stacked_prediction_function(models):
+    """Generate a function evaluating a list of ``MetaModel`` (for instance, one per replica)
+    in one single compiled call. All models must accept the same x-input, the results
+    are concatenated in the first axis, i.e., the output for ``n`` models with
+    output shape ``(1, xgrid, flavours)`` is ``(n, xgrid, flavours)``.
+
+    The models are read within the compiled function at every call, therefore the
+    output always corresponds to the current value of their weights.
+    The size of the x-input is left unspecified in the signature of the compiled function
+    so that it is traced only once for any number of points
+    (the traced function is available as the ``stacked_call`` attribute of the output).
+
+    Parameters
+    ----------
+        models: list(MetaModel)
+            models to evaluate
+
+    Returns
+    -------
+        predict: function
+            function of the x-input (as given to ``MetaModel.predict``) returning a numpy array
+    """
+
+    def stacked_call(all_inputs):
+        return tf.concat([model(x) for model, x in zip(models, all_inputs)], axis=0)
+
+    def predict(x):
+        # The input is parsed (and scaled) outside of the compiled function
+        # as the scaler might not be a backend operation
+        all_inputs = []
+        for model in models:
+            parsed_input = model._parse_input(x)  # pylint: disable=protected-access
+            all_inputs.append({k: op.numpy_to_tensor(i) for k, i in parsed_input.items()})
+        if predict.stacked_call is None:
+            # Only the shape of the x-axis changes from call to call
+            signature = []
+            for inp in all_inputs:
+                shapes = {k: (i.shape[0], None, *i.shape[2:]) for k, i in inp.items()}
+                signature.append({k: tf.TensorSpec(shapes[k], i.dtype) for k, i in inp.items()})
+            predict.stacked_call = tf.function(stacked_call, input_signature=[signature])
+        return predict.stacked_call(all_inputs).numpy()
+
+    predict.stacked_call = None
+    return predict
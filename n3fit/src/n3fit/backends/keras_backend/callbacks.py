@@ -28,21 +28,33 @@ class TimerCallback(Callback):
         self.x_count = count_range
         self.starting_time = None
         self.last_time = 0
+        self.last_epoch = 0
+
+    def on_train_begin(self, logs=None):
+        """ Reset the timer so that the callback can be reused for several fits """
+        self.all_times = []
+        self.every_x = []
+        self.starting_time = None
+        self.last_time = 0
+        self.last_epoch = 0
 
     def on_epoch_end(self, epoch, logs=None):
-        """ At the end of every epoch it checks the time """
+        """At the end of every epoch it checks the time
+        If the callback is not called at every epoch, the time is averaged
+        over the epochs run since the last call"""
         new_time = time()
-        if epoch == 0:
-            # The first epoch is only useful for starting
+        if self.starting_time is None:
+            # The first call is only useful for starting
             self.starting_time = new_time
         else:
-            cur_dif = new_time - self.last_time
+            cur_dif = (new_time - self.last_time) / (epoch - self.last_epoch)
             self.all_times.append(cur_dif)
             if (epoch + 1) % self.x_count == 0:
                 ave = np.mean(self.all_times[-100:])
                 log.info(f" > Latest 100 average: {ave:.5} s")
                 self.every_x.append(ave)
         self.last_time = new_time
+        self.last_epoch = epoch
 
     def on_train_end(self, logs=None):
         """ Print the results """
@@ -334,6 +334,47 @@ def split(*args, **kwargs):
     return tf.split(*args, **kwargs)
 
 
+def reshape(tensor, shape, **kwargs):
+    """
+    Reshapes the tensor to the given shape
+    see full `docs <https://www.tensorflow.org/api_docs/python/tf/reshape>`_
+    """
+    return tf.reshape(tensor, shape, **kwargs)
+
+
+def gather(*args, **kwargs):
+    """
+    Gathers slices from the tensor along the given axis (default: 0)
+    see full `docs <https://www.tensorflow.org/api_docs/python/tf/gather>`_
+    """
+    return tf.gather(*args, **kwargs)
+
+
+def segment_sum(data, segment_ids, num_segments, **kwargs):
+    """
+    Sums the elements of data (along the first axis) which share the same segment id
+    The output has always ``num_segments`` elements (empty segments sum to 0).
+    see full `docs <https://www.tensorflow.org/api_docs/python/tf/math/unsorted_segment_sum>`_
+    """
+    return tf.math.unsorted_segment_sum(data, segment_ids, num_segments, **kwargs)
+
+
+def triangular_solve(matrix, rhs, lower=True, **kwargs):
+    """
+    Solves the system of linear equations matrix @ x = rhs for a triangular matrix
+    see full `docs <https://www.tensorflow.org/api_docs/python/tf/linalg/triangular_solve>`_
+    """
+    return tf.linalg.triangular_solve(matrix, rhs, lower=lower, **kwargs)
+
+
+def stop_gradient(tensor, **kwargs):
+    """
+    Returns the input tensor, disconnected from the gradient computation
+    see full `docs <https://www.tensorflow.org/api_docs/python/tf/stop_gradient>`_
+    """
+    return tf.stop_gradient(tensor, **kwargs)
+
+
 def scatter_to_one(values, indices=[[1]], output_dim=14):
     """
     Like scatter_nd initialized to one instead of zero
@@ -9,6 +9,7 @@ from reportengine.checks import make_argcheck, CheckError
 from validphys.pdfbases import check_basis
 from n3fit.hyper_optimization import penalties as penalties_module
 from n3fit.hyper_optimization import rewards as rewards_module
+from n3fit.model_trainer import PUSH_POSITIVITY_EACH
 
 log = logging.getLogger(__name__)
 
@@ -68,6 +69,25 @@ def check_stopping(parameters):
         raise CheckError(f"Needs to run at least 1 epoch, got: {epochs}")
 
 
+def check_epochs_per_call(parameters, tensorboard):
+    """Checks that the number of epochs per call of the compiled training loop (if any)
+    is a positive divisor of the update frequency of the Lagrange multipliers
+    so that the multipliers are updated in the same epochs as in the per-epoch training.
+    The compiled loop doesn't support tensorboard.
+    """
+    epc = parameters.get("epochs_per_call")
+    if epc is None:
+        return
+    if not isinstance(epc, int) or epc < 1:
+        raise CheckError(f"epochs_per_call must be a positive integer, got: {epc}")
+    if PUSH_POSITIVITY_EACH % epc != 0:
+        raise CheckError(
+            f"epochs_per_call must be a divisor of {PUSH_POSITIVITY_EACH}, got: {epc}"
+        )
+    if tensorboard is not None:
+        raise CheckError("epochs_per_call cannot be used together with tensorboard")
+
+
 def check_basis_with_layers(basis, parameters):
     """Check that the last layer matches the number of flavours defined in the runcard"""
     number_of_flavours = len(basis)
@@ -165,6 +185,7 @@ def wrapper_check_NN(basis, tensorboard, save, load, parameters):
     check_consistent_layers(parameters)
     check_basis_with_layers(basis, parameters)
     check_stopping(parameters)
+    check_epochs_per_call(parameters, tensorboard)
     check_dropout(parameters)
     check_lagrange_multipliers(parameters, "integrability")
     check_lagrange_multipliers(parameters, "positivity")
@@ -309,6 +330,25 @@ def wrapper_hyperopt(hyperopt, hyperscan_config, kfold, data):
     check_correct_partitions(kfold, data)
 
 
+@make_argcheck
+def check_hyperopt_workers(hyperopt, hyperopt_workers):
+    """Checks that the number of processes used for the hyperoptimization is sensible"""
+    if hyperopt_workers is None:
+        return
+    if not isinstance(hyperopt_workers, int) or hyperopt_workers < 1:
+        raise CheckError(
+            f"hyperopt_workers must be a positive integer, received: {hyperopt_workers}"
+        )
+    if not hyperopt:
+        log.warning("hyperopt_workers is set but no hyperparameter scan is being run")
+    elif hyperopt_workers > hyperopt:
+        log.warning(
+            "More hyperopt workers (%d) than trials (%d), some of them will be idle",
+            hyperopt_workers,
+            hyperopt,
+        )
+
+
 def check_sumrules(sum_rules):
     """Checks that the chosen option for the sum rules are sensible"""
     if isinstance(sum_rules, bool):
@@ -1,14 +1,23 @@
 """
     Custom hyperopt trial object for persistent file storage
-    in the form of a json file within the nnfit folder
+    in the form of a json-lines file within the nnfit folder
 """
+import os
 import json
+import fcntl
 import logging
-from validphys.hyperoptplot import HyperoptTrial
-from hyperopt import Trials, space_eval
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from validphys.hyperoptplot import HyperoptTrial, TRIES_FILE, TRIES_INDEX_FILE
+from hyperopt import Trials, space_eval, JOB_STATE_DONE, JOB_STATE_ERROR
 
 log = logging.getLogger(__name__)
 
+# Auxiliary files used when the tries files are shared by several processes
+TRIES_LOCK_FILE = "tries.lock"
+TRIES_TIDS_FILE = "tries.tids"
+
 # Note: the plan would be to do a PR in hyperopt's main repository
 # because these are things generic and useful enough that should be
 # in hyperopt by default. But for now it will stay here.
@@ -46,50 +55,162 @@ def space_eval_trial(space, trial):
     return ret
 
 
+def remove_tries(replica_path):
+    """Remove all files of a previous scan stored in ``replica_path``"""
+    for name in (TRIES_FILE, TRIES_INDEX_FILE, TRIES_LOCK_FILE, TRIES_TIDS_FILE):
+        path = Path(replica_path) / name
+        if path.exists():
+            path.unlink()
+
+
 class FileTrials(Trials):
     """
     Stores trial results on the fly inside the nnfit replica folder
 
+    Every trial is appended, once finished, as one line of the ``tries.jsonl`` file.
+    After the trial has been written to disk, its ``tid``, offset and length are appended
+    to ``tries.index`` so that an interrupted write never leaves a corrupt file behind:
+    readers (see :py:func:`validphys.hyperoptplot.read_tries`) ignore anything that is
+    not in the index.
+
+    If ``shared`` is True the files can be used at the same time by several processes
+    (see :py:func:`n3fit.hyper_optimization.hyper_scan.parallel_hyper_scan_wrapper`):
+    the writes and the generation of new trial ids are protected by a file lock and,
+    at every refresh, the trials finished by the other processes are added to this object
+    so that the suggestions of the algorithm take into account the full history of the scan.
+
     Parameters
     ----------
         replica_path: path
             Replica folder as generated by n3fit
         parameters: dict
             Dictionary of parameters on which we are doing hyperoptimization
+        shared: bool
+            Whether the files are shared with other processes, in which case
+            the files of previous scans are not removed
+        max_trials: int
+            When the files are shared, maximum number of trials among all processes
     """
 
-    def __init__(self, replica_path, parameters=None, **kwargs):
+    def __init__(self, replica_path, parameters=None, shared=False, max_trials=None, **kwargs):
         self._store_trial = False
-        self._json_file = "{0}/tries.json".format(replica_path)
+        self._replica_path = Path(replica_path)
+        self._tries_file = self._replica_path / TRIES_FILE
+        self._index_file = self._replica_path / TRIES_INDEX_FILE
         self._parameters = parameters
+        self._shared = shared
+        self._max_trials = max_trials
+        self._stored_tids = set()
+        # Size of the index that has already been read
+        self._index_position = 0
+        if not shared:
+            # A new scan starts a new set of files
+            remove_tries(replica_path)
         super().__init__(**kwargs)
 
+    @contextmanager
+    def _lock(self):
+        """Exclusive access to the files of the scan, only needed when they are shared"""
+        if not self._shared:
+            yield
+            return
+        with open(self._replica_path / TRIES_LOCK_FILE, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _append_trials(self, trials):
+        """Append the given trials to the tries file and, once they are safely on disk,
+        register them in the index"""
+        index = []
+        with self._lock():
+            with open(self._tries_file, "ab") as f:
+                offset = f.tell()
+                for trial in trials:
+                    misc = dict(trial["misc"], space_vals=space_eval_trial(self._parameters, trial))
+                    line = (json.dumps(dict(trial, misc=misc), default=str) + "\n").encode()
+                    f.write(line)
+                    index.append(f"{trial['tid']} {offset} {len(line)}\n")
+                    offset += len(line)
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._index_file, "a") as f:
+                f.write("".join(index))
+                f.flush()
+                os.fsync(f.fileno())
+        self._stored_tids.update(trial["tid"] for trial in trials)
+
+    def _load_shared_trials(self):
+        """Add the trials stored by other processes since the last call"""
+        if not self._index_file.exists():
+            return
+        with open(self._index_file, "rb") as f:
+            f.seek(self._index_position)
+            new_entries = f.read()
+        # Only complete lines are taken, the rest will be read in the next call
+        new_entries = new_entries[: new_entries.rfind(b"\n") + 1]
+        self._index_position += len(new_entries)
+
+        new_entries = [tuple(map(int, i.split())) for i in new_entries.splitlines()]
+        new_entries = [i for i in new_entries if i[0] not in self._stored_tids]
+        if not new_entries:
+            return
+        with open(self._tries_file, "rb") as f:
+            for tid, offset, length in new_entries:
+                f.seek(offset)
+                trial = json.loads(f.read(length))
+                # Losses which are not python floats are stored as strings
+                if trial["result"].get("loss") is not None:
+                    trial["result"]["loss"] = float(trial["result"]["loss"])
+                self._dynamic_trials.append(trial)
+                self._stored_tids.add(tid)
+
     def refresh(self):
         """
         This is the "flushing" method which is called at the end of every trial to
-        save things in the database. We are are overloading it in order to also write
-        to a json file with every single trial.
+        save things in the database. We are are overloading it in order to also append
+        to a json-lines file every trial which has finished since the last call.
         """
+        if self._shared:
+            self._load_shared_trials()
         super().refresh()
 
-        # write json to disk
+        # write the new trials to disk
         if self._store_trial:
-            log.info("Storing scan in %s", self._json_file)
-            local_trials = []
-            for idx, t in enumerate(self._dynamic_trials):
-                local_trials.append(t)
-                local_trials[idx]["misc"]["space_vals"] = space_eval_trial(
-                    self._parameters, t
-                )
-
-            all_to_str = json.dumps(local_trials, default=str)
-            with open(self._json_file, "w") as f:
-                f.write(all_to_str)
+            new_trials = [
+                t
+                for t in self._dynamic_trials
+                if t["state"] in (JOB_STATE_DONE, JOB_STATE_ERROR)
+                and t["tid"] not in self._stored_tids
+            ]
+            if new_trials:
+                log.info("Storing scan in %s", self._tries_file)
+                self._append_trials(new_trials)
+
+    def _new_shared_trial_ids(self, n):
+        """Reserve ``n`` trial ids among all processes sharing the files
+        without going over ``max_trials``"""
+        tids_file = self._replica_path / TRIES_TIDS_FILE
+        with self._lock():
+            first_tid = int(tids_file.read_text()) if tids_file.exists() else 0
+            if self._max_trials is not None:
+                n = max(min(n, self._max_trials - first_tid), 0)
+            fd, tmp_path = tempfile.mkstemp(dir=self._replica_path)
+            with os.fdopen(fd, "w") as f:
+                f.write(str(first_tid + n))
+            os.replace(tmp_path, tids_file)
+        new_tids = list(range(first_tid, first_tid + n))
+        self._ids.update(new_tids)
+        return new_tids
 
     # The two methods below are just a stupid overloading to avoid writing to the
     # database twice
     def new_trial_ids(self, n):
         self._store_trial = False
+        if self._shared:
+            return self._new_shared_trial_ids(n)
         return super().new_trial_ids(n)
 
     def new_trial_docs(self, tids, specs, results, miscs):
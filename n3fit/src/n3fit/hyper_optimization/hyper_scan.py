@@ -12,9 +12,12 @@ another hyperoptimization library, assuming that it also takes just
 you can do so by simply modifying the wrappers to point somewhere else
 (and, of course the function in the fitting action that calls the miniimization).
 """
+import os
 import copy
+import multiprocessing
 import hyperopt
 import numpy as np
+import psutil
 from n3fit.backends import MetaModel, MetaLayer
 import n3fit.hyper_optimization.filetrials as filetrials
 import logging
@@ -87,13 +90,13 @@ def hyper_scan_wrapper(replica_path_set, model_trainer, hyperscanner, max_evals=
     hyperparameter scan (``hyperscanner``)
     and performs ``max_evals`` evaluations of the hyperparametrizable function of ``model_trainer``.
 
-    A ``tries.json`` file will be saved in the ``replica_path_set`` folder with the information
+    A ``tries.jsonl`` file will be saved in the ``replica_path_set`` folder with the information
     of all trials.
 
     Parameters
     -----------
         replica_path_set: path
-            folder where to create the json ``tries.json`` file
+            folder where to create the ``tries.jsonl`` file
         model_trainer: :py:class:`n3fit.ModelTrainer.ModelTrainer`
             a ``ModelTrainer`` object with the ``hyperparametrizable`` method
         hyperscanner: :py:class:`n3fit.hyper_optimization.hyper_scan.HyperScanner`
@@ -123,6 +126,131 @@ def hyper_scan_wrapper(replica_path_set, model_trainer, hyperscanner, max_evals=
     return hyperscanner.space_eval(best)
 
 
+def _shared_suggest(new_ids, domain, trials, seed):
+    """TPE suggestion for a scan shared among processes.
+    Once all trials of the scan have been assigned no new ids are generated
+    and no trial is suggested, which ends the scan"""
+    if not new_ids:
+        return []
+    return hyperopt.tpe.suggest(new_ids, domain, trials, seed)
+
+
+def _hyperopt_worker(
+    worker_id, replica_path_set, trainer_args, trainer_kwargs, hyperscanner, max_evals, debug
+):
+    """Run the trials of a parallel hyperparameter scan in one process,
+    see :py:func:`parallel_hyper_scan_wrapper`"""
+    # The backend state needs to be set again in every new process
+    from n3fit.backends import set_initial_state
+    from n3fit.model_trainer import ModelTrainer
+
+    set_initial_state(debug=debug, max_cores=trainer_kwargs.get("max_cores"))
+    # If the seed of hyperopt is fixed, make sure that each worker gets a different one
+    fmin_seed = os.environ.get("HYPEROPT_FMIN_SEED")
+    if fmin_seed:
+        os.environ["HYPEROPT_FMIN_SEED"] = str(int(fmin_seed) + worker_id)
+
+    model_trainer = ModelTrainer(*trainer_args, **trainer_kwargs)
+    model_trainer.set_hyperopt(True, keys=hyperscanner.hyper_keys, status_ok=hyperopt.STATUS_OK)
+    trials = filetrials.FileTrials(
+        replica_path_set, parameters=hyperscanner.as_dict(), shared=True, max_trials=max_evals
+    )
+    hyperopt.fmin(
+        fn=model_trainer.hyperparametrizable,
+        space=hyperscanner.as_dict(),
+        algo=_shared_suggest,
+        max_evals=max_evals,
+        show_progressbar=False,
+        trials=trials,
+    )
+
+
+def parallel_hyper_scan_wrapper(
+    replica_path_set,
+    trainer_args,
+    trainer_kwargs,
+    hyperscanner,
+    max_evals=1,
+    workers=2,
+    debug=False,
+):
+    """
+    Equivalent to :py:func:`hyper_scan_wrapper` but running the trials in ``workers``
+    processes in the same machine.
+
+    Each process generates its own ``ModelTrainer`` (from ``trainer_args`` and ``trainer_kwargs``)
+    and is given an equal share of the cores of the machine (or of ``max_cores``, if it is part
+    of ``trainer_kwargs``).
+    All processes share the same ``tries.jsonl`` file, from which they read the trials
+    finished by the others before asking hyperopt for a new trial, and
+    generate trials until ``max_evals`` trials have been run among all of them.
+    If any of the processes fails, or fewer than ``max_evals`` trials are stored at the end
+    of the scan, a ``RuntimeError`` is raised.
+
+    Parameters
+    -----------
+        replica_path_set: path
+            folder where to create the ``tries.jsonl`` file
+        trainer_args: tuple
+            positional arguments for :py:class:`n3fit.ModelTrainer.ModelTrainer`
+        trainer_kwargs: dict
+            keyword arguments for :py:class:`n3fit.ModelTrainer.ModelTrainer`
+        hyperscanner: :py:class:`n3fit.hyper_optimization.hyper_scan.HyperScanner`
+            a ``HyperScanner`` object defining the scan
+        max_evals: int
+            Number of trials to run
+        workers: int
+            Number of processes to run the trials
+        debug: bool
+            whether the backend state is set in debug mode
+
+    Returns
+    -------
+        dict
+        parameters of the best trial as found by ``hyperopt``
+    """
+    max_cores = trainer_kwargs.get("max_cores")
+    if max_cores is None:
+        max_cores = psutil.cpu_count(logical=False)
+    trainer_kwargs = dict(trainer_kwargs, max_cores=max(max_cores // workers, 1))
+    log.info(
+        "Running the scan in %d processes with %d cores each", workers, trainer_kwargs["max_cores"]
+    )
+
+    filetrials.remove_tries(replica_path_set)
+    # The processes are spawned so that each one gets a clean backend
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=_hyperopt_worker,
+            args=(
+                i, replica_path_set, trainer_args, trainer_kwargs, hyperscanner, max_evals, debug
+            ),
+        )
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    failed = {i: process.exitcode for i, process in enumerate(processes) if process.exitcode != 0}
+
+    # Read all trials from the shared files
+    trials = filetrials.FileTrials(replica_path_set, parameters=hyperscanner.as_dict(), shared=True)
+    n_trials = len(trials.trials)
+    if failed:
+        failed_str = ", ".join(f"worker {i} (exit code {code})" for i, code in failed.items())
+        raise RuntimeError(
+            f"The following hyperopt workers failed: {failed_str}. "
+            f"{n_trials} out of {max_evals} trials were stored in {replica_path_set}"
+        )
+    if n_trials < max_evals:
+        raise RuntimeError(
+            f"Only {n_trials} out of {max_evals} trials were stored in {replica_path_set}"
+        )
+    return hyperscanner.space_eval(trials.argmin)
+
+
 class ActivationStr:
     """
     Upon call this class returns an array where the activation function
@@ -170,7 +298,7 @@ class HyperScanner:
 
     def __init__(self, parameters, sampling_dict, steps=5):
         self._original_parameters = parameters
-        self.parameter_keys = parameters.keys()
+        self.parameter_keys = list(parameters.keys())
         self.parameters = copy.deepcopy(parameters)
         self.steps = steps
 
@@ -7,7 +7,7 @@
 """
 
 import numpy as np
-from .observable import Observable
+from .observable import Observable, SparseFKTable
 from n3fit.backends import operations as op
 
 
@@ -22,6 +22,15 @@ class DIS(Observable):
         and the last dimension the number of replicas being fitted (1, xgrid, flavours, replicas)
     """
 
+    def _basis_mask(self, basis):
+        """ Boolean array of active flavours """
+        if basis is None:
+            return np.ones(self.nfl, dtype=bool)
+        basis_mask = np.zeros(self.nfl, dtype=bool)
+        for i in basis:
+            basis_mask[i] = True
+        return basis_mask
+
     def gen_mask(self, basis):
         """
             Receives a list of active flavours and generates a boolean mask tensor
@@ -31,13 +40,24 @@ class DIS(Observable):
                 basis: list(int)
                     list of active flavours
         """
-        if basis is None:
-            self.basis = np.ones(self.nfl, dtype=bool)
-        else:
-            basis_mask = np.zeros(self.nfl, dtype=bool)
-            for i in basis:
-                basis_mask[i] = True
-        return op.numpy_to_tensor(basis_mask, dtype=bool)
+        return op.numpy_to_tensor(self._basis_mask(basis), dtype=bool)
+
+    def gen_sparse_fktable(self, fktable, basis):
+        """
+            Generates the sparse representation of a fktable
+
+            Parameters
+            ----------
+                fktable: np.array
+                    rank 3 fktable (ndata, active flavours, xgrid)
+                basis: list(int)
+                    list of active flavours
+        """
+        # The fktable only contains the active flavours, in the order they are selected by the mask
+        flavours = np.flatnonzero(self._basis_mask(basis))
+        data_idx, basis_idx, x_idx = np.nonzero(fktable)
+        pdf_idx = x_idx * self.nfl + flavours[basis_idx]
+        return SparseFKTable(fktable[data_idx, basis_idx, x_idx], data_idx, [pdf_idx], len(fktable))
 
     def call(self, pdf):
         """
@@ -64,14 +84,17 @@ class DIS(Observable):
         results = []
         # Separate the two possible paths this layer can take
         if self.many_masks:
-            for mask, fktable in zip(self.all_masks, self.fktables):
-                pdf_masked = op.boolean_mask(pdf, mask, axis=2)
-                res = op.tensor_product(pdf_masked, fktable, axes=[(1, 2), (2, 1)])
-                results.append(res)
+            all_masks = self.all_masks
         else:
-            pdf_masked = op.boolean_mask(pdf, self.all_masks[0], axis=2)
-            for fktable in self.fktables:
+            all_masks = self.all_masks * len(self.fktables)
+            pdf_masked = None
+        for mask, fktable in zip(all_masks, self.fktables):
+            if isinstance(fktable, SparseFKTable):
+                res = op.batchit(op.transpose(self.sparse_convolution(pdf, fktable)))
+            else:
+                if self.many_masks or pdf_masked is None:
+                    pdf_masked = op.boolean_mask(pdf, mask, axis=2)
                 res = op.tensor_product(pdf_masked, fktable, axes=[(1, 2), (2, 1)])
-                results.append(res)
+            results.append(res)
 
         return self.operation(results)
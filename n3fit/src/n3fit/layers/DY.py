@@ -1,5 +1,5 @@
 import numpy as np
-from .observable import Observable
+from .observable import Observable, SparseFKTable
 from n3fit.backends import operations as op
 
 
@@ -8,14 +8,44 @@ class DY(Observable):
     Computes the convolution of two PDFs (the same one twice) and one fktable
     """
 
-    def gen_mask(self, basis):
+    def _basis_mask(self, basis):
+        """ Boolean matrix of active combinations of flavours """
         if basis is None:
-            basis_mask = np.ones((self.nfl, self.nfl), dtype=bool)
-        else:
-            basis_mask = np.zeros((self.nfl, self.nfl), dtype=bool)
-            for i, j in basis.reshape(-1, 2):
-                basis_mask[i, j] = True
-        return op.numpy_to_tensor(basis_mask, dtype=bool)
+            return np.ones((self.nfl, self.nfl), dtype=bool)
+        basis_mask = np.zeros((self.nfl, self.nfl), dtype=bool)
+        for i, j in basis.reshape(-1, 2):
+            basis_mask[i, j] = True
+        return basis_mask
+
+    def gen_mask(self, basis):
+        return op.numpy_to_tensor(self._basis_mask(basis), dtype=bool)
+
+    def gen_sparse_fktable(self, fktable, basis):
+        """
+        Generates the sparse representation of a fktable
+
+        Parameters
+        ----------
+            fktable: np.array
+                rank 4 fktable (ndata, active combinations, xgrid, xgrid)
+            basis: np.array
+                array of active combinations of flavours
+        """
+        # The combinations are ordered as selected by the mask in ``pdf_masked_convolution``
+        # where the first (second) flavour of the combination goes with the first (second) x
+        fl1, fl2 = np.nonzero(self._basis_mask(basis))
+        data_idx, comb_idx, x1_idx, x2_idx = np.nonzero(fktable)
+        pdf_idx1 = x1_idx * self.nfl + fl1[comb_idx]
+        pdf_idx2 = x2_idx * self.nfl + fl2[comb_idx]
+        values = fktable[data_idx, comb_idx, x1_idx, x2_idx]
+        return SparseFKTable(values, data_idx, [pdf_idx1, pdf_idx2], len(fktable))
+
+    def _convolution(self, pdf, mask, fk):
+        """ Convolution of one single fktable, returns a tensor (ndata, replicas) """
+        if isinstance(fk, SparseFKTable):
+            return self.sparse_convolution(pdf, fk)
+        pdf_x_pdf = op.pdf_masked_convolution(pdf, mask)
+        return op.tensor_product(fk, pdf_x_pdf, axes=3)
 
     def call(self, pdf_raw):
         """
@@ -27,6 +57,8 @@ class DY(Observable):
         The concatenate function returns a rank-3 tensor (combination_index, xgrid, xgrid)
         which can in turn be contracted with the rank-4 fktable.
 
+        Sparse fktables are instead directly convolved with the pdf.
+
         Parameters
         ----------
             pdf_in: tensor
@@ -45,18 +77,20 @@ class DY(Observable):
             if self.splitting:
                 splitted_pdf = op.split(pdf_raw, self.splitting, axis=1)
                 for mask, pdf, fk in zip(self.all_masks, splitted_pdf, self.fktables):
-                    pdf_x_pdf = op.pdf_masked_convolution(pdf, mask)
-                    res = op.tensor_product(fk, pdf_x_pdf, axes=3)
-                    results.append(res)
+                    results.append(self._convolution(pdf, mask, fk))
             else:
                 for mask, fk in zip(self.all_masks, self.fktables):
-                    pdf_x_pdf = op.pdf_masked_convolution(pdf_raw, mask)
-                    res = op.tensor_product(fk, pdf_x_pdf, axes=3)
-                    results.append(res)
+                    results.append(self._convolution(pdf_raw, mask, fk))
         else:
-            pdf_x_pdf = op.pdf_masked_convolution(pdf_raw, self.all_masks[0])
+            pdf_x_pdf = None
             for fk in self.fktables:
-                res = op.tensor_product(fk, pdf_x_pdf, axes=3)
+                if isinstance(fk, SparseFKTable):
+                    res = self.sparse_convolution(pdf_raw, fk)
+                else:
+                    # The luminosity is shared by all dense fktables
+                    if pdf_x_pdf is None:
+                        pdf_x_pdf = op.pdf_masked_convolution(pdf_raw, self.all_masks[0])
+                    res = op.tensor_product(fk, pdf_x_pdf, axes=3)
                 results.append(res)
 
         # the masked convolution removes the batch dimension
@@ -5,6 +5,7 @@
     For instance, in the case of the chi2 (``LossInvcovmat``) the function takes only
     the prediction of the model and, during instantiation, took the real data to compare with
     and the covmat.
+    The chi2 can also be computed from the Cholesky decomposition of the covmat (``LossCholesky``)
 
 """
 import numpy as np
@@ -92,6 +93,150 @@ class LossInvcovmat(MetaLayer):
         return res
 
 
+def _covmat_segments(covmat):
+    """Splits the (possibly diagonal) covmat into contiguous blocks which are not
+    correlated with each other.
+    Consecutive blocks of size one (i.e., uncorrelated datapoints) are grouped together
+    into one single diagonal segment.
+
+    Parameters
+    ----------
+        covmat: np.array
+            covariance matrix (ndata, ndata) or its diagonal (ndata,)
+
+    Returns
+    -------
+        segments: list(tuple)
+            list of ``(size, diagonal)`` tuples for each of the segments
+    """
+    if covmat.ndim == 1:
+        return [(covmat.size, True)]
+    ndata = covmat.shape[0]
+    # For every datapoint, find the last datapoint it is correlated with
+    reach = ndata - 1 - np.argmax(covmat[:, ::-1] != 0, axis=1)
+    # A block ends in i when none of the previous points are correlated beyond i
+    block_ends = np.flatnonzero(np.maximum.accumulate(reach) == np.arange(ndata))
+    block_sizes = np.diff(block_ends, prepend=-1)
+    segments = []
+    for size in block_sizes:
+        diagonal = bool(size == 1)
+        if diagonal and segments and segments[-1][1]:
+            segments[-1][0] += 1
+        else:
+            segments.append([int(size), diagonal])
+    return [tuple(i) for i in segments]
+
+
+class LossCholesky(MetaLayer):
+    """
+    Loss function such that:
+    L = \\sum_{i} (L^{-1} (yt - yp))_{i}^2
+
+    where L is the lower triangular Cholesky factor of the covmat (C = L L^T).
+    The result is equivalent to that of ``LossInvcovmat`` but the inverse of the covmat
+    is never computed, instead the chi2 is computed through a triangular solve.
+
+    The covmat is split into blocks of datapoints not correlated with each other
+    (for instance, datasets without cross-correlations) and only the Cholesky
+    factor of each block is stored as a weight of the layer.
+    Uncorrelated datapoints are grouped together into a diagonal block for which
+    only the standard deviation is stored.
+
+    Example
+    -------
+    >>> import numpy as np
+    >>> from n3fit.layers import losses
+    >>> C = np.random.rand(5,5)
+    >>> data = np.random.rand(1, 1, 5)
+    >>> pred = np.random.rand(1, 1, 5)
+    >>> loss_f = losses.LossCholesky(C @ C.T, data)
+    >>> loss_f(pred).shape == 1
+    True
+    """
+
+    def __init__(self, covmat, y_true, mask=None, **kwargs):
+        self._covmat = covmat
+        self._segments = _covmat_segments(covmat)
+        self._factors = self._cholesky_factors(covmat)
+        self._y_true = op.numpy_to_tensor(y_true)
+        self._ndata = y_true.shape[-1]
+        if mask is None or all(mask):
+            self._mask = None
+        else:
+            mask = np.array(mask, dtype=np.float32).reshape((1, 1, -1))
+            self._mask = op.numpy_to_tensor(mask)
+        super().__init__(**kwargs)
+
+    def _cholesky_factors(self, covmat):
+        """Compute the Cholesky factor of every block of the covmat
+        For diagonal blocks the square root of the diagonal is returned with shape (size, 1)
+        """
+        diag = covmat if covmat.ndim == 1 else np.diag(covmat)
+        factors = []
+        start = 0
+        for size, diagonal in self._segments:
+            end = start + size
+            if diagonal:
+                factors.append(np.sqrt(diag[start:end]).reshape(-1, 1))
+            else:
+                factors.append(np.linalg.cholesky(covmat[start:end, start:end]))
+            start = end
+        return factors
+
+    def build(self, input_shape):
+        """Transform the Cholesky factors and the mask into
+        weights of the layers"""
+        self.kernel = []
+        for i, factor in enumerate(self._factors):
+            init = MetaLayer.init_constant(factor)
+            kernel = self.builder_helper(f"cholesky_{i}", factor.shape, init, trainable=False)
+            self.kernel.append(kernel)
+        mask_shape = (1, 1, self._ndata)
+        if self._mask is None:
+            init_mask = MetaLayer.init_constant(np.ones(mask_shape))
+        else:
+            init_mask = MetaLayer.init_constant(self._mask)
+        self.mask = self.builder_helper("mask", mask_shape, init_mask, trainable=False)
+
+    def add_covmat(self, covmat):
+        """Add a piece to the covmat and update the Cholesky factors accordingly
+        The new piece cannot introduce correlations between blocks of the original covmat
+        """
+        if self._covmat.ndim == 1:
+            new_covmat = np.diag(self._covmat) + covmat
+        else:
+            new_covmat = self._covmat + covmat
+        if _covmat_segments(new_covmat) != self._segments:
+            raise ValueError(
+                "The covmat added to LossCholesky cannot correlate uncorrelated datapoints"
+            )
+        for kernel, factor in zip(self.kernel, self._cholesky_factors(new_covmat)):
+            kernel.assign(factor)
+
+    def update_mask(self, new_mask):
+        """Update the mask"""
+        self.mask.assign(new_mask)
+
+    def call(self, y_pred, **kwargs):
+        tmp_raw = self._y_true - y_pred
+        tmp = op.op_multiply([tmp_raw, self.mask])
+        # Put the data in the first axis, (ndata, replicas), and split it in blocks
+        residuals = op.transpose(tmp[0])
+        block_sizes = [size for size, _ in self._segments]
+        if len(block_sizes) > 1:
+            residuals = op.split(residuals, block_sizes, axis=0)
+        else:
+            residuals = [residuals]
+        block_chi2 = []
+        for residual, factor, (_, diagonal) in zip(residuals, self.kernel, self._segments):
+            if diagonal:
+                reduced = residual / factor
+            else:
+                reduced = op.triangular_solve(factor, residual, lower=True)
+            block_chi2.append(op.sum(reduced * reduced, axis=0))
+        return sum(block_chi2)
+
+
 class LossLagrange(MetaLayer):
     """
     Abstract loss function to apply lagrange multipliers to a model.
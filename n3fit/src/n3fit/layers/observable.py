@@ -4,6 +4,11 @@ from abc import abstractmethod, ABC
 from n3fit.backends import operations as op
 
 
+# FK tables with a density (fraction of non-zero entries) below this value
+# are convolved in sparse form, i.e., looping only over the non-zero entries
+SPARSE_FK_DENSITY = 0.1
+
+
 def _is_unique(list_of_arrays):
     """ Check whether the list of arrays more than one different arrays """
     the_first = list_of_arrays[0]
@@ -13,18 +18,47 @@ def _is_unique(list_of_arrays):
     return True
 
 
+class SparseFKTable:
+    """
+    Sparse (COO) representation of a fktable as the list of its non-zero entries.
+    Each entry is multiplied by the product of the values of the PDF(s) in the
+    (flattened) positions given by ``pdf_indices`` and added to the datapoint ``data_indices``
+
+    Parameters
+    ----------
+        values: np.array
+            value of the non-zero entries of the fktable
+        data_indices: np.array
+            index of the datapoint of each entry
+        pdf_indices: list(np.array)
+            for each of the PDFs entering the convolution (one for DIS, two for DY),
+            the index of the PDF for each entry in the flattened (xgrid, flavours) PDF
+        ndata: int
+            number of datapoints of the fktable
+    """
+
+    def __init__(self, values, data_indices, pdf_indices, ndata):
+        self.values = op.numpy_to_tensor(values.reshape(-1, 1))
+        self.data_indices = op.numpy_to_tensor(data_indices, dtype="int32")
+        self.pdf_indices = [op.numpy_to_tensor(i, dtype="int32") for i in pdf_indices]
+        self.ndata = ndata
+
+
 class Observable(MetaLayer, ABC):
     """
         This class is the parent of the DIS and DY convolutions.
         All backend-dependent code necessary for the convolutions
                                     is (must be) concentrated here
 
-        The methods gen_mask and call must be overriden by the observables
+        The methods gen_mask, gen_sparse_fktable and call must be overriden by the observables
         where
             - gen_mask: it is called by the initializer and generates the mask between
                         fktables and pdfs
+            - gen_sparse_fktable: generates the sparse representation of a fktable
             - call: this is what does the actual operation
 
+        Each fktable is stored either as a dense tensor or, if its density is below
+        ``SPARSE_FK_DENSITY``, as a :py:class:`SparseFKTable`, both produce the same result.
 
         Parameters
         ----------
@@ -36,20 +70,21 @@ class Observable(MetaLayer, ABC):
                 string defining the name of the operation to be applied to the fktables
             nfl: int
                 number of flavours in the pdf (default:14)
+            sparse: bool
+                whether to use the sparse representation of the fktables,
+                by default it is chosen for each fktable according to its density
     """
 
-    def __init__(self, fktable_dicts, fktable_arr, operation_name, nfl=14, **kwargs):
+    def __init__(self, fktable_dicts, fktable_arr, operation_name, nfl=14, sparse=None, **kwargs):
         super(MetaLayer, self).__init__(**kwargs)
 
         self.nfl = nfl
 
         basis = []
         xgrids = []
-        self.fktables = []
-        for fktable, fk in zip(fktable_dicts, fktable_arr):
+        for fktable in fktable_dicts:
             xgrids.append(fktable["xgrid"])
             basis.append(fktable["basis"])
-            self.fktables.append(op.numpy_to_tensor(fk))
 
         # check how many xgrids this dataset needs
         if _is_unique(xgrids):
@@ -65,13 +100,50 @@ class Observable(MetaLayer, ABC):
             self.many_masks = True
             self.all_masks = [self.gen_mask(i) for i in basis]
 
+        self.fktables = []
+        for fk, fk_basis in zip(fktable_arr, basis):
+            use_sparse = sparse
+            if use_sparse is None:
+                use_sparse = np.count_nonzero(fk) < SPARSE_FK_DENSITY * fk.size
+            if use_sparse:
+                self.fktables.append(self.gen_sparse_fktable(fk, fk_basis))
+            else:
+                self.fktables.append(op.numpy_to_tensor(fk))
+
         self.operation = op.c_to_py_fun(operation_name)
-        self.output_dim = self.fktables[0].shape[0]
+        self.output_dim = fktable_arr[0].shape[0]
 
     def compute_output_shape(self, input_shape):
         return (self.output_dim, None)
 
+    def sparse_convolution(self, pdf, fktable):
+        """
+        Computes the convolution of a :py:class:`SparseFKTable` with the pdf
+        by summing over all non-zero entries of the fktable
+
+        Parameters
+        ----------
+            pdf: backend tensor
+                rank 4 tensor (batch_size, xgrid, flavours, replicas)
+            fktable: SparseFKTable
+                sparse fktable
+
+        Returns
+        -------
+            result: backend tensor
+                rank 2 tensor (ndata, replicas)
+        """
+        flat_pdf = op.reshape(pdf[0], (-1, pdf.shape[-1]))
+        res = fktable.values
+        for pdf_indices in fktable.pdf_indices:
+            res = res * op.gather(flat_pdf, pdf_indices)
+        return op.segment_sum(res, fktable.data_indices, fktable.ndata)
+
     # Overridables
     @abstractmethod
     def gen_mask(self, basis):
         pass
+
+    @abstractmethod
+    def gen_sparse_fktable(self, fktable, basis):
+        pass
@@ -13,7 +13,7 @@ from dataclasses import dataclass
 import numpy as np
 from n3fit.msr import msr_impose
 from n3fit.layers import DIS, DY, ObsRotation, losses
-from n3fit.layers import Preprocessing, FkRotation, FlavourToEvolution
+from n3fit.layers import Preprocessing, FkRotation, FlavourToEvolution, Mask
 
 from n3fit.backends import MetaModel, Input
 from n3fit.backends import operations as op
@@ -44,11 +44,17 @@ class ObservableWrapper:
     positivity: bool = False
     data: np.array = None
     rotation: ObsRotation = None  # only used for diagonal covmat
+    # masks to apply to the output of each observable (e.g., training/validation split)
+    observable_masks: list = None
+    # compute the chi2 from the Cholesky decomposition of the covmat
+    cholesky: bool = False
 
     def _generate_loss(self, mask=None):
         """Generates the corresponding loss function depending on the values the wrapper
         was initialized with"""
-        if self.invcovmat is not None:
+        if self.cholesky:
+            loss = losses.LossCholesky(self.covmat, self.data, mask, name=self.name)
+        elif self.invcovmat is not None:
             loss = losses.LossInvcovmat(
                 self.invcovmat, self.data, mask, covmat=self.covmat, name=self.name
             )
@@ -73,6 +79,10 @@ class ObservableWrapper:
             split_pdf = [pdf]
         # Every obs gets its share of the split
         output_layers = [obs(p_pdf) for p_pdf, obs in zip(split_pdf, self.observables)]
+        if self.observable_masks is not None:
+            for i, obs_mask in enumerate(self.observable_masks):
+                if obs_mask is not None and not obs_mask.all():
+                    output_layers[i] = Mask(bool_mask=obs_mask, axis=2)(output_layers[i])
         # Concatenate all datasets (so that experiments are one single entity)
         ret = op.concatenate(output_layers, axis=2)
         if self.rotation is not None:
@@ -86,7 +96,7 @@ class ObservableWrapper:
 
 
 def observable_generator(
-    spec_dict, positivity_initial=1.0, integrability=False
+    spec_dict, positivity_initial=1.0, integrability=False, cholesky=False
 ):  # pylint: disable=too-many-locals
     """
     This function generates the observable model for each experiment.
@@ -95,6 +105,9 @@ def observable_generator(
 
     An experiment contains an fktable, which is loaded by the convolution layer
     (be it hadronic or DIS) and a inv covmat which loaded by the loss.
+    The convolution layer (and so the fktables) of each dataset is shared by the training,
+    validation and experimental outputs, the training and validation masks are applied
+    to the output of the convolution.
 
     This function also outputs three "output objects" (which are functions that generate layers)
     that use the training and validation mask to create a training_output, validation_output
@@ -116,6 +129,9 @@ def observable_generator(
             a dictionary-like object containing the information of the experiment
         positivity_initial: float
             set the positivity lagrange multiplier for epoch 1
+        cholesky: bool
+            whether the training and validation chi2 should be computed from the
+            Cholesky decomposition of the covmat instead of its inverse
 
     Returns
     ------
@@ -132,6 +148,8 @@ def observable_generator(
     model_obs_tr = []
     model_obs_vl = []
     model_obs_ex = []
+    masks_tr = []
+    masks_vl = []
     model_inputs = []
     # The first step is to compute the observable for each of the datasets
     for dataset_dict in spec_dict["datasets"]:
@@ -164,34 +182,19 @@ def observable_generator(
                 name=f"dat_{dataset_name}",
             )
             obs_layer_ex = obs_layer_vl = None
-        elif spec_dict.get("data_transformation_tr") is not None:
-            # Data transformation needs access to the full array of output data
-            obs_layer_ex = Obs_Layer(
-                dataset_dict["fktables"],
-                dataset_dict["ex_fktables"],
-                operation_name,
-                name=f"exp_{dataset_name}",
-            )
-            obs_layer_tr = obs_layer_vl = obs_layer_ex
         else:
-            obs_layer_tr = Obs_Layer(
-                dataset_dict["fktables"],
-                dataset_dict["tr_fktables"],
-                operation_name,
-                name=f"dat_{dataset_name}",
-            )
+            # The same layer is used for training, validation and experimental
             obs_layer_ex = Obs_Layer(
                 dataset_dict["fktables"],
                 dataset_dict["ex_fktables"],
                 operation_name,
                 name=f"exp_{dataset_name}",
             )
-            obs_layer_vl = Obs_Layer(
-                dataset_dict["fktables"],
-                dataset_dict["vl_fktables"],
-                operation_name,
-                name=f"val_{dataset_name}",
-            )
+            obs_layer_tr = obs_layer_vl = obs_layer_ex
+            # Data transformation needs access to the full array of output data
+            if spec_dict.get("data_transformation_tr") is None:
+                masks_tr.append(dataset_dict["tr_mask"])
+                masks_vl.append(dataset_dict["vl_mask"])
 
         # To know how many xpoints we compute we are duplicating functionality from obs_layer
         if obs_layer_tr.splitting is None:
@@ -239,16 +242,22 @@ def observable_generator(
         model_obs_tr,
         dataset_xsizes,
         invcovmat=spec_dict["invcovmat"],
+        covmat=spec_dict.get("covmat_tr"),
         data=spec_dict["expdata"],
         rotation=obsrot_tr,
+        observable_masks=masks_tr or None,
+        cholesky=cholesky,
     )
     out_vl = ObservableWrapper(
         f"{spec_name}_val",
         model_obs_vl,
         dataset_xsizes,
         invcovmat=spec_dict["invcovmat_vl"],
+        covmat=spec_dict.get("covmat_vl"),
         data=spec_dict["expdata_vl"],
         rotation=obsrot_vl,
+        observable_masks=masks_vl or None,
+        cholesky=cholesky,
     )
     out_exp = ObservableWrapper(
         f"{spec_name}_exp",
@@ -9,6 +9,7 @@
     between iterations while at the same time keeping the amount of redundant calls to a minimum
 """
 import logging
+import dataclasses
 from itertools import zip_longest
 import numpy as np
 from scipy.interpolate import PchipInterpolator
@@ -96,6 +97,7 @@ class ModelTrainer:
         model_file=None,
         sum_rules=None,
         parallel_models=1,
+        cholesky_chi2=False,
     ):
         """
         Parameters
@@ -128,6 +130,9 @@ class ModelTrainer:
                         whether sum rules should be enabled (All, MSR, VSR, False)
             parallel_models: int
                 number of models to fit in parallel
+            cholesky_chi2: bool
+                compute the training and validation chi2 from the Cholesky decomposition
+                of the covmat instead of from its inverse
         """
         # Save all input information
         self.exp_info = exp_info
@@ -146,6 +151,7 @@ class ModelTrainer:
         self.all_datasets = []
         self._scaler = None
         self._parallel_models = parallel_models
+        self._cholesky_chi2 = cholesky_chi2
 
         # Initialise internal variables which define behaviour
         if debug:
@@ -288,7 +294,7 @@ class ModelTrainer:
                 self.training["expdata"].append(integ_dict["expdata"])
                 self.training["integdatasets"].append(integ_dict["name"])
 
-    def _model_generation(self, pdf_models, partition, partition_idx):
+    def _model_generation(self, pdf_models, partition, partition_idx, single_pass_validation=False):
         """
         Fills the three dictionaries (``training``, ``validation``, ``experimental``)
         with the ``model`` entry
@@ -313,10 +319,23 @@ class ModelTrainer:
         this function will give the same input to every model and will concatenate the output at the end
         so that the final output of the model is (1, None, 14, n) (with n=number of parallel models)
 
+        If ``single_pass_validation`` is True, the validation losses are also added to the
+        training model as monitored outputs (see
+        :py:meth:`n3fit.backends.MetaModel.set_monitored_outputs`) which take as input
+        the same PDF as the training losses, disconnected from the gradient.
+        In this way the training step computes both training and validation losses from
+        one single evaluation of the PDF. The validation model is generated anyway.
+
         Parameters
         ----------
             pdf_models: list(n3fit.backend.MetaModel)
                 a list of models that produce PDF values
+            partition: dict
+                the kfolding partition (if any)
+            partition_idx: int
+                index of the partition
+            single_pass_validation: bool
+                whether the training model should compute also the validation losses
 
         Returns
         -------
@@ -369,7 +388,27 @@ class ModelTrainer:
         # experiment leaves out the negation
 
         output_tr = _pdf_injection(splitted_pdf, self.training["output"], training_mask)
-        training = MetaModel(full_model_input_dict, output_tr)
+        if single_pass_validation:
+            # Attach the validation losses (without integrability) to the training model
+            # using a copy of the PDF which doesn't take part in the backpropagation
+            frozen_pdf = splitting_layer(op.stop_gradient(full_pdf_per_replica))
+            frozen_val_pdfs = []
+            for partial_pdf, obs in zip(frozen_pdf, self.training["output"]):
+                if not obs.integrability:
+                    frozen_val_pdfs.append(partial_pdf)
+            # The positivity losses are already part of the training model under the same name
+            monitored_obs = []
+            for obs in self.validation["output"]:
+                if obs.positivity:
+                    obs = dataclasses.replace(obs, name=f"{obs.name}_val")
+                monitored_obs.append(obs)
+            output_mon = _pdf_injection(frozen_val_pdfs, monitored_obs, validation_mask)
+            training = MetaModel(full_model_input_dict, output_tr + output_mon)
+            training.set_monitored_outputs(
+                {i.name: j.name for i, j in zip(monitored_obs, self.validation["output"])}
+            )
+        else:
+            training = MetaModel(full_model_input_dict, output_tr)
 
         # Validation skips integrability and the "true" chi2 skips also positivity,
         # so we must only use the corresponding subset of PDF functions
@@ -462,7 +501,7 @@ class ModelTrainer:
             if not self.mode_hyperopt:
                 log.info("Generating layers for experiment %s", exp_dict["name"])
 
-            exp_layer = model_gen.observable_generator(exp_dict)
+            exp_layer = model_gen.observable_generator(exp_dict, cholesky=self._cholesky_chi2)
 
             # Save the input(s) corresponding to this experiment
             self.input_list += exp_layer["inputs"]
@@ -658,7 +697,7 @@ class ModelTrainer:
             reporting_list.append(reporting_dict)
         return reporting_list
 
-    def _train_and_fit(self, training_model, stopping_object, epochs=100):
+    def _train_and_fit(self, training_model, stopping_object, epochs=100, epochs_per_call=None):
         """
         Trains the NN for the number of epochs given using
         stopping_object as the stopping criteria
@@ -667,6 +706,11 @@ class ModelTrainer:
         respective positivity multipliers.
         In the same way, every ``PUSH_INTEGRABILITY_EACH`` epochs the integrability
         will be multiplied by their respective integrability multipliers
+
+        If ``epochs_per_call`` is given, the training is run by the compiled loop of
+        :py:meth:`n3fit.backends.MetaModel.perform_fit` and the stopping is checked
+        only every ``epochs_per_call`` epochs, which must be a divisor of the frequency
+        of the updates of the multipliers.
         """
         callback_st = callbacks.StoppingCallback(stopping_object)
         callback_pos = callbacks.LagrangeCallback(
@@ -682,6 +726,7 @@ class ModelTrainer:
 
         training_model.perform_fit(
             epochs=epochs,
+            epochs_per_call=epochs_per_call,
             verbose=False,
             callbacks=self.callbacks + [callback_st, callback_pos, callback_integ],
         )
@@ -793,6 +838,8 @@ class ModelTrainer:
         )
         threshold_pos = positivity_dict.get("threshold", 1e-6)
         threshold_chi2 = params.get("threshold_chi2", CHI2_THRESHOLD)
+        # When there is no validation the training model is already used to monitor the fit
+        single_pass = params.get("single_pass_validation", False) and not self.no_validation
 
         # Initialize the chi2 dictionaries
         l_valid = []
@@ -824,7 +871,9 @@ class ModelTrainer:
 
             # Model generation joins all the different observable layers
             # together with pdf model generated above
-            models = self._model_generation(pdf_models, partition, k)
+            models = self._model_generation(
+                pdf_models, partition, k, single_pass_validation=single_pass
+            )
 
             # Only after model generation, apply possible weight file
             if self.model_file:
@@ -858,6 +907,7 @@ class ModelTrainer:
                 stopping_patience=stopping_epochs,
                 threshold_positivity=threshold_pos,
                 threshold_chi2=threshold_chi2,
+                single_pass_model=models["training"] if single_pass else None,
             )
 
             # Compile each of the models with the right parameters
@@ -868,6 +918,7 @@ class ModelTrainer:
                 models["training"],
                 stopping_object,
                 epochs=epochs,
+                epochs_per_call=params.get("epochs_per_call"),
             )
 
             if self.mode_hyperopt:
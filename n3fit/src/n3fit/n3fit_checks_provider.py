@@ -9,6 +9,7 @@ import n3fit.checks
 @n3fit.checks.check_consistent_basis
 @n3fit.checks.wrapper_check_NN
 @n3fit.checks.wrapper_hyperopt
+@n3fit.checks.check_hyperopt_workers
 @n3fit.checks.check_deprecated_options
 @n3fit.checks.check_consistent_parallel
 def n3fit_checks_action(
@@ -24,6 +25,7 @@ def n3fit_checks_action(
     load=None,
     hyperscan_config=None,
     hyperopt=None,
+    hyperopt_workers=None,
     kfold=None,
     tensorboard=None,
     parallel_models=False,
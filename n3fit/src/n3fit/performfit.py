@@ -33,11 +33,13 @@ def performfit(
     load=None,
     hyperscanner=None,
     hyperopt=None,
+    hyperopt_workers=None,
     kfold_parameters,
     tensorboard=None,
     debug=False,
     maxcores=None,
-    parallel_models=False
+    parallel_models=False,
+    cholesky_chi2=False,
 ):
     """
         This action will (upon having read a validcard) process a full PDF fit
@@ -107,6 +109,8 @@ def performfit(
                 dictionary containing the details of the hyperscanner
             hyperopt: int
                 if given, number of hyperopt iterations to run
+            hyperopt_workers: int
+                if given, number of processes among which the hyperopt iterations are distributed
             kfold_parameters: None, dict
                 dictionary with kfold settings used in hyperopt.
             tensorboard: None, dict
@@ -118,6 +122,9 @@ def performfit(
                 maximum number of (logical) cores that the backend should be aware of
             parallel_models: bool
                 whether to run models in parallel
+            cholesky_chi2: bool
+                whether to compute the training and validation chi2 from the Cholesky
+                decomposition of the covmat
     """
     from n3fit.backends import set_initial_state
 
@@ -182,23 +189,30 @@ def performfit(
 
         # Generate a ModelTrainer object
         # this object holds all necessary information to train a PDF (up to the NN definition)
-        the_model_trainer = ModelTrainer(
+        trainer_args = (
             exp_info,
             posdatasets_fitting_pos_dict,
             integdatasets_fitting_integ_dict,
             basis,
             fitbasis,
             nnseeds,
-            debug=debug,
-            kfold_parameters=kfold_parameters,
-            max_cores=maxcores,
-            model_file=load,
-            sum_rules=sum_rules,
-            parallel_models=n_models
         )
-
-        # This is just to give a descriptive name to the fit function
-        pdf_gen_and_train_function = the_model_trainer.hyperparametrizable
+        trainer_kwargs = {
+            "debug": debug,
+            "kfold_parameters": kfold_parameters,
+            "max_cores": maxcores,
+            "model_file": load,
+            "sum_rules": sum_rules,
+            "parallel_models": n_models,
+            "cholesky_chi2": cholesky_chi2,
+        }
+        # With several hyperopt workers each worker process generates its own ModelTrainer
+        parallel_hyperopt = hyperopt and hyperopt_workers is not None and hyperopt_workers > 1
+        if not parallel_hyperopt:
+            the_model_trainer = ModelTrainer(*trainer_args, **trainer_kwargs)
+
+            # This is just to give a descriptive name to the fit function
+            pdf_gen_and_train_function = the_model_trainer.hyperparametrizable
 
         # Read up the parameters of the NN from the runcard
         stopwatch.register_times("replica_set")
@@ -211,13 +225,26 @@ def performfit(
         # this block                                                           #
         ########################################################################
         if hyperopt:
-            from n3fit.hyper_optimization.hyper_scan import hyper_scan_wrapper
+            from n3fit.hyper_optimization.hyper_scan import (
+                hyper_scan_wrapper,
+                parallel_hyper_scan_wrapper,
+            )
 
-            # Note that hyperopt will not run in parallel or with more than one model _for now_
             replica_path_set = replica_path / f"replica_{replica_idxs[0]}"
-            true_best = hyper_scan_wrapper(
-                replica_path_set, the_model_trainer, hyperscanner, max_evals=hyperopt
-            )
+            if parallel_hyperopt:
+                true_best = parallel_hyper_scan_wrapper(
+                    replica_path_set,
+                    trainer_args,
+                    trainer_kwargs,
+                    hyperscanner,
+                    max_evals=hyperopt,
+                    workers=hyperopt_workers,
+                    debug=debug,
+                )
+            else:
+                true_best = hyper_scan_wrapper(
+                    replica_path_set, the_model_trainer, hyperscanner, max_evals=hyperopt
+                )
             print("##################")
             print("Best model found: ")
             for k, i in true_best.items():
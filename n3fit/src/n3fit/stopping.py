@@ -141,7 +141,8 @@ class FitState:
 
     Note: the training chi2 is computed before the update of the weights
     so it is the chi2 that informed the updated corresponding to this state.
-    The validation chi2 instead is computed after the update of the weights.
+    The validation chi2 instead is computed after the update of the weights
+    (unless it is computed in the same pass as the training chi2, see ``Stopping``).
 
     Parameters
     ----------
@@ -251,6 +252,10 @@ class ReplicaState:
         self._stop_epoch = None
         self._best_vl_chi2 = INITIAL_CHI2
 
+    @property
+    def pdf_model(self):
+        return self._pdf_model
+
     def positivity_pass(self):
         """ By definition, if we have a ``best_epoch`` then positivity passed """
         if self._best_epoch is None:
@@ -279,9 +284,13 @@ class ReplicaState:
         else:
             return POS_BAD
 
-    def register_best(self, chi2, epoch):
-        """ Register a new best state and some metadata about it """
-        self._weights = self._pdf_model.get_weights()
+    def register_best(self, chi2, epoch, weights=None):
+        """Register a new best state and some metadata about it
+        If no weights are given, the current weights of the model are saved
+        """
+        if weights is None:
+            weights = self._pdf_model.get_weights()
+        self._weights = weights
         self._best_epoch = epoch
         self._best_vl_chi2 = chi2
 
@@ -331,8 +340,9 @@ class FitHistory:
         FitState.vl_ndata = vl_ndata
         FitState.vl_suffix = vl_suffix
 
-        # Save a list of status for the entire fit
-        self._history = []
+        # Save the status for the entire fit, indexed by epoch
+        # (the fit might not be monitored at every single epoch)
+        self._history = {}
         self.final_epoch = None
 
     @property
@@ -344,20 +354,26 @@ class FitHistory:
         """ Get the FitState of the system for a given epoch """
         try:
             return self._history[epoch]
-        except IndexError as e:
+        except KeyError as e:
             raise ValueError(
-                f"Tried to get obtain the state for epoch {epoch} when only {len(self._history)} epochs have been saved"
+                f"Tried to get obtain the state for epoch {epoch} which has not been saved"
             ) from e
 
-    def save_best_replica(self, i, epoch=None):
+    def save_best_replica(self, i, epoch=None, single_pass_model=None):
         """Save the state of replica ``i`` as a best fit so far.
         If an epoch is given, save the best as the given epoch, otherwise
-        use the last one
+        use the last one.
+        If a ``single_pass_model`` is given the saved weights are the ones from before its
+        last training step, which are the ones its monitored (validation) losses correspond to
         """
         if epoch is None:
             epoch = self.final_epoch
         loss = self.get_state(epoch).vl_loss[i]
-        self._replicas[i].register_best(loss, epoch)
+        replica = self._replicas[i]
+        weights = None
+        if single_pass_model is not None:
+            weights = single_pass_model.get_pre_step_weights(replica.pdf_model)
+        replica.register_best(loss, epoch, weights=weights)
 
     def all_positivity_status(self):
         """ Returns whether the positivity passed or not per replica """
@@ -381,7 +397,7 @@ class FitHistory:
         # Save all the information in a fitstate object
         fitstate = FitState(training_info, validation_info)
         self.final_epoch = epoch
-        self._history.append(fitstate)
+        self._history[epoch] = fitstate
         return fitstate
 
     def stop_training_replica(self, i, e):
@@ -425,6 +441,12 @@ class Stopping:
            how many epochs to wait for the validation loss to improve
         dont_stop: bool
            dont care about early stopping
+        single_pass_model: n3fit.backends.MetaModel
+           if given, the training model which computes the validation losses as monitored outputs.
+           At every epoch the validation losses will be read from it instead of evaluating
+           ``validation_model`` (which is still used for the final ``vl_chi2``).
+           Note that in this case both training and validation losses of a given epoch
+           are computed before the update of the weights, and so are the best weights saved.
     """
 
     def __init__(
@@ -437,9 +459,11 @@ class Stopping:
         stopping_patience=7000,
         threshold_chi2=10.0,
         dont_stop=False,
+        single_pass_model=None,
     ):
         # Save the validation object
         self._validation = validation_model
+        self._single_pass_model = single_pass_model
 
         # Create the History object
         tr_ndata, vl_ndata, pos_sets = parse_ndata(all_data_dicts)
@@ -456,6 +480,7 @@ class Stopping:
 
         self.dont_stop = dont_stop
         self.stop_now = False
+        self._last_epoch = -1
         self.stopping_patience = stopping_patience
         self.total_epochs = total_epochs
 
@@ -512,6 +537,9 @@ class Stopping:
 
         Returns True if the run seems ok and False if a NaN is found
 
+        The function doesn't need to be called at every epoch (e.g., if the training runs
+        several epochs per call), the patience is counted in epochs nevertheless.
+
         Parameters
         ----------
             training_info: dict
@@ -532,7 +560,11 @@ class Stopping:
             return False
 
         # Step 2. Compute the validation metrics
-        validation_info = self._validation.compute_losses()
+        # (or read them from the training step if they were computed together)
+        if self._single_pass_model is not None:
+            validation_info = self._single_pass_model.get_monitored_losses()
+        else:
+            validation_info = self._validation.compute_losses()
 
         # Step 3. Register the current point in (the) history
         fitstate = self._history.register(epoch, training_info, validation_info)
@@ -548,11 +580,12 @@ class Stopping:
         # And the ones that pass positivity
         passes &= self._positivity(fitstate)
 
-        self.stopping_degree += self.count
+        self.stopping_degree += self.count * (epoch - self._last_epoch)
+        self._last_epoch = epoch
 
         # Step 5. loop over the valid indices to check whether the vl improved
         for i in np.where(passes)[0]:
-            self._history.save_best_replica(i)
+            self._history.save_best_replica(i, single_pass_model=self._single_pass_model)
             self.stopping_degree[i] = 0
             self.count[i] = 1
 
@@ -128,3 +128,95 @@ def test_tensor_product():
 
 def test_sum():
     numpy_check(op.sum, np.sum, mode='single')
+
+
+def test_monitored_outputs():
+    """Check that the monitored outputs of a MetaModel are computed in the same training
+    step but don't take part in the minimization"""
+    from n3fit.backends import MetaModel, base_layer_selector
+
+    input_layer = op.numpy_to_input(ARR3)
+    models = []
+    denses = []
+    for monitor in [False, True]:
+        dense = base_layer_selector("dense", units=2, activation="linear", input_shape=(DIM,))
+        out = dense(input_layer)
+        denses.append(dense)
+        out_tr = op.as_layer(lambda x: op.sum(x * x, axis=[0, 1]), name="tr")(out)
+        outputs = [out_tr]
+        if monitor:
+            out_vl = op.as_layer(lambda x: op.sum(x, axis=[0, 1]), name="vl")
+            outputs.append(out_vl(op.stop_gradient(out)))
+        model = MetaModel(input_layer, outputs)
+        if monitor:
+            model.set_monitored_outputs({"vl": "vl"})
+            dense.set_weights(denses[0].get_weights())
+        model.compile(optimizer_name="SGD", learning_rate=0.01)
+        models.append(model)
+    reference, monitored = models
+    initial_losses = monitored.compute_losses()
+
+    for model in models:
+        model.perform_fit(epochs=1, verbose=False)
+
+    # The monitored losses correspond to the weights before the update
+    monitored_losses = monitored.get_monitored_losses()
+    np.testing.assert_allclose(monitored_losses["vl_loss"], initial_losses["vl_loss"], rtol=1e-5)
+    np.testing.assert_allclose(monitored_losses["loss"], initial_losses["vl_loss"], rtol=1e-5)
+    # and the update is the same as in the model without monitored outputs
+    for w_ref, w_mon in zip(denses[0].get_weights(), denses[1].get_weights()):
+        np.testing.assert_allclose(w_ref, w_mon, rtol=1e-5)
+
+
+def test_monitored_best_weights():
+    """Check that the weights saved as best when the validation is monitored in the
+    training step are the ones which produced the monitored losses"""
+    from n3fit.backends import MetaModel, base_layer_selector
+    from n3fit.stopping import ReplicaState
+
+    input_layer = op.numpy_to_input(ARR3)
+    dense = base_layer_selector("dense", units=2, activation="linear", input_shape=(DIM,))
+    out = dense(input_layer)
+    pdf_model = MetaModel(input_layer, out)
+    out_tr = op.as_layer(lambda x: op.sum(x * x, axis=[0, 1]), name="tr")(out)
+    out_vl = op.as_layer(lambda x: op.sum(x, axis=[0, 1]), name="vl")(op.stop_gradient(out))
+    model = MetaModel(input_layer, [out_tr, out_vl])
+    model.set_monitored_outputs({"vl": "vl"})
+    model.compile(optimizer_name="SGD", learning_rate=0.01)
+    model.perform_fit(epochs=3, epochs_per_call=3, verbose=False)
+
+    monitored_vl = model.get_monitored_losses()["vl_loss"]
+    replica = ReplicaState(pdf_model)
+    replica.register_best(monitored_vl, 2, weights=model.get_pre_step_weights(pdf_model))
+    replica.reload()
+    np.testing.assert_allclose(model.compute_losses()["vl_loss"], monitored_vl, rtol=1e-5)
+
+
+def test_compiled_fit():
+    """Check that the compiled training loop produces the same results as the backend fit"""
+    from n3fit.backends import MetaModel, base_layer_selector
+
+    input_layer = op.numpy_to_input(ARR3)
+    epochs = 10
+    results = []
+    initial_weights = None
+    for epochs_per_call in [None, 1, 5]:
+        dense = base_layer_selector("dense", units=2, activation="linear", input_shape=(DIM,))
+        out = dense(input_layer)
+        out_a = op.as_layer(lambda x: op.sum(x * x, axis=[0, 1]), name="a")(out)
+        out_b = op.as_layer(lambda x: op.sum(x * x * x, axis=[0, 1]), name="b")(out)
+        model = MetaModel(input_layer, [out_a, out_b])
+        if initial_weights is None:
+            initial_weights = dense.get_weights()
+        dense.set_weights(initial_weights)
+        model.compile(optimizer_name="Adam", learning_rate=0.01)
+        history = model.perform_fit(epochs=epochs, epochs_per_call=epochs_per_call, verbose=False)
+        results.append((history, dense.get_weights()))
+
+    reference_history, reference_weights = results[0]
+    for history, weights in results[1:]:
+        for key in ["loss", "a_loss", "b_loss"]:
+            assert len(history[key]) == epochs
+            np.testing.assert_allclose(history[key], reference_history[key], rtol=1e-5)
+        for w_ref, w in zip(reference_weights, weights):
+            np.testing.assert_allclose(w, w_ref, rtol=1e-5)
@@ -2,8 +2,11 @@
     Test hyperoptimization features
 """
 
+import hyperopt
 from numpy.testing import assert_approx_equal
+from validphys.hyperoptplot import TRIES_FILE, find_tries_file, read_tries
 from n3fit.hyper_optimization import rewards
+from n3fit.hyper_optimization.filetrials import FileTrials, remove_tries
 
 def test_rewards():
     """ Ensure that rewards continue doing what they are supposed to do """
@@ -11,3 +14,60 @@ def test_rewards():
     assert_approx_equal(rewards.average(losses), 1.0)
     assert_approx_equal(rewards.best_worst(losses), 2.0)
     assert_approx_equal(rewards.std(losses), 0.816496580927726)
+
+
+def test_filetrials(tmp_path):
+    """Check that all trials of a scan are appended to the tries file and can be read back"""
+    space = {"x": hyperopt.hp.uniform("x", -1.0, 1.0)}
+    trials = FileTrials(tmp_path, parameters=space)
+    hyperopt.fmin(
+        fn=lambda p: p["x"] ** 2,
+        space=space,
+        algo=hyperopt.tpe.suggest,
+        max_evals=5,
+        show_progressbar=False,
+        trials=trials,
+    )
+    tries_file = find_tries_file(tmp_path)
+    assert tries_file.name == TRIES_FILE
+    stored = list(read_tries(tries_file))
+    assert [t["tid"] for t in stored] == [t["tid"] for t in trials.trials]
+    for trial, stored_trial in zip(trials.trials, stored):
+        assert_approx_equal(stored_trial["result"]["loss"], trial["result"]["loss"])
+        assert_approx_equal(stored_trial["misc"]["space_vals"]["x"] ** 2, trial["result"]["loss"])
+    # A trial written but not registered in the index (e.g., interrupted before
+    # the index was updated) is not read, and neither is a write interrupted half-way
+    with open(tries_file, "a") as f:
+        f.write('{"tid": 5, "result": {}}\n{"tid": 6, "res')
+    assert len(list(read_tries(tries_file))) == len(stored)
+
+
+def test_shared_filetrials(tmp_path):
+    """Check that several FileTrials can share the same files, as the workers of a parallel scan"""
+    space = {"x": hyperopt.hp.uniform("x", -1.0, 1.0)}
+    max_evals = 6
+    remove_tries(tmp_path)
+
+    def run_worker(evals):
+        trials = FileTrials(tmp_path, parameters=space, shared=True, max_trials=max_evals)
+        hyperopt.fmin(
+            fn=lambda p: p["x"] ** 2,
+            space=space,
+            algo=hyperopt.tpe.suggest,
+            max_evals=evals,
+            show_progressbar=False,
+            trials=trials,
+        )
+        return trials
+
+    first_worker = run_worker(max_evals // 2)
+    # The second worker reads the trials of the first one and completes the scan
+    second_worker = run_worker(max_evals)
+    assert len(second_worker) == max_evals
+    # And the first worker knows about the trials of the second one after a refresh
+    first_worker.refresh()
+    assert len(first_worker) == max_evals
+    stored_tids = [t["tid"] for t in read_tries(find_tries_file(tmp_path))]
+    assert sorted(stored_tids) == list(range(max_evals))
+    # No more trials can be generated
+    assert first_worker.new_trial_ids(2) == []
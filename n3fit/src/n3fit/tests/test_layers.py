@@ -182,6 +182,79 @@ def test_DY():
         assert np.allclose(result, reference, THRESHOLD)
 
 
+def test_sparse_fktables():
+    """Check that the sparse convolution of the fktables produces the same results as the dense one"""
+    for observable, generator in [(layers.DIS, generate_DIS), (layers.DY, generate_had)]:
+        fkdicts = generator(2)
+        fks = []
+        for fkdict in fkdicts:
+            fk = fkdict["fktable"]
+            fk[fk < 0.7] = 0.0
+            fks.append(fk)
+        pdf = np.random.rand(1, XSIZE, FLAVS, 2)
+        kp = op.numpy_to_tensor(pdf)
+        dense_layer = observable(fkdicts, fks, "ADD", nfl=FLAVS, sparse=False)
+        sparse_layer = observable(fkdicts, fks, "ADD", nfl=FLAVS, sparse=True)
+        dense = op.evaluate(dense_layer(kp))
+        sparse = op.evaluate(sparse_layer(kp))
+        assert sparse.shape == dense.shape
+        assert np.allclose(sparse, dense, rtol=1e-5)
+
+
+def test_shared_observable_masks():
+    """Check that masking the output of the observable layer shared by the training,
+    validation and experimental outputs gives the same results as convolving
+    with the masked fktables, and that positivity still convolves the full fktables"""
+    from n3fit.model_gen import observable_generator
+
+    pdf = op.numpy_to_tensor(np.random.rand(1, XSIZE, FLAVS, 1))
+    tr_mask = np.array([True, False, True])
+    vl_mask = ~tr_mask
+    ntr = np.count_nonzero(tr_mask)
+    nvl = np.count_nonzero(vl_mask)
+    for observable, generator in [(layers.DIS, generate_DIS), (layers.DY, generate_had)]:
+        fkdicts = generator(2)
+        fks = [i["fktable"] for i in fkdicts]
+        dataset = {
+            "name": "test",
+            "hadronic": observable is layers.DY,
+            "operation": "ADD",
+            "fktables": fkdicts,
+            "ex_fktables": fks,
+            "tr_fktables": fks,
+            "tr_mask": tr_mask,
+            "vl_mask": vl_mask,
+        }
+        spec_dict = {
+            "name": "test_exp",
+            "positivity": False,
+            "datasets": [dataset],
+            "invcovmat": np.eye(ntr),
+            "expdata": np.zeros((1, ntr)),
+            "invcovmat_vl": np.eye(nvl),
+            "expdata_vl": np.zeros((1, nvl)),
+            "invcovmat_true": np.eye(NDATA),
+            "covmat": np.eye(NDATA),
+            "expdata_true": np.zeros((1, NDATA)),
+        }
+        layer_info = observable_generator(spec_dict)
+        shared_layer = layer_info["output"].observables[0]
+        assert layer_info["output_tr"].observables[0] is shared_layer
+        assert layer_info["output_vl"].observables[0] is shared_layer
+        for output, mask in [("output_tr", tr_mask), ("output_vl", vl_mask), ("output", None)]:
+            result = layer_info[output]._generate_experimental_layer(pdf)
+            masked_fks = fks if mask is None else [fk[mask] for fk in fks]
+            reference = observable(fkdicts, masked_fks, "ADD", nfl=FLAVS)(pdf)
+            np.testing.assert_allclose(result, reference, rtol=1e-5)
+
+        # Positivity sets are not masked
+        positivity_dict = dict(spec_dict, positivity=True)
+        layer_info = observable_generator(positivity_dict)
+        result = layer_info["output_tr"]._generate_experimental_layer(pdf)
+        reference = observable(fkdicts, fks, "ADD", nfl=FLAVS)(pdf)
+        np.testing.assert_allclose(result, reference, rtol=1e-5)
+
+
 def test_rotation_flavour():
     # Input dictionary to build the rotation matrix using vp2 functions
     flav_info = [
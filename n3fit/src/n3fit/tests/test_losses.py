@@ -21,6 +21,22 @@ def test_l_invcovmat():
     are_equal(result, reference, threshold=1e-4)
 
 
+def test_l_cholesky():
+    # Build a covmat with a correlated block and some uncorrelated datapoints
+    half = DIM // 2
+    covmat = np.diag(np.random.rand(DIM) + 1.0)
+    covmat[:half, :half] = C[:half, :half] @ C[:half, :half].T + np.eye(half)
+    y = np.expand_dims(ARR2, [0, 1])
+    for cov in [covmat, C @ C.T]:
+        loss_f = losses.LossCholesky(cov, ARR1)
+        reference = losses.LossInvcovmat(np.linalg.inv(cov), ARR1)(y)
+        are_equal(loss_f(y), reference, threshold=1e-4)
+    # Diagonal covmat
+    loss_f = losses.LossCholesky(np.diag(covmat)[half:], ARR1[half:])
+    diff = ARR1[half:] - ARR2[half:]
+    are_equal(loss_f(y[..., half:]), np.sum(diff**2 / np.diag(covmat)[half:]), threshold=1e-4)
+
+
 def test_l_positivity():
     alpha = 1e-7
     loss_f = losses.LossPositivity(alpha=alpha)
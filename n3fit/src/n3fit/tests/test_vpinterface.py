@@ -69,3 +69,34 @@ def test_vpinterface():
     assert distances[1].grid_values.data.shape == (1, 8, 40)
     np.testing.assert_allclose(distances[0].grid_values.data, 0.0)
     assert not np.allclose(distances[1].grid_values.data, 0.0)
+
+
+def test_stacked_prediction():
+    """Check that evaluating all replicas at once reproduces the replica-by-replica
+    predictions, also after the weights of the models have changed"""
+    n3pdf = generate_n3pdf(layers=2, members=3)
+    for xsize in [7, 13]:
+        xx = np.random.rand(xsize)
+        stacked = n3pdf(xx, flavours="n3fit")
+        one_by_one = [n3pdf(xx, flavours="n3fit", replica=i + 1) for i in range(len(n3pdf))]
+        np.testing.assert_allclose(stacked, np.concatenate(one_by_one), rtol=1e-6)
+    # The compiled function is traced only once for all x-grid sizes
+    assert n3pdf._stacked_predict.stacked_call.experimental_get_tracing_count() == 1
+    # Modify the weights of the last replica
+    model = n3pdf._models[-1]
+    model.set_weights([w * 1.1 for w in model.get_weights()])
+    stacked = n3pdf(xx, flavours="n3fit")
+    np.testing.assert_allclose(stacked[-1:], n3pdf(xx, flavours="n3fit", replica=3), rtol=1e-6)
+
+
+def test_grid_values_members():
+    """Check that the grid values of some of the replicas, which are computed by
+    evaluating only their models, match the ones computed for all replicas"""
+    n3pdf = generate_n3pdf(layers=2, members=4)
+    lhapdf_set = n3pdf.load()
+    flavours = [21, 1, -2]
+    xx = np.random.rand(11)
+    all_members = lhapdf_set.grid_values(flavours, xx)
+    members = [1, 3]
+    some_members = lhapdf_set.grid_values(flavours, xx, members=members)
+    np.testing.assert_allclose(some_members, all_members[members], rtol=1e-6)
@@ -18,6 +18,7 @@
 
 
 """
+import hashlib
 import logging
 from collections.abc import Iterable
 import numpy as np
@@ -26,6 +27,7 @@ from validphys.core import PDF, MCStats
 from validphys.pdfbases import ALL_FLAVOURS, check_basis
 from validphys.lhapdfset import LHAPDFSet
 from validphys.arclength import integrability_number, arc_lengths
+from n3fit.backends import stacked_prediction_function
 
 log = logging.getLogger(__name__)
 # Order of the evolution basis output from n3fit
@@ -69,6 +71,28 @@ class N3LHAPDFSet(LHAPDFSet):
         self._flavors = None
         self._fitting_q = Q
         self.basis = check_basis("evolution", EVOL_LIST)["basis"]
+        # Rotation from the 14-flavour evolution basis of n3fit to the LHAPDF flavours
+        # (the precision is not that important here)
+        to_flav = la.inv(self.basis.from_flavour_mat)
+        to_flav[np.abs(to_flav) < 1e-12] = 0.0
+        self._to_flav = to_flav
+        # The function evaluating all replicas at once is only compiled when needed
+        self._stacked_predict = None
+        # and so are the ones evaluating only some of them, per tuple of replica indexes
+        self._members_predict = {}
+
+    @property
+    def cache_key(self):
+        """Identifier used by the validphys grid values cache, built from the
+        current weights of the models so that it changes whenever the models
+        are modified"""
+        h = hashlib.sha1()
+        for model in self._lhapdf_set:
+            for weight in model.get_weights():
+                weight = np.ascontiguousarray(weight)
+                h.update(f"{weight.dtype.str}{weight.shape}".encode())
+                h.update(weight.tobytes())
+        return (self._name, h.hexdigest())
 
     def xfxQ(self, x, Q, n, fl):
         """Return the value of the PDF member for the given value in x"""
@@ -104,8 +128,10 @@ class N3LHAPDFSet(LHAPDFSet):
         mod_xgrid = xarr.reshape(1, -1, 1)
 
         if replica is None or replica == 0:
-            # We need generate output values for all replicas
-            result = np.concatenate([m.predict([mod_xgrid]) for m in self._lhapdf_set], axis=0)
+            # We need generate output values for all replicas, do it in one single call
+            if self._stacked_predict is None:
+                self._stacked_predict = stacked_prediction_function(self._lhapdf_set)
+            result = self._stacked_predict([mod_xgrid])
             if replica == 0:
                 # We want _only_ the central value
                 result = np.mean(result, axis=0, keepdims=True)
@@ -118,7 +144,17 @@ class N3LHAPDFSet(LHAPDFSet):
             result[:, :, ii] = result
         return result
 
-    def grid_values(self, flavours, xarr, qmat=None):
+    def _predict_members(self, xarr, members):
+        """Evaluate only the models of the replicas with indexes ``members``
+        with the same output as ``__call__`` with ``flavours="n3fit"``"""
+        members = tuple(members)
+        predict = self._members_predict.get(members)
+        if predict is None:
+            predict = stacked_prediction_function([self._lhapdf_set[i] for i in members])
+            self._members_predict[members] = predict
+        return predict([xarr.reshape(1, -1, 1)])
+
+    def grid_values(self, flavours, xarr, qmat=None, members=None):
         """
         Parameters
         ----------
@@ -128,6 +164,8 @@ class N3LHAPDFSet(LHAPDFSet):
                 x-points to compute, dim: (xgrid_size,)
             qmat: numpy.ndarray
                 q-points to compute (not used by n3fit, used only for shaping purposes)
+            members: list(int)
+                indexes of the replicas to return (by default all of them)
 
         Returns
         ------
@@ -135,15 +173,15 @@ class N3LHAPDFSet(LHAPDFSet):
             array of shape (replicas, flavours, xgrid_size, qmat) with the values of
                 the ``pdf_model``(s) evaluated in ``xarr``
         """
-        n3fit_result = self(xarr.reshape(1, -1, 1))
+        if members is None:
+            n3fit_result = self(xarr)
+        else:
+            n3fit_result = self._predict_members(xarr, members)
 
         # The results of n3fit are always in the 14-evolution basis used in fktables
         # the calls to grid_values always assume the result will be LHAPDF flavours
-        # we need then to rotate them to the LHAPDF-flavour basis,
-        # we don't care that much for precision here
-        to_flav = la.inv(self.basis.from_flavour_mat)
-        to_flav[np.abs(to_flav) < 1e-12] = 0.0
-        flav_result = np.tensordot(n3fit_result, to_flav, axes=(-1, 1))
+        # we need then to rotate them to the LHAPDF-flavour basis
+        flav_result = np.tensordot(n3fit_result, self._to_flav, axes=(-1, 1))
         # Now drop the indices that are not requested
         requested_flavours = [ALL_FLAVOURS.index(i) for i in flavours]
         flav_result = flav_result[..., requested_flavours]
@@ -6,27 +6,163 @@ interfaces with common Python libraries.  The integration of these objects into
 the codebase is currently work in progress, and at the moment this module
 serves as a proof of concept.
 """
-from operator import attrgetter
+import functools
+import hashlib
+import io
+import logging
+import os
+import pathlib
+import pickle
+import tempfile
 
 import pandas as pd
 
-from validphys.core import peek_commondata_metadata
 from validphys.coredata import CommonData
 
-def load_commondata(spec):
+log = logging.getLogger(__name__)
+
+#: Name of the folder, inside the validphys cache, where the parsed
+#: commondata are stored.
+COMMONDATA_CACHE_DIRNAME = "commondata"
+#: Whether :py:func:`load_commondata` uses the binary cache by default.
+USE_COMMONDATA_CACHE = True
+# Bump when the layout of the cached objects changes
+_CACHE_VERSION = 1
+
+COMMONDATA_HEADER = ('entry', 'process', 'kin1', 'kin2', 'kin3', 'data', 'stat')
+
+
+def load_commondata(spec, cache_dir=None):
     """
     Load the data corresponding to a CommonDataSpec object.
     Returns an instance of CommonData
+
+    The parsed tables are stored in a binary cache under ``cache_dir``, which
+    defaults to the ``commondata`` folder of the validphys cache (see
+    :py:meth:`validphys.loader.LoaderBase._vp_cache`). Pass
+    ``cache_dir=False``, or set :py:data:`USE_COMMONDATA_CACHE` to ``False``,
+    to always parse the text files.
     """
     commondatafile = spec.datafile
     setname = spec.name
     systypefile = spec.sysfile
 
-    commondata = parse_commondata(commondatafile, systypefile, setname)
+    if cache_dir is None and USE_COMMONDATA_CACHE:
+        cache_dir = _default_cache_dir()
+    if not cache_dir:
+        return parse_commondata(commondatafile, systypefile, setname)
+
+    cache_path = commondata_cache_path(cache_dir, commondatafile, systypefile)
+    commondata = read_commondata_cache(cache_path, commondatafile, systypefile)
+    if commondata is not None and commondata.setname == setname:
+        return commondata
 
+    commondata = parse_commondata(commondatafile, systypefile, setname)
+    try:
+        write_commondata_cache(cache_path, commondata, commondatafile, systypefile)
+    except OSError as e:
+        log.debug(f"Could not write commondata cache {cache_path}: {e}")
     return commondata
 
 
+@functools.lru_cache()
+def _default_cache_dir():
+    """Return the commondata folder in the validphys cache or ``None`` if
+    there is no usable cache"""
+    # The loader pulls in most of validphys, so import it lazily
+    from validphys.loader import Loader, LoaderError
+    try:
+        return Loader()._vp_cache() / COMMONDATA_CACHE_DIRNAME
+    except (LoaderError, KeyError) as e:
+        log.debug(f"Not caching commondata: {e}")
+        return None
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def commondata_cache_path(cache_dir, commondatafile, systypefile):
+    """Return the path of the cache file for the given pair of commondata and
+    systype files. The name only depends on the location of the files: whether
+    the cache is up to date is checked by :py:func:`read_commondata_cache`."""
+    h = hashlib.sha1()
+    for path in (commondatafile, systypefile):
+        h.update(str(pathlib.Path(path).resolve()).encode())
+        h.update(b'\0')
+    name = pathlib.Path(commondatafile).stem
+    return pathlib.Path(cache_dir) / f"{name}-{h.hexdigest()}.pkl"
+
+
+def read_commondata_cache(cache_path, commondatafile, systypefile):
+    """Return the CommonData stored in ``cache_path``, or ``None`` if the
+    cache does not exist or is stale.
+
+    The cache is valid when the modification time and size of both source
+    files match the stored ones. Otherwise the SHA1 of their contents is
+    compared, so that files which were only touched (e.g. by a new checkout)
+    do not need to be parsed again.
+    """
+    try:
+        with open(cache_path, 'rb') as f:
+            entry = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.debug(f"Ignoring unreadable commondata cache {cache_path}: {e}")
+        return None
+    if not isinstance(entry, dict) or entry.get('version') != _CACHE_VERSION:
+        return None
+
+    paths = (commondatafile, systypefile)
+    try:
+        signatures = tuple(_file_signature(p) for p in paths)
+        if signatures != entry['signatures']:
+            digests = tuple(_file_digest(p) for p in paths)
+            if digests != entry['digests']:
+                return None
+            # Same contents, only the metadata changed: refresh the entry
+            entry['signatures'] = signatures
+            _dump_atomic(cache_path, entry)
+    except OSError:
+        return None
+    return entry['commondata']
+
+
+def write_commondata_cache(cache_path, commondata, commondatafile, systypefile):
+    """Store ``commondata``, parsed from ``commondatafile`` and
+    ``systypefile``, in ``cache_path``."""
+    paths = (commondatafile, systypefile)
+    entry = {
+        'version': _CACHE_VERSION,
+        'signatures': tuple(_file_signature(p) for p in paths),
+        'digests': tuple(_file_digest(p) for p in paths),
+        'commondata': commondata,
+    }
+    _dump_atomic(cache_path, entry)
+
+
+def _dump_atomic(path, obj):
+    """Pickle ``obj`` to ``path`` so that concurrent readers never see a
+    partially written file."""
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmpname = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpname, path)
+    except BaseException:
+        os.unlink(tmpname)
+        raise
+
+
 def parse_commondata(commondatafile, systypefile, setname):
     """Parse a commondata file  and a systype file into a CommonData.
 
@@ -34,6 +170,9 @@ def parse_commondata(commondatafile, systypefile, setname):
     ----------
     commondatafile : file or path to file
     systypefile : file or path to file
+    setname : str
+        The name of the dataset, which must match the one in the header of
+        ``commondatafile``.
 
     Returns
     -------
@@ -41,13 +180,25 @@ def parse_commondata(commondatafile, systypefile, setname):
         An object containing the data and information from the commondata
         and systype files.
     """
-    # First parse commondata file
-    commondatatable = pd.read_csv(commondatafile, sep=r'\s+', skiprows=1, header=None)
+    # Read the header and the table in one go
+    if hasattr(commondatafile, 'read'):
+        text = commondatafile.read()
+    else:
+        with open(commondatafile) as f:
+            text = f.read()
+    header, _, body = text.partition('\n')
+    try:
+        name, nsys_str, ndata_str = header.split()
+        nsys_header, ndata_header = int(nsys_str), int(ndata_str)
+    except ValueError as e:
+        raise ValueError(f"Bad commondata header in {commondatafile}: {header!r}") from e
+
+    commondatatable = pd.read_csv(io.StringIO(body), sep=r'\s+', header=None)
     # Remove NaNs
     # TODO: replace commondata files with bad formatting
     # Build header
-    commondataheader = ['entry', 'process', 'kin1', 'kin2', 'kin3', 'data', 'stat']
-    nsys  = (commondatatable.shape[1] - len(commondataheader)) // 2
+    commondataheader = list(COMMONDATA_HEADER)
+    nsys = (commondatatable.shape[1] - len(commondataheader)) // 2
 
     commondataheader += ["ADD", "MULT"] * nsys
     commondatatable.columns = commondataheader
@@ -55,8 +206,7 @@ def parse_commondata(commondatafile, systypefile, setname):
     ndata = len(commondatatable)
     commondataproc = commondatatable["process"][1]
     # Check for consistency with commondata metadata
-    cdmetadata =  peek_commondata_metadata(commondatafile)
-    if (setname, nsys, ndata) != attrgetter('name', 'nsys', 'ndata')(cdmetadata):
+    if (setname, nsys, ndata) != (name, nsys_header, ndata_header):
         raise ValueError("Commondata table information does not match metadata")
 
     # Now parse the systype file
@@ -73,6 +223,7 @@ def parse_commondata(commondatafile, systypefile, setname):
         systype_table=systypetable
     )
 
+
 def parse_systypes(systypefile):
     """Parses a systype file and returns a pandas dataframe.
     """
@@ -35,16 +35,28 @@ These functions work with :py:class:`validphys.core.DatasetSpec` objects,
 allowing to account for information on COMPOUND predictions and cuts. A lower
 level interface which operates with :py:class:`validphys.coredata.FKTableData`
 objects is also available.
+
+The convolutions are computed with a sparse representation of the FKTable,
+:py:class:`SparseFKKernel`, which is built once per
+:py:class:`validphys.coredata.FKTableData` object. The full luminosity tensor
+is never materialised: hadronic predictions are computed as a sparse matrix
+product with the second PDF followed by a segmented reduction over data points.
 """
+import concurrent.futures
 import operator
 import functools
+import logging
+import time
+import weakref
 
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 
 from validphys.pdfbases import evolution
 from validphys.fkparser import load_fktable
 
+log = logging.getLogger(__name__)
 
 FK_FLAVOURS = evolution.to_known_elements(
     [
@@ -97,13 +109,7 @@ OP = {
 
 class PredictionsRequireCutsError(Exception): pass
 
-def _predictions(dataset, pdf, fkfunc):
-    """Combine data on all the FKTables in the database according to the
-    reduction operation defined therein. Dispatch the kind of predictions (for
-    all replicas, central, etc) according to the provided ``fkfunc``, which
-    should have the same interface as e.g. ``fk_predictions``.
-    """
-    opfunc = OP[dataset.op]
+def _check_cuts(dataset):
     if dataset.cuts is None:
         raise PredictionsRequireCutsError(
             "FKTables do not always generate predictions for some datapoints "
@@ -111,6 +117,15 @@ def _predictions(dataset, pdf, fkfunc):
             "therefore produce predictions whose shape doesn't match the uncut "
             "commondata and is not supported."
         )
+
+def _predictions(dataset, pdf, fkfunc):
+    """Combine data on all the FKTables in the database according to the
+    reduction operation defined therein. Dispatch the kind of predictions (for
+    all replicas, central, etc) according to the provided ``fkfunc``, which
+    should have the same interface as e.g. ``fk_predictions``.
+    """
+    opfunc = OP[dataset.op]
+    _check_cuts(dataset)
     cuts = dataset.cuts.load()
     all_predictions = [
         fkfunc(load_fktable(fk).with_cuts(cuts), pdf) for fk in dataset.fkspecs
@@ -118,7 +133,135 @@ def _predictions(dataset, pdf, fkfunc):
     return opfunc(*all_predictions)
 
 
-def predictions(dataset, pdf):
+def _chunked_fk_predictions(fkfunc, member_chunk_size, loaded_fk, pdf):
+    """Same as ``fkfunc(loaded_fk, pdf)``, but evaluating at most
+    ``member_chunk_size`` PDF members at a time, so that the peak memory
+    usage does not grow with the number of members. ``fkfunc`` must accept a
+    ``members`` keyword argument with the indexes of the members to compute.
+    The results of each chunk are written into a preallocated DataFrame."""
+    if member_chunk_size < 1:
+        raise ValueError("member_chunk_size must be a positive integer")
+    nmembers = pdf.get_members()
+    res = None
+    for start in range(0, nmembers, member_chunk_size):
+        members = range(start, min(start + member_chunk_size, nmembers))
+        chunk = fkfunc(loaded_fk, pdf, members=members)
+        if res is None:
+            res = pd.DataFrame(
+                np.empty((len(chunk), nmembers)), index=chunk.index, columns=range(nmembers)
+            )
+        res.iloc[:, members.start:members.stop] = chunk.to_numpy()
+    return res
+
+
+def _chunked_predictions(dataset, pdf, fkfunc, member_chunk_size):
+    """Same as :py:func:`_predictions`, but evaluating at most
+    ``member_chunk_size`` PDF members at a time (see
+    :py:func:`_chunked_fk_predictions`)."""
+    if member_chunk_size is None:
+        return _predictions(dataset, pdf, fkfunc)
+    return _predictions(
+        dataset, pdf, functools.partial(_chunked_fk_predictions, fkfunc, member_chunk_size)
+    )
+
+
+def _timed_fk_predictions(fkfunc, loaded_fk, pdf):
+    start = time.perf_counter()
+    res = fkfunc(loaded_fk, pdf)
+    return res, time.perf_counter() - start
+
+
+def group_predictions(group, pdf, fkfunc=None, max_workers=None, member_chunk_size=None):
+    """Compute the predictions for all the datasets in ``group``, scheduling
+    the convolution of each FKTable in a thread pool. Since the bulk of the
+    computation happens in numerical libraries that release the GIL, the
+    convolutions of different FKTables can run concurrently. The reduction
+    operation of each dataset (see :py:data:`OP`) is applied once all its
+    FKTables are computed.
+
+    The FKTables are loaded, cut and converted to their sparse kernels in the
+    calling thread, so that the caches of :py:func:`load_fktable`,
+    :py:meth:`validphys.coredata.FKTableData.with_cuts` and
+    :py:func:`sparse_fk_kernel` are only ever modified from one thread. The
+    evaluation of the PDF grids is serialised by
+    :py:data:`validphys.gridvalues.LHAPDF_LOCK`, since the LHAPDF objects are
+    shared by all the workers. Only the convolutions run concurrently.
+
+    Parameters
+    ----------
+    group : validphys.core.DataGroupSpec
+        The group of datasets for which to compute the predictions.
+    pdf : validphys.core.PDF
+        The PDF set to use for the convolutions.
+    fkfunc : callable, optional
+        The function computing the predictions for a single FKTable. By
+        default :py:func:`fk_predictions` is used. Pass e.g.
+        :py:func:`central_fk_predictions` to compute central predictions.
+    max_workers : int, optional
+        The number of threads in the pool. By default this is chosen by
+        :py:class:`concurrent.futures.ThreadPoolExecutor`.
+    member_chunk_size : int, optional
+        If given, each FKTable is convolved with at most this many PDF members
+        at a time (see :py:func:`predictions`). ``fkfunc`` must then accept a
+        ``members`` keyword argument.
+
+    Returns
+    -------
+    predictions : list of pd.DataFrame
+        The predictions for each dataset in the group, in the same order as
+        ``group.datasets``.
+    timings : pd.Series
+        The time in seconds spent computing the predictions for each dataset,
+        which is the sum of the time spent on each of its FKTables and on the
+        reduction operation. The time is also reported in the log.
+    """
+    if fkfunc is None:
+        fkfunc = fk_predictions
+    if member_chunk_size is not None:
+        fkfunc = functools.partial(_chunked_fk_predictions, fkfunc, member_chunk_size)
+    datasets = group.datasets
+    for dataset in datasets:
+        _check_cuts(dataset)
+    # Load the PDF and the FKTables in the main thread so that they are not
+    # loaded concurrently by the workers.
+    pdf.load()
+    tables = []
+    load_times = []
+    for dataset in datasets:
+        start = time.perf_counter()
+        cuts = dataset.cuts.load()
+        dataset_tables = [load_fktable(fk).with_cuts(cuts) for fk in dataset.fkspecs]
+        for table in dataset_tables:
+            sparse_fk_kernel(table)
+        tables.append(dataset_tables)
+        load_times.append(time.perf_counter() - start)
+    results = []
+    times = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            [
+                executor.submit(_timed_fk_predictions, fkfunc, table, pdf)
+                for table in dataset_tables
+            ]
+            for dataset_tables in tables
+        ]
+        for dataset, dataset_futures, load_time in zip(datasets, futures, load_times):
+            all_predictions, fktimes = zip(*(f.result() for f in dataset_futures))
+            start = time.perf_counter()
+            results.append(OP[dataset.op](*all_predictions))
+            elapsed = load_time + sum(fktimes) + time.perf_counter() - start
+            log.info(
+                "Computed predictions for %s (%d FKTables) in %.2f s",
+                dataset.name,
+                len(dataset_futures),
+                elapsed,
+            )
+            times.append(elapsed)
+    timings = pd.Series(times, index=[ds.name for ds in datasets], name="time")
+    return results, timings
+
+
+def predictions(dataset, pdf, member_chunk_size=None):
     """"Compute theory predictions for a given PDF and dataset. Information
     regading the dataset, on cuts, CFactors and combinations of FKTables is
     taken into account to construct the predictions.
@@ -132,6 +275,11 @@ def predictions(dataset, pdf):
         The dataset containing information on the partonic cross section.
     pdf : validphys.core.PDF
         The PDF set to use for the convolutions.
+    member_chunk_size : int, optional
+        If given, the PDF members are evaluated and convolved in batches of at
+        most this size, which bounds the peak memory usage for sets with many
+        members. The results are identical to those computed with all the
+        members at once.
 
     Returns
     -------
@@ -166,7 +314,7 @@ def predictions(dataset, pdf):
 
 
     """
-    return _predictions(dataset, pdf, fk_predictions)
+    return _chunked_predictions(dataset, pdf, fk_predictions, member_chunk_size)
 
 
 def central_predictions(dataset, pdf):
@@ -179,7 +327,7 @@ def central_predictions(dataset, pdf):
     return _predictions(dataset, pdf, central_fk_predictions)
 
 
-def linear_predictions(dataset, pdf):
+def linear_predictions(dataset, pdf, member_chunk_size=None):
     """Same as :py:func:`predictions` but computing *linearized* predictions.
     These are the same as ``predictions`` for DIS, but truncates to the terms
     that are linear in the difference between each member and the central
@@ -188,10 +336,10 @@ def linear_predictions(dataset, pdf):
     This approximation is generally a very good approximation in that yields
     differences that are much smaller that the PDF uncertainty.
     """
-    return _predictions(dataset, pdf, linear_fk_predictions)
+    return _chunked_predictions(dataset, pdf, linear_fk_predictions, member_chunk_size)
 
 
-def fk_predictions(loaded_fk, pdf):
+def fk_predictions(loaded_fk, pdf, members=None):
     """Low level function to compute predictions from a
     FKTable.
 
@@ -201,6 +349,9 @@ def fk_predictions(loaded_fk, pdf):
         The FKTable corresponding to the partonic cross section.
     pdf :  validphys.core.PDF
         The PDF set to use for the convolutions.
+    members : iterable, optional
+        The indexes of the PDF members to use. By default all the members of
+        the set are used.
 
     Returns
     -------
@@ -236,9 +387,9 @@ def fk_predictions(loaded_fk, pdf):
 
     """
     if loaded_fk.hadronic:
-        return hadron_predictions(loaded_fk, pdf)
+        return hadron_predictions(loaded_fk, pdf, members)
     else:
-        return dis_predictions(loaded_fk, pdf)
+        return dis_predictions(loaded_fk, pdf, members)
 
 
 def central_fk_predictions(loaded_fk, pdf):
@@ -250,14 +401,143 @@ def central_fk_predictions(loaded_fk, pdf):
         return central_dis_predictions(loaded_fk, pdf)
 
 
-def linear_fk_predictions(loaded_fk, pdf):
+def linear_fk_predictions(loaded_fk, pdf, members=None):
     """Same as :py:func:`predictions` for DIS, but compute linearized
     predictions for hadronic data, using :py:func:`linear_hadron_predictions`.
     """
     if loaded_fk.hadronic:
-        return linear_hadron_predictions(loaded_fk, pdf)
+        return linear_hadron_predictions(loaded_fk, pdf, members)
     else:
-        return dis_predictions(loaded_fk, pdf)
+        return dis_predictions(loaded_fk, pdf, members)
+
+
+class SparseFKKernel:
+    """Sparse representation of the non zero entries of an FKTable, suitable
+    for computing convolutions without materialising the luminosity tensor.
+
+    For DIS tables, the kernel is a CSR matrix of shape ``(ndata, nfl*nx)`` and
+    predictions are computed as a single matrix product with the PDF grid.
+
+    For hadronic tables, the entries are grouped into rows labeled by
+    ``(data, flavour1, x1)``, with columns labeled by ``(flavour2, x2)``.
+    The predictions are computed by first contracting the kernel with the grid
+    of the second PDF, then multiplying with the grid of the first PDF gathered
+    at the row labels and finally summing the rows corresponding to each data
+    point.
+
+    Attributes
+    ----------
+    hadronic : bool
+        Whether the kernel corresponds to a hadronic table.
+    flavours : np.ndarray
+        Indexes into :py:data:`FK_FLAVOURS` of the flavours that are needed to
+        compute the convolution. The PDF grids passed to
+        :py:meth:`SparseFKKernel.convolve` must be evaluated for these
+        flavours, in the same order.
+    data : pd.Index
+        The data indexes (the outermost level of the sigma index) for which
+        there are predictions. Data points whose entries are all zero are
+        included, with a prediction of zero.
+    """
+
+    def __init__(self, loaded_fk):
+        sigma = loaded_fk.sigma
+        nx = len(loaded_fk.xgrid)
+        values = sigma.to_numpy(dtype=float)
+        rows, cols = np.nonzero(values)
+        vals = values[rows, cols]
+        index_levels = [
+            sigma.index.get_level_values(i).to_numpy() for i in range(sigma.index.nlevels)
+        ]
+        d = index_levels[0][rows]
+        # All the data points of the table, including those with no non zero
+        # entries, for which the prediction is zero.
+        data = np.unique(index_levels[0])
+        fm = np.asarray(sigma.columns)
+        self.hadronic = loaded_fk.hadronic
+        self.nx = nx
+        if self.hadronic:
+            x1 = index_levels[1][rows]
+            x2 = index_levels[2][rows]
+            # The hadronic FK table columns are indexes into the NFK*NFK table
+            # of possible flavour combinations of the two PDFs, with the
+            # convention of looping first of the first index and the over the
+            # second: If the flavour index of the first PDF is ``i`` and the
+            # second is ``j``, then the column value in the FKTable is
+            # ``i*NFK + j``.
+            fl1, fl2 = np.divmod(fm, NFK)
+            self.flavours = np.unique(np.concatenate([fl1, fl2]))
+            nfl = len(self.flavours)
+            # Flavour indexes relative to ``self.flavours`` for each entry
+            f1 = np.searchsorted(self.flavours, fl1)[cols]
+            f2 = np.searchsorted(self.flavours, fl2)[cols]
+            keys = (d * nfl + f1) * nx + x1
+            ukeys, key_rows = np.unique(keys, return_inverse=True)
+            self.matrix = sp.csr_matrix(
+                (vals, (key_rows, f2 * nx + x2)), shape=(len(ukeys), nfl * nx)
+            )
+            key_data, key_rest = np.divmod(ukeys, nfl * nx)
+            self.row_flavours, self.row_x = np.divmod(key_rest, nx)
+            # The keys are sorted by data index so the rows for each data
+            # point are contiguous.
+            nonzero_data, self.segments = np.unique(key_data, return_index=True)
+            # Position in ``data`` of the data points with some non zero entry
+            self.nonzero_positions = np.searchsorted(data, nonzero_data)
+        else:
+            x = index_levels[1][rows]
+            # The column indexes are indices into the FK_FLAVOURS list.
+            self.flavours = fm
+            nfl = len(self.flavours)
+            data_rows = np.searchsorted(data, d)
+            self.matrix = sp.csr_matrix(
+                (vals, (data_rows, cols * nx + x)), shape=(len(data), nfl * nx)
+            )
+        self.data = pd.Index(data, name=sigma.index.names[0])
+
+    def convolve(self, gv1, gv2=None):
+        """Compute the convolution of the kernel with the PDF grids.
+
+        Parameters
+        ----------
+        gv1 : np.ndarray, shape (nmembers, len(self.flavours), nx)
+            The values of the (first) PDF for the flavours in
+            ``self.flavours``.
+        gv2 : np.ndarray, optional
+            The values of the second PDF for hadronic kernels. If not given,
+            ``gv1`` is used. It is ignored for DIS kernels. The member
+            dimension of ``gv1`` is broadcast against this one, so it can
+            have length one.
+
+        Returns
+        -------
+        res : np.ndarray, shape (ndata, nmembers)
+            The predictions for each data point in ``self.data`` and each
+            member.
+        """
+        if not self.hadronic:
+            return self.matrix @ gv1.reshape(len(gv1), -1).T
+        if gv2 is None:
+            gv2 = gv1
+        partial = self.matrix @ gv2.reshape(len(gv2), -1).T
+        res = np.zeros((len(self.data), partial.shape[1]))
+        if not len(partial):
+            return res
+        partial *= gv1[:, self.row_flavours, self.row_x].T
+        res[self.nonzero_positions] = np.add.reduceat(partial, self.segments, axis=0)
+        return res
+
+
+_KERNELS = weakref.WeakKeyDictionary()
+
+
+def sparse_fk_kernel(loaded_fk):
+    """Return the :py:class:`SparseFKKernel` corresponding to ``loaded_fk``.
+    The result is cached for as long as the FKTable object is alive."""
+    try:
+        return _KERNELS[loaded_fk]
+    except KeyError:
+        kernel = _KERNELS[loaded_fk] = SparseFKKernel(loaded_fk)
+        return kernel
 
 
 def _gv_hadron_predictions(loaded_fk, gv1func, gv2func=None):
@@ -270,76 +550,39 @@ def _gv_hadron_predictions(loaded_fk, gv1func, gv2func=None):
     If gv2func is not given, then gv1func will be used for the second PDF,
     with the grid being evaluated only once.
     """
+    kernel = sparse_fk_kernel(loaded_fk)
     xgrid = loaded_fk.xgrid
     Q = loaded_fk.Q0
-    sigma = loaded_fk.sigma
-
-    # Generate gid values for all flavours in the evolution basis, in the
-    # expected order.
-    #
+    vmat = FK_FLAVOURS[kernel.flavours]
     # Squeeze to remove the dimension over Q.
-    gv1 = gv1func(qmat=[Q], vmat=FK_FLAVOURS, xmat=xgrid).squeeze(-1)
+    gv1 = gv1func(qmat=[Q], vmat=vmat, xmat=xgrid).squeeze(-1)
     if gv2func is not None:
-        gv2 = gv2func(qmat=[Q], vmat=FK_FLAVOURS, xmat=xgrid).squeeze(-1)
+        gv2 = gv2func(qmat=[Q], vmat=vmat, xmat=xgrid).squeeze(-1)
     else:
         gv2 = gv1
-
-    # The hadronic FK table columns are indexes into the NFK*NFK table of
-    # possible flavour combinations of the two PDFs, with the convention of
-    # looping first of the first index and the over the second: If the flavour
-    # index of the first PDF is ``i`` and the second is ``j``, then the column
-    # value in the FKTable is ``i*NFK + j``. This can easily be inverted using
-    # the ``np.indices``, which is used here to map the column index to i and
-    # j.
-    fm = sigma.columns
-    all_fl_indices_1, all_fl_indices_2 = np.indices((NFK, NFK))
-    # The flavour indices of the first and second PDF for each combination
-    # (column) are the columns indexing into the flattened indices.
-    fl1 = all_fl_indices_1.ravel()[fm]
-    fl2 = all_fl_indices_2.ravel()[fm]
-    # Once we have the flavours, shape the PDF grids as appropriate for the
-    # convolution below: We are left with two tensor of shape
-    # ``nmembers * len(sigma.columns) * nx`` such that the pairs of flavours of the two
-    # combinations correspond to the combination encoded in the FKTable.
-    expanded_gv1 = gv1[:, fl1, :]
-    expanded_gv2 = gv2[:, fl2, :]
-    # Create a luminosity tensor holding the value f1(x1)*f2(x2) for all
-    # possible x1-x2 combinations (f1, f2, x1, x2)
-    luminosity = np.einsum("ijk, ijl->ijkl", expanded_gv1, expanded_gv2)
-
-    def appl(df):
-        # x1 and x2 are encoded as the first and second index levels.
-        xx1 = df.index.get_level_values(1)
-        xx2 = df.index.get_level_values(2)
-        # take the active combinations from the luminosity tensor
-        partial_lumi = luminosity[..., xx1, xx2]
-        return pd.Series(np.einsum("ijk,kj->i",partial_lumi, df.values))
-
-    return sigma.groupby(level=0).apply(appl)
+    return pd.DataFrame(kernel.convolve(gv1, gv2), index=kernel.data)
 
 
 def _gv_dis_predictions(loaded_fk, gvfunc):
+    kernel = sparse_fk_kernel(loaded_fk)
     xgrid = loaded_fk.xgrid
     Q = loaded_fk.Q0
-    sigma = loaded_fk.sigma
-    # The column indexes are indices into the FK_FLAVOURS list above.
-    fm = sigma.columns
     # Squeeze to remove the dimension over Q.
-    gv = gvfunc(qmat=[Q], vmat=FK_FLAVOURS[fm], xmat=xgrid).squeeze(-1)
+    gv = gvfunc(qmat=[Q], vmat=FK_FLAVOURS[kernel.flavours], xmat=xgrid).squeeze(-1)
+    return pd.DataFrame(kernel.convolve(gv), index=kernel.data)
 
-    def appl(df):
-        # x is encoded as the first index level.
-        xind = df.index.get_level_values(1)
-        return pd.Series(np.einsum("ijk,kj->i", gv[:, :, xind], df.values))
 
-    return sigma.groupby(level=0).apply(appl)
+def _member_columns(pdf, members):
+    if members is None:
+        return range(pdf.get_members())
+    return members
 
 
-def hadron_predictions(loaded_fk, pdf):
+def hadron_predictions(loaded_fk, pdf, members=None):
     """Implementation of :py:func:`fk_predictions` for hadronic observables."""
-    gv = functools.partial(evolution.grid_values, pdf=pdf)
+    gv = functools.partial(evolution.grid_values, pdf=pdf, members=members)
     res = _gv_hadron_predictions(loaded_fk, gv)
-    res.columns = range(pdf.get_members())
+    res.columns = _member_columns(pdf, members)
     return res
 
 
@@ -350,7 +593,7 @@ def central_hadron_predictions(loaded_fk, pdf):
     return _gv_hadron_predictions(loaded_fk, gv)
 
 
-def linear_hadron_predictions(loaded_fk, pdf):
+def linear_hadron_predictions(loaded_fk, pdf, members=None):
     """Implementation of :py:func:`linear_fk_predictions` for hadronic
     observables. Specifically this computes:
 
@@ -363,20 +606,20 @@ def linear_hadron_predictions(loaded_fk, pdf):
     gv1 = functools.partial(evolution.central_grid_values, pdf=pdf)
 
     def gv2(*args, **kwargs):
-        replica_values = evolution.grid_values(pdf, *args, **kwargs)
+        replica_values = evolution.grid_values(pdf, *args, members=members, **kwargs)
         central_value = evolution.central_grid_values(pdf, *args, **kwargs)
         return 2 * replica_values - central_value
 
     res = _gv_hadron_predictions(loaded_fk, gv1, gv2)
-    res.columns = range(pdf.get_members())
+    res.columns = _member_columns(pdf, members)
     return res
 
 
-def dis_predictions(loaded_fk, pdf):
+def dis_predictions(loaded_fk, pdf, members=None):
     """Implementation of :py:func:`fk_predictions` for DIS observables."""
-    gv = functools.partial(evolution.grid_values, pdf=pdf)
+    gv = functools.partial(evolution.grid_values, pdf=pdf, members=members)
     res = _gv_dis_predictions(loaded_fk, gv)
-    res.columns = range(pdf.get_members())
+    res.columns = _member_columns(pdf, members)
     return res
 
 
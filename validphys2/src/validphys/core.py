@@ -13,7 +13,6 @@ import re
 import enum
 import functools
 import inspect
-import json
 import logging
 from pathlib import Path
 
@@ -36,7 +35,7 @@ from NNPDF import (LHAPDFSet as libNNPDF_LHAPDFSet,
 from validphys import lhaindex, filters
 from validphys.tableloader import parse_exp_mat
 from validphys.theorydbutils import fetch_theory
-from validphys.hyperoptplot import HyperoptTrial
+from validphys.hyperoptplot import HyperoptTrial, find_tries_file, read_tries
 from validphys.utils import experiments_to_dataset_inputs
 from validphys.lhapdfset import LHAPDFSet
 
@@ -373,6 +372,11 @@ class Cuts(TupleComp):
         log.debug("Loading cuts for %s", self.name)
         return np.atleast_1d(np.loadtxt(self.path, dtype=int))
 
+# Internal cuts already computed in this process. Note that the key cannot be
+# the InternalCutsWrapper itself since the equality of the rules ignores
+# some of their properties, such as the defaults.
+_INTERNAL_CUTS = {}
+
 class InternalCutsWrapper(TupleComp):
     def __init__(self, commondata, rules):
         self.rules = rules
@@ -380,10 +384,16 @@ class InternalCutsWrapper(TupleComp):
         super().__init__(commondata, tuple(rules))
 
     def load(self):
-        return np.atleast_1d(
-            np.asarray(
-                filters.get_cuts_for_dataset(self.commondata, self.rules),
-                dtype=int))
+        """Return the indexes of the points passing the rules. The result is
+        computed once per process and stored on disk (see
+        :py:func:`validphys.filters.load_internal_cuts`)."""
+        key = (self.commondata, tuple(rule._cache_properties for rule in self.rules))
+        try:
+            cuts = _INTERNAL_CUTS[key]
+        except KeyError:
+            cuts = np.atleast_1d(filters.load_internal_cuts(self.commondata, self.rules))
+            _INTERNAL_CUTS[key] = cuts
+        return cuts.copy()
 
 class MatchedCuts(TupleComp):
     def __init__(self, othercuts, ndata):
@@ -654,16 +664,17 @@ class HyperscanSpec(FitSpec):
 
     @property
     def tries_files(self):
-        """Return a dictionary with all tries.json files mapped to their replica number"""
+        """Return a dictionary with all tries files mapped to their replica number
+        (``tries.jsonl`` or, for older scans, ``tries.json``)"""
         if self._tries_files is None:
             re_idx = re.compile(r"(?<=replica_)\d+$")
             get_idx = lambda x: int(re_idx.findall(x.as_posix())[-1])
             all_rep = map(get_idx, self.path.glob("nnfit/replica_*"))
-            # Now loop over all replicas and save them when they include a tries.json file
+            # Now loop over all replicas and save them when they include a tries file
             tries = {}
             for idx in sorted(all_rep):
-                test_path = self.path / f"nnfit/replica_{idx}/tries.json"
-                if test_path.exists():
+                test_path = find_tries_file(self.path / f"nnfit/replica_{idx}")
+                if test_path is not None:
                     tries[idx] = test_path
             self._tries_files = tries
         return self._tries_files
@@ -677,17 +688,16 @@ class HyperscanSpec(FitSpec):
         """
         all_trials = []
         for trial_file in self.tries_files.values():
-            with open(trial_file, "r") as tf:
-                run_trials = []
-                for trial in json.load(tf):
-                    trial = HyperoptTrial(trial, base_params=base_params, linked_trials=run_trials)
-                    run_trials.append(trial)
+            run_trials = []
+            for trial in read_tries(trial_file):
+                trial = HyperoptTrial(trial, base_params=base_params, linked_trials=run_trials)
+                run_trials.append(trial)
             all_trials += run_trials
         return all_trials
 
     def sample_trials(self, n=None, base_params=None, sigma=4.0):
         """Parse all trials in the hyperscan object
-        and then return an array of ``n`` trials read from the ``tries.json`` files
+        and then return an array of ``n`` trials read from the tries files
         and sampled according to their reward.
         If ``n`` is ``None``, no sapling is performed and all trials are returned
 
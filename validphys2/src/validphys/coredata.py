@@ -5,9 +5,16 @@ wrappers.
 
 """
 import dataclasses
+import functools
+import hashlib
+import weakref
+
 import numpy as np
 import pandas as pd
 
+# Tables with cuts applied, keyed by the original table and then by the cuts
+_CUT_TABLES = weakref.WeakKeyDictionary()
+
 
 @dataclasses.dataclass(eq=False)
 class FKTableData:
@@ -59,6 +66,12 @@ class FKTableData:
         that have been kept. The ndata property is updated to reflect the new
         number of datapoints. If cuts is None, return the object unmodified.
 
+        The rows of each data point are located using :py:attr:`data_offsets`,
+        so that a set of contiguous data points is selected without copying
+        ``sigma``. The result is cached for as long as the original table is
+        alive, so applying the same cuts again is free. The returned tables
+        share memory with the original and should not be modified in place.
+
         Parameters
         ----------
         cuts : array_like or validphys.core.Cuts or None.
@@ -91,9 +104,56 @@ class FKTableData:
             cuts = cuts.load()
         if cuts is None:
             return self
+        cuts = np.asarray(cuts)
+        key = hashlib.sha1(np.ascontiguousarray(cuts, dtype=np.int64)).hexdigest()
+        cache = _CUT_TABLES.setdefault(self, {})
+        try:
+            return cache[key]
+        except KeyError:
+            pass
         newndata = len(cuts)
-        newsigma = self.sigma.loc[cuts]
-        return dataclasses.replace(self, ndata=newndata, sigma=newsigma)
+        newsigma = self._select_data(cuts)
+        res = cache[key] = dataclasses.replace(self, ndata=newndata, sigma=newsigma)
+        return res
+
+    @functools.cached_property
+    def data_offsets(self):
+        """The data points present in ``sigma`` and the positions where the
+        rows of each of them start, like the row pointers of a CSR matrix:
+        the rows of the ``i``-th data point are ``offsets[i]:offsets[i+1]``.
+
+        Returns
+        -------
+        points: pd.Index
+            The data indexes, sorted.
+        offsets: np.ndarray
+            Array of length ``len(points) + 1``.
+
+        If the rows of ``sigma`` are not sorted by data index, ``None`` is
+        returned instead.
+        """
+        data = self.sigma.index.get_level_values(0)
+        if not data.is_monotonic_increasing:
+            return None
+        points, starts = np.unique(data, return_index=True)
+        return pd.Index(points), np.append(starts, len(data))
+
+    def _select_data(self, cuts):
+        """Equivalent to ``self.sigma.loc[cuts]``"""
+        if self.data_offsets is None:
+            return self.sigma.loc[cuts]
+        points, offsets = self.data_offsets
+        pos = points.get_indexer(cuts)
+        if (pos < 0).any():
+            raise KeyError(f"{cuts[pos < 0].tolist()} not in index")
+        if len(pos) and np.all(np.diff(pos) == 1):
+            # A range of data points is a range of rows: take a view
+            return self.sigma.iloc[offsets[pos[0]] : offsets[pos[-1] + 1]]
+        starts = offsets[pos]
+        lengths = offsets[pos + 1] - starts
+        # Concatenate the row ranges of all the selected points
+        rows = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.sigma.take(rows)
 
 
 @dataclasses.dataclass(eq=False)
@@ -2,8 +2,14 @@
 Filters for NNPDF fits
 """
 
+import ast
+import functools
+import hashlib
 import logging
+import os
+import pathlib
 import re
+import tempfile
 from collections.abc import Mapping
 from importlib.resources import read_text
 
@@ -16,6 +22,13 @@ import validphys.cuts
 
 log = logging.getLogger(__name__)
 
+#: Name of the folder, inside the validphys cache, where the internal cuts are stored.
+CUTS_CACHE_DIRNAME = "cuts"
+#: Whether :py:func:`load_internal_cuts` uses the on-disk cache by default.
+USE_CUTS_CACHE = True
+# Bump when the rules engine or the layout of the cache changes
+_CUTS_CACHE_VERSION = 1
+
 class RuleProcessingError(Exception):
     """Exception raised when we couldn't process a rule."""
 
@@ -209,6 +222,127 @@ def check_integrability(integdatasets):
         integ.load()
         log.info(f'{integ.name} checked.')
 
+def _truth(value):
+    """Elementwise truth value of ``value``, as given by ``bool``"""
+    return np.asarray(value).astype(bool)
+
+
+#: Functions replacing the operators that can't be applied on arrays,
+#: reproducing the (non short-circuiting) result of the python operators.
+_VECTORISED_OPERATIONS = {
+    "__vectorised_and__": lambda x, y: np.where(_truth(x), y, x),
+    "__vectorised_or__": lambda x, y: np.where(_truth(x), x, y),
+    "__vectorised_not__": np.logical_not,
+    "__vectorised_ifexp__": lambda test, body, orelse: np.where(_truth(test), body, orelse),
+}
+
+
+class _NotVectorisable(Exception):
+    """Exception raised when an expression cannot be evaluated on arrays."""
+
+
+class _VectorisingTransformer(ast.NodeTransformer):
+    """Rewrite the AST of a rule (or local variable) expression such that
+    it can be evaluated on arrays with all the points of a dataset at once.
+
+    The boolean operators (``and``, ``or``, ``not``), chained comparisons and
+    conditional expressions are replaced by calls to the functions in
+    :py:data:`_VECTORISED_OPERATIONS`. Any construct not known to give the
+    same result for arrays and scalars raises :py:class:`_NotVectorisable`.
+    """
+
+    allowed_nodes = (
+        ast.Expression,
+        ast.BinOp,
+        ast.UnaryOp,
+        ast.Name,
+        ast.Load,
+        ast.Add,
+        ast.Sub,
+        ast.Mult,
+        ast.Div,
+        ast.Pow,
+        ast.USub,
+        ast.UAdd,
+        ast.Constant,
+    )
+    allowed_comparisons = (ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+    @staticmethod
+    def _call(name, *args):
+        return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=list(args), keywords=[])
+
+    def generic_visit(self, node):
+        if not isinstance(node, self.allowed_nodes):
+            raise _NotVectorisable(f"Unsupported expression {type(node).__name__}")
+        return super().generic_visit(node)
+
+    def visit_BoolOp(self, node):
+        name = "__vectorised_and__" if isinstance(node.op, ast.And) else "__vectorised_or__"
+        values = [self.visit(i) for i in node.values]
+        # Fold from the right, as python does
+        result = values[-1]
+        for value in reversed(values[:-1]):
+            result = self._call(name, value, result)
+        return result
+
+    def visit_UnaryOp(self, node):
+        if isinstance(node.op, ast.Not):
+            return self._call("__vectorised_not__", self.visit(node.operand))
+        return self.generic_visit(node)
+
+    def visit_Compare(self, node):
+        operands = [self.visit(i) for i in (node.left, *node.comparators)]
+        comparisons = []
+        for op, left, right in zip(node.ops, operands[:-1], operands[1:]):
+            if not isinstance(op, self.allowed_comparisons):
+                raise _NotVectorisable(f"Unsupported comparison {type(op).__name__}")
+            comparisons.append(ast.Compare(left=left, ops=[op], comparators=[right]))
+        result = comparisons[-1]
+        for comparison in reversed(comparisons[:-1]):
+            result = self._call("__vectorised_and__", comparison, result)
+        return result
+
+    def visit_IfExp(self, node):
+        return self._call(
+            "__vectorised_ifexp__", self.visit(node.test), self.visit(node.body), self.visit(node.orelse)
+        )
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.keywords:
+            raise _NotVectorisable("Only calls to functions with positional arguments are supported")
+        node.args = [self.visit(i) for i in node.args]
+        return node
+
+
+def _vectorise_expression(expression, filename):
+    """Compile ``expression`` such that it can be evaluated on arrays (see
+    :py:class:`_VectorisingTransformer`), or return ``None`` if that is not possible."""
+    try:
+        tree = _VectorisingTransformer().visit(ast.parse(str(expression), mode="eval"))
+    except _NotVectorisable as e:
+        log.debug("The expression %r cannot be vectorised: %s", expression, e)
+        return None
+    return compile(ast.fix_missing_locations(tree), filename, "eval")
+
+
+class DatasetColumns:
+    """Columnar view of a (loaded) CommonData. The kinematics, central values and
+    process types of all the points are loaded once as arrays, such that the cut
+    rules can be applied to all the points at once (see :py:meth:`Rule.vectorised_call`).
+    """
+
+    def __init__(self, dataset):
+        self.setname = dataset.GetSetName()
+        self.ndata = dataset.GetNData()
+        self.idat = np.arange(self.ndata)
+        self.kinematics = np.asarray(dataset.get_kintable()).reshape(self.ndata, 3)
+        self.central_value = np.asarray(dataset.get_cv())
+        processes = [dataset.GetProc(idat) for idat in range(self.ndata)]
+        self.process_types = np.array(processes, dtype=object)
+        self.is_dis = np.array([proc[:3] == "DIS" for proc in processes], dtype=bool)
+
+
 class PerturbativeOrder:
     """Class that conveniently handles
     perturbative order declarations for use
@@ -408,6 +542,14 @@ class Rule:
                     f"Could not process rule {self.rule_string!r}: Unknown name {name!r}"
                 )
 
+        # Versions of the rule and local variables which can be evaluated on arrays
+        self._vectorised_rule = _vectorise_expression(self.rule_string, "rule")
+        self._vectorised_local_variables_code = {}
+        for k, v in self.local_variables.items():
+            self._vectorised_local_variables_code[k] = _vectorise_expression(v, f"local variable {k}")
+        if None in self._vectorised_local_variables_code.values():
+            self._vectorised_rule = None
+
     @property
     def _properties(self):
         """Attributes of the Rule class that are defining. Two
@@ -418,6 +560,26 @@ class Rule:
     def __eq__(self, other):
         return self._properties == other._properties
 
+    @property
+    def _cache_properties(self):
+        """Everything other than the dataset the result of the rule depends on:
+        the rule, the local variables, the theory parameters checked by the rule
+        (and their values) and the defaults."""
+        theory_requirements = []
+        for k, v in self.theory_params.items():
+            if k == "PTO" and hasattr(self, "PTO"):
+                theory_requirements.append((k, self.PTO.string, v))
+            elif k != "PTO" and hasattr(self, k):
+                theory_requirements.append((k, getattr(self, k), v))
+        return (
+            self.rule_string,
+            self.dataset,
+            self.process_type,
+            tuple((k, str(v)) for k, v in self.local_variables.items()),
+            tuple(theory_requirements),
+            tuple(sorted(self.defaults.items())),
+        )
+
     def __hash__(self):
         return hash(self._properties)
 
@@ -463,6 +625,54 @@ class Rule:
                 f"Error when applying rule {self.rule_string!r}: {e}"
             ) from e
 
+    def applies(self, columns):
+        """Return a boolean array with the points of the ``columns``
+        (:py:class:`DatasetColumns`) for which ``__call__`` would not
+        return ``None``."""
+        for k, v in self.theory_params.items():
+            if k == "PTO" and hasattr(self, "PTO"):
+                if v not in self.PTO:
+                    return np.zeros(columns.ndata, dtype=bool)
+            elif hasattr(self, k) and (
+                getattr(self, k) != v
+            ):
+                return np.zeros(columns.ndata, dtype=bool)
+
+        applies = columns.process_types == self.process_type
+        if columns.setname == self.dataset or self.process_type == "DIS_ALL":
+            applies = np.ones(columns.ndata, dtype=bool)
+        # Handle the generalised DIS cut
+        if self.process_type == "DIS_ALL":
+            applies = applies & columns.is_dis
+        return np.asarray(applies, dtype=bool)
+
+    def vectorised_call(self, columns):
+        """Evaluate the rule for all the points of the ``columns``
+        (:py:class:`DatasetColumns`) at once. Returns a boolean array which is
+        ``True`` for the points that pass the rule, only meaningful for those
+        points to which the rule applies (see :py:meth:`Rule.applies`).
+
+        Raises an exception if the rule cannot be evaluated this way (or the
+        evaluation results in a floating point error), in which case ``__call__``
+        should be used instead, as it will reproduce the exact behaviour.
+        """
+        if self._vectorised_rule is None:
+            raise _NotVectorisable(f"The rule {self.rule_string!r} cannot be vectorised")
+        ns = dict(zip(self.variables, columns.kinematics.T))
+        with np.errstate(all="raise"):
+            for key, value in self._vectorised_local_variables_code.items():
+                ns[key] = eval(value, {**_VECTORISED_OPERATIONS, **self.numpy_functions, **ns})
+            result = eval(
+                self._vectorised_rule,
+                {**_VECTORISED_OPERATIONS, **self.numpy_functions},
+                {
+                    **{"idat": columns.idat, "central_value": columns.central_value},
+                    **self.defaults,
+                    **ns,
+                },
+            )
+        return np.broadcast_to(_truth(result), (columns.ndata,))
+
     def __repr__(self): # pragma: no cover
         return self.rule_string
 
@@ -480,11 +690,84 @@ class Rule:
             ns[key] = eval(value, {**self.numpy_functions, **ns})
         return ns
 
+@functools.lru_cache()
+def _default_cuts_cache_dir():
+    """Return the cuts folder in the validphys cache or ``None`` if
+    there is no usable cache"""
+    # The loader pulls in most of validphys, so import it lazily
+    from validphys.loader import Loader, LoaderError
+    try:
+        return Loader()._vp_cache() / CUTS_CACHE_DIRNAME
+    except (LoaderError, KeyError) as e:
+        log.debug(f"Not caching internal cuts: {e}")
+        return None
+
+
+def cuts_cache_key(commondata, rules):
+    """Return a hash identifying the result of :py:func:`get_cuts_for_dataset`
+    for ``commondata`` and ``rules``. It depends on the contents of the
+    commondata file and on the properties of the rules that can change their
+    result (see ``Rule._cache_properties``), in order."""
+    h = hashlib.sha1()
+    h.update(f"{_CUTS_CACHE_VERSION}\0".encode())
+    with open(commondata.datafile, "rb") as f:
+        h.update(f.read())
+    for rule in rules:
+        h.update(b"\0")
+        h.update(repr(rule._cache_properties).encode())
+    return h.hexdigest()
+
+
+def load_internal_cuts(commondata, rules, cache_dir=None) -> np.ndarray:
+    """Return the result of :py:func:`get_cuts_for_dataset` as an array.
+
+    The cuts are stored in a cache under ``cache_dir`` (keyed by
+    :py:func:`cuts_cache_key`), which defaults to the ``cuts`` folder of the
+    validphys cache, so that they are only computed once for a given
+    commondata file and set of rules. Pass ``cache_dir=False``, or set
+    :py:data:`USE_CUTS_CACHE` to ``False``, to always compute them.
+    """
+    if cache_dir is None and USE_CUTS_CACHE:
+        cache_dir = _default_cuts_cache_dir()
+    if not cache_dir:
+        return np.asarray(get_cuts_for_dataset(commondata, rules), dtype=int)
+
+    cache_path = pathlib.Path(cache_dir) / f"{commondata.name}-{cuts_cache_key(commondata, rules)}.npy"
+    try:
+        return np.load(cache_path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log.debug(f"Ignoring unreadable cuts cache {cache_path}: {e}")
+
+    cuts = np.asarray(get_cuts_for_dataset(commondata, rules), dtype=int)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so that concurrent readers
+        # never see a partially written file
+        fd, tmpname = tempfile.mkstemp(dir=cache_path.parent, prefix=f".{cache_path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, cuts)
+            os.replace(tmpname, cache_path)
+        except BaseException:
+            os.unlink(tmpname)
+            raise
+    except OSError as e:
+        log.debug(f"Could not write cuts cache {cache_path}: {e}")
+    return cuts
+
+
 def get_cuts_for_dataset(commondata, rules) -> list:
     """Function to generate a list containing the index
     of all experimental points that passed kinematic
     cut rules stored in ./cuts/filters.yaml
 
+    The kinematics of the dataset are loaded once (see :py:class:`DatasetColumns`)
+    and each rule is applied at once to all the points which survived the
+    previous rules (see :py:meth:`Rule.vectorised_call`). The rules which cannot
+    be evaluated in this way are applied point by point.
+
 
     Parameters
     ----------
@@ -513,17 +796,24 @@ def get_cuts_for_dataset(commondata, rules) -> list:
     >>> get_cuts_for_dataset(cd, rules=rule_list)
     """
     dataset = commondata.load()
-
-    mask = []
-    for idat in range(dataset.GetNData()):
-        broken = False
-        for rule in rules:
-            rule_result = rule(dataset, idat)
-            if rule_result is not None and not rule_result:
-                broken = True
-                break
-
-        if not broken:
-            mask.append(idat)
-
-    return mask
+    columns = DatasetColumns(dataset)
+
+    mask = np.ones(columns.ndata, dtype=bool)
+    for rule in rules:
+        # Only the points which haven't been cut by a previous rule need to be checked
+        applies = mask & rule.applies(columns)
+        if not applies.any():
+            continue
+        try:
+            passed = rule.vectorised_call(columns)
+        except Exception: # pylint: disable=broad-except
+            # Evaluate the rule point by point, which will reproduce the
+            # (possibly failing) behaviour of the rule
+            for idat in np.flatnonzero(applies).tolist():
+                rule_result = rule(dataset, idat)
+                if rule_result is not None and not rule_result:
+                    mask[idat] = False
+            continue
+        mask[applies] = passed[applies]
+
+    return np.flatnonzero(mask).tolist()
@@ -19,10 +19,25 @@ CFactors applied.
     l = Loader()
     fk = l.check_fktable(setname="ATLASTTBARTOT", theoryID=53, cfac=('QCD',))
     res = load_fktable(fk)
+
+The first time a table is loaded, the parsed (and CFactor corrected) result is
+stored in a binary cache next to the FKTable file, in the
+:py:data:`FK_CACHE_DIRNAME` folder, as a set of ``.npy`` files. Subsequent
+calls to :py:func:`load_fktable` memory-map these files instead of parsing
+the text again. The cache entries are keyed by the path, modification time and
+size of the FKTable and of the CFactor files, so they are invalidated
+automatically when any of these change.
 """
 import io
+import os
 import functools
+import hashlib
+import logging
+import pathlib
+import pickle
+import shutil
 import tarfile
+import tempfile
 import dataclasses
 
 import numpy as np
@@ -30,7 +45,13 @@ import pandas as pd
 
 from validphys.coredata import FKTableData, CFactorData
 
+log = logging.getLogger(__name__)
 
+#: Name of the folder, created next to the FKTable files, where the binary
+#: cache is stored.
+FK_CACHE_DIRNAME = ".fkcache"
+#: Set to ``False`` to always parse the FKTables from the text files.
+USE_FK_CACHE = True
 
 
 class BadCFactorError(Exception):
@@ -52,7 +73,36 @@ class GridInfo:
 @functools.lru_cache()
 def load_fktable(spec):
     """Load the data corresponding to a FKSpec object. The cfactors
-    will be applied to the grid."""
+    will be applied to the grid.
+
+    If :py:data:`USE_FK_CACHE` is set, the result is read from the binary
+    cache when available (see :py:func:`fk_cache_path`), and otherwise the
+    table is parsed and the cache is written for subsequent uses.
+    """
+    if not USE_FK_CACHE:
+        return _load_fktable_from_text(spec)
+    cache_path = fk_cache_path(spec)
+    if cache_path.is_dir():
+        try:
+            return read_fk_cache(cache_path)
+        except Exception as e:
+            # A corrupt entry would otherwise never be replaced, remove it so
+            # that it is rebuilt below.
+            log.warning(f"Could not read FKTable cache at {cache_path}, rebuilding it: {e}")
+            shutil.rmtree(cache_path, ignore_errors=True)
+    tabledata = _load_fktable_from_text(spec)
+    try:
+        write_fk_cache(tabledata, cache_path)
+    except OSError as e:
+        # Typically a read only theory folder, in which case we simply carry on
+        # without the cache.
+        log.debug(f"Could not write FKTable cache at {cache_path}: {e}")
+    return tabledata
+
+
+def _load_fktable_from_text(spec):
+    """Parse the FKTable text file corresponding to ``spec`` and apply the
+    cfactors."""
     with open_fkpath(spec.fkpath) as handle:
         tabledata = parse_fktable(handle)
     if not spec.cfactors:
@@ -72,6 +122,88 @@ def load_fktable(spec):
     tabledata.sigma = tabledata.sigma.multiply(pd.Series(cfprod), axis=0, level=0)
     return tabledata
 
+
+def fk_cache_path(spec):
+    """Return the path of the folder where the binary cache corresponding to
+    the FKTable ``spec`` is stored. The name of the folder contains a hash of
+    the path, modification time and size of the FKTable and CFactor files.
+    """
+    fkpath = pathlib.Path(spec.fkpath)
+    h = hashlib.sha1()
+    for p in (fkpath, *spec.cfactors):
+        p = pathlib.Path(p)
+        st = p.stat()
+        h.update(f"{p.resolve()}:{st.st_mtime_ns}:{st.st_size};".encode())
+    return fkpath.parent / FK_CACHE_DIRNAME / f"{fkpath.name}-{h.hexdigest()}"
+
+
+def write_fk_cache(tabledata, path):
+    """Store ``tabledata`` as a binary cache in the folder ``path``. The
+    sparse index of sigma and its values are written as separate ``.npy`` files
+    so that they can be memory mapped by :py:func:`read_fk_cache`. The folder is
+    written to a temporary location and then renamed, so that concurrent
+    processes never see a partially written cache.
+    """
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sigma = tabledata.sigma
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix=".tmp-", dir=path.parent))
+    try:
+        index = np.column_stack(
+            [sigma.index.get_level_values(i) for i in range(sigma.index.nlevels)]
+        )
+        np.save(tmp / "index.npy", index)
+        np.save(tmp / "sigma.npy", sigma.to_numpy(dtype=float))
+        np.save(tmp / "columns.npy", np.asarray(sigma.columns))
+        np.save(tmp / "xgrid.npy", tabledata.xgrid)
+        info = {
+            "hadronic": tabledata.hadronic,
+            "Q0": tabledata.Q0,
+            "ndata": tabledata.ndata,
+            "metadata": tabledata.metadata,
+            "index_names": list(sigma.index.names),
+        }
+        with open(tmp / "info.pkl", "wb") as f:
+            pickle.dump(info, f)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # Another process got there first.
+            if not path.is_dir():
+                raise
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def read_fk_cache(path):
+    """Load an :py:class:`validphys.coredata.FKTableData` from the binary
+    cache written by :py:func:`write_fk_cache`. The values of sigma are
+    memory mapped rather than read into memory."""
+    path = pathlib.Path(path)
+    with open(path / "info.pkl", "rb") as f:
+        info = pickle.load(f)
+    index = np.load(path / "index.npy")
+    values = np.load(path / "sigma.npy", mmap_mode="r")
+    columns = np.load(path / "columns.npy")
+    xgrid = np.load(path / "xgrid.npy")
+    sigma = pd.DataFrame(
+        values,
+        index=pd.MultiIndex.from_arrays(index.T, names=info["index_names"]),
+        columns=columns.tolist(),
+        copy=False,
+    )
+    return FKTableData(
+        sigma=sigma,
+        ndata=info["ndata"],
+        Q0=info["Q0"],
+        metadata=info["metadata"],
+        hadronic=info["hadronic"],
+        xgrid=xgrid,
+    )
+
+
 def _get_compressed_buffer(path):
     archive = tarfile.open(path)
     members = archive.getmembers()
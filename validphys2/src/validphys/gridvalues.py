@@ -5,8 +5,18 @@ Core functionality needed to obtain a set of values from
 LHAPDF. The tools for representing these grids are in pdfgrids.py
 (the validphys provider module), and the
 basis transformations are in pdfbases.py
+
+The results of :py:func:`grid_values` and :py:func:`central_grid_values` are
+stored in the process wide :py:data:`GRID_VALUES_CACHE`, so that repeated
+evaluations of the same PDF on the same grid do not go back to LHAPDF. The
+cached arrays are returned as read only arrays. Evaluations of a subset of
+``members`` are never cached, since they are used to compute predictions in
+chunks precisely to bound the memory usage.
 """
+import collections
+import hashlib
 import itertools
+import threading
 
 import numpy as np
 
@@ -46,14 +56,137 @@ QUARK_COMBINATIONS = {
     "csbar": [4, -3],
 }
 
-def _grid_values(lpdf, flmat, xmat, qmat):
-    """Compute lpdf.grid_values with more forgiving argument types"""
+class GridValuesCache:
+    """Least recently used cache for PDF grid values, with a limit on the total
+    size in bytes of the stored arrays.
+
+    Keys are built by :py:func:`grid_values_cache_key` from the ``cache_key``
+    attribute of the PDF object (see
+    :py:attr:`validphys.lhapdfset.LHAPDFSet.cache_key`) and a hash of the
+    contents of the flavour, x and Q arrays. The number of hits and misses is
+    recorded and can be retrieved with :py:meth:`GridValuesCache.stats`.
+
+    Parameters
+    ----------
+    maxbytes: int
+        The maximum size of all the stored arrays. The least recently used
+        entries are dropped when this is exceeded.
+    """
+
+    def __init__(self, maxbytes):
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the array stored under ``key``, or ``None`` if it is not
+        present."""
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a read only view of ``value`` under ``key`` and return it.
+        Arrays larger than ``maxbytes`` are not stored."""
+        value = value.view()
+        value.flags.writeable = False
+        if value.nbytes > self.maxbytes:
+            return value
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._entries[key] = value
+            self.nbytes += value.nbytes
+            while self.nbytes > self.maxbytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return value
+
+    def clear(self):
+        """Remove all the entries and reset the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = self.hits = self.misses = 0
+
+    def stats(self):
+        """Return a dictionary with the number of hits, misses, entries and
+        stored bytes."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "nbytes": self.nbytes,
+            "maxbytes": self.maxbytes,
+        }
+
+
+#: Lock held while the LHAPDF objects are evaluated, since they are not safe
+#: to use from several threads at the same time (see
+#: :py:func:`validphys.convolution.group_predictions`).
+LHAPDF_LOCK = threading.Lock()
+
+#: Process wide cache used by :py:func:`_grid_values`. Set its ``maxbytes``
+#: attribute to zero to disable it.
+GRID_VALUES_CACHE = GridValuesCache(maxbytes=1024**3)
+
+
+def _array_digest(arr):
+    arr = np.ascontiguousarray(arr)
+    h = hashlib.sha1(f"{arr.dtype.str}{arr.shape}".encode())
+    if arr.dtype.hasobject:
+        h.update(repr(arr.tolist()).encode())
+    else:
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+def grid_values_cache_key(lpdf, flmat, xmat, qmat):
+    """Return the key in :py:data:`GRID_VALUES_CACHE` for the given
+    arguments of :py:func:`_grid_values`, or ``None`` if ``lpdf`` cannot be
+    cached because it has no ``cache_key`` attribute."""
+    pdfkey = getattr(lpdf, "cache_key", None)
+    if pdfkey is None:
+        return None
+    return (pdfkey, _array_digest(flmat), _array_digest(xmat), _array_digest(qmat))
+
+
+def _grid_values(lpdf, flmat, xmat, qmat, members=None):
+    """Compute lpdf.grid_values with more forgiving argument types. If all the
+    members are requested, the results are looked up in and stored to
+    :py:data:`GRID_VALUES_CACHE`."""
     flmat = np.atleast_1d(np.asanyarray(flmat))
     xmat = np.atleast_1d(np.asarray(xmat))
     qmat = np.atleast_1d(np.asarray(qmat))
-    return lpdf.grid_values(flmat, xmat, qmat)
+    key = None
+    if members is None:
+        key = grid_values_cache_key(lpdf, flmat, xmat, qmat)
+    if key is not None:
+        res = GRID_VALUES_CACHE.get(key)
+        if res is not None:
+            return res
+    with LHAPDF_LOCK:
+        if members is None:
+            res = lpdf.grid_values(flmat, xmat, qmat)
+        else:
+            res = lpdf.grid_values(flmat, xmat, qmat, members=members)
+    if key is not None:
+        res = GRID_VALUES_CACHE.put(key, res)
+    return res
 
-def grid_values(pdf:PDF, flmat, xmat, qmat):
+def grid_values(pdf:PDF, flmat, xmat, qmat, members=None):
     """
     Evaluate ``x*f(x)`` on a grid of points in flavour, x and Q.
 
@@ -67,6 +200,9 @@ def grid_values(pdf:PDF, flmat, xmat, qmat):
         A list of x values
     qmat : iterable
         A list of values in Q, expressed in GeV.
+    members : iterable, optional
+        The indexes of the PDF members to evaluate. By default all the members
+        are used.
 
     Returns
     -------
@@ -95,7 +231,7 @@ def grid_values(pdf:PDF, flmat, xmat, qmat):
         >>> np.diff(gv, axis=1).max(axis=0).ravel()
         array([0.07904731, 0.04989902], dtype=float32)
     """
-    return _grid_values(pdf.load(), flmat, xmat, qmat)
+    return _grid_values(pdf.load(), flmat, xmat, qmat, members=members)
 
 def central_grid_values(pdf:PDF, flmat, xmat, qmat):
     """Same as :py:func:`grid_values` but it returns only the central values. The
@@ -109,7 +245,74 @@ def central_grid_values(pdf:PDF, flmat, xmat, qmat):
     return _grid_values(pdf.load_t0(), flmat, xmat, qmat)
 
 
-#TODO: Investigate writting these in cython/cffi/numba/...
+# Flavours entering the luminosity channels, in the order used by
+# :py:func:`lumi_channel_weights`.
+LUMI_FLAVOURS = (*QUARK_FLAVOURS, 21, 22)
+
+
+def lumi_channel_weights(channel):
+    """Return the matrix of weights ``W`` such that the parton luminosity of
+    the channel is ``sum_ij W[i, j] f_i(x1) f_j(x2)``, where the flavour
+    indexes run over :py:data:`LUMI_FLAVOURS`. The combinations are the same
+    as in :py:func:`evaluate_luminosity`."""
+    fl = {pid: i for i, pid in enumerate(LUMI_FLAVOURS)}
+    quarks = [fl[i] for i in QUARK_FLAVOURS]
+    g, p = fl[21], fl[22]
+    w = np.zeros((len(LUMI_FLAVOURS), len(LUMI_FLAVOURS)))
+    if channel == 'gg':
+        w[g, g] = 1
+    elif channel == 'gq':
+        # as in the first of Eq.(4) in arXiv:1607.01831
+        w[quarks, g] += 1
+        w[g, quarks] += 1
+    elif channel == 'gp':
+        w[g, p] = w[p, g] = 1
+    elif channel == 'pp':
+        w[p, p] = 1
+    elif channel == 'qqbar':
+        # as in the third of Eq.(4) in arXiv:1607.01831
+        for i in QUARK_FLAVOURS:
+            w[fl[i], fl[-i]] = 1
+    elif channel == 'qq':
+        # as in the second of Eq.(4) in arXiv:1607.01831
+        w[np.ix_(quarks, quarks)] = 1
+    elif channel in QUARK_COMBINATIONS.keys():
+        i, j = QUARK_COMBINATIONS[channel]
+        w[fl[i], fl[j]] += 1
+        w[fl[j], fl[i]] += 1
+    else:
+        raise ValueError("Bad channel")
+    return w
+
+
+def evaluate_luminosities(pdf_set: LHAPDFSet, s: float, mx: float, x1, x2, channel):
+    """Vectorised version of :py:func:`evaluate_luminosity`. Returns the PDF
+    luminosity for all the members of ``pdf_set`` at the pairs of points
+    ``(x1[i], x2[i])``, all at the scale ``mx``.
+
+    All the PDF values are obtained with a single call to
+    ``pdf_set.grid_values`` and the flavours are combined with the weights
+    given by :py:func:`lumi_channel_weights`.
+
+    Returns
+    -------
+    lumi: np.ndarray, shape (nmembers, len(x1))
+    """
+    x1 = np.asarray(x1)
+    x2 = np.asarray(x2)
+    w = lumi_channel_weights(channel)
+    # Only ask LHAPDF for the flavours contributing to the channel.
+    used = np.flatnonzero(w.any(axis=0) | w.any(axis=1))
+    w = w[np.ix_(used, used)]
+    flavours = np.asarray(LUMI_FLAVOURS)[used]
+    npoints = len(x1)
+    gv = _grid_values(pdf_set, flavours, np.concatenate([x1, x2]), [mx])[..., 0]
+    f1 = gv[..., :npoints]
+    f2 = gv[..., npoints:]
+    res = np.einsum('mik,ij,mjk->mk', f1, w, f2)
+    # The following is equivalent to Eq.(2) in arXiv:1607.01831
+    return res/x1/x2/s
+
 
 def evaluate_luminosity(pdf_set: LHAPDFSet, n: int, s:float, mx: float,
                         x1: float, x2: float, channel):
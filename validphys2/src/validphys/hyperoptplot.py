@@ -13,6 +13,7 @@ import re
 import glob
 import json
 import logging
+import pathlib
 from types import SimpleNamespace
 import numpy as np
 import pandas as pd
@@ -27,6 +28,69 @@ log = logging.getLogger(__name__)
 regex_op = re.compile(r"[^\w^\.]+")
 regex_not_op = re.compile(r"[\w\.]+")
 
+# Files in which the trials of a hyperparameter scan are stored within each replica folder:
+# the trials are appended one per line (json-lines) to ``TRIES_FILE`` and a trial is only
+# considered complete once its ``tid offset length`` entry is written to ``TRIES_INDEX_FILE``
+TRIES_FILE = "tries.jsonl"
+TRIES_INDEX_FILE = "tries.index"
+# Older scans stored all trials in a single json list
+LEGACY_TRIES_FILE = "tries.json"
+
+
+def find_tries_file(replica_path):
+    """Return the path to the file containing the trials stored in ``replica_path``
+    or ``None`` if there is none. The legacy ``tries.json`` is only used when
+    there is no json-lines file."""
+    for tries_name in (TRIES_FILE, LEGACY_TRIES_FILE):
+        tries_file = pathlib.Path(replica_path) / tries_name
+        if tries_file.exists():
+            return tries_file
+    return None
+
+
+def read_tries_index(index_file):
+    """Read the index of a json-lines tries file and return a list of ``(tid, offset, length)``
+    tuples, one per complete trial. A truncated last line (interrupted write) is ignored."""
+    index = []
+    with open(index_file, "r") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            tid, offset, length = map(int, line.split())
+            index.append((tid, offset, length))
+    return index
+
+
+def read_tries(tries_file):
+    """Generator of the trials (dictionaries) stored in ``tries_file``.
+
+    Json-lines files are read lazily one trial at a time. When the index exists only
+    the trials in the index (i.e., those which were completely written) are read,
+    at the offsets given by the index, any other byte in the file is ignored.
+    Otherwise all complete lines are read.
+    Legacy ``tries.json`` files are read at once.
+    """
+    tries_file = pathlib.Path(tries_file)
+    if tries_file.name == LEGACY_TRIES_FILE:
+        with open(tries_file, "r") as f:
+            yield from json.load(f)
+        return
+
+    index_file = tries_file.with_name(TRIES_INDEX_FILE)
+    if index_file.exists():
+        with open(tries_file, "rb") as f:
+            for _, offset, length in read_tries_index(index_file):
+                f.seek(offset)
+                yield json.loads(f.read(length))
+        return
+
+    with open(tries_file, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                log.warning("Ignoring incomplete trial found at the end of %s", tries_file)
+                break
+            yield json.loads(line)
+
 
 class HyperoptTrial:
     """
@@ -368,31 +432,31 @@ def evaluate_trial(trial_dict, validation_multiplier, fail_threshold, loss_targe
 def generate_dictionary(
     replica_path,
     loss_target,
-    json_name="tries.json",
+    json_name=None,
     starting_index=0,
     val_multiplier=0.5,
     fail_threshold=10.0,
 ):
     """
-    Reads a json file and returns a list of dictionaries
+    Reads a tries file and returns a list of dictionaries
 
     # Arguments:
-        - `replica_path`: folder in which the tries.json file can be found
+        - `replica_path`: folder in which the tries file can be found
+        - `json_name`: name of the tries file, by default it is looked for with ``find_tries_file``
         - `starting_index`: if the trials are to be added to an already existing
                             set, make sure the id has the correct index!
         - `val_multiplier`: validation multipler
         - `fail_threhsold`: threshold for the loss to consider a configuration as a failure
     """
-    filename = "{0}/{1}".format(replica_path, json_name)
-
-    # Open the file and reads it as a json
-    with open(filename, "r") as jlist:
-        input_trials = json.load(jlist)
+    if json_name is None:
+        filename = find_tries_file(replica_path)
+    else:
+        filename = "{0}/{1}".format(replica_path, json_name)
 
     # Read all trials and create a list of dictionaries
     # which can be turn into a dataframe
     all_trials = []
-    for tid, trial in enumerate(input_trials):
+    for tid, trial in enumerate(read_tries(filename)):
         index = starting_index + tid
         trial_dict = parse_trial(trial)
         if trial_dict is None:
@@ -475,8 +539,8 @@ def hyperopt_dataframe(commandline_args):
 
     filter_functions = [filter_by_string(filter_me) for filter_me in args.filter]
 
-    search_str = f"{args.hyperopt_folder}/nnfit/replica_*/tries.json"
-    all_json = glob.glob(search_str)
+    search_str = f"{args.hyperopt_folder}/nnfit/replica_*/"
+    all_json = [i for i in map(find_tries_file, sorted(glob.glob(search_str))) if i is not None]
     starting_index = 0
     all_replicas = []
     for i, json_path in enumerate(all_json):
@@ -29,9 +29,11 @@
     5: 6.922722705177504e-05,
     21: 0.007604124516892057}
 """
+import os
 import logging
 import numpy as np
 import lhapdf
+from validphys.lhaindex import infofilename
 
 log = logging.getLogger(__name__)
 
@@ -58,6 +60,18 @@ class LHAPDFSet:
         """Check whether we are in t0 mode"""
         return self._error_type == "t0"
 
+    @property
+    def cache_key(self):
+        """Hashable identifier of the PDF values, used as part of the key in
+        :py:data:`validphys.gridvalues.GRID_VALUES_CACHE`. It includes the
+        modification time of the ``.info`` file of the set, so that a set
+        reinstalled with the same name does not reuse old values"""
+        try:
+            mtime = os.stat(infofilename(self._name)).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        return (self._name, self._error_type, mtime)
+
     @property
     def n_members(self):
         """Return the number of active members in the PDF set"""
@@ -92,11 +106,15 @@ class LHAPDFSet:
             self._flavors = self.members[0].flavors()
         return self._flavors
 
-    def grid_values(self, flavors: np.ndarray, xgrid: np.ndarray, qgrid: np.ndarray):
+    def grid_values(
+        self, flavors: np.ndarray, xgrid: np.ndarray, qgrid: np.ndarray, members=None
+    ):
         """Returns the PDF values for every member for the required
         flavours, points in x and pointx in q
         The return shape is
             (members, flavors, xgrid, qgrid)
+        If ``members`` is given, it should be a sequence of indexes into
+        ``self.members`` and only the values for those members are returned.
         Return
         ------
             ndarray of shape (members, flavors, xgrid, qgrid)
@@ -114,6 +132,10 @@ class LHAPDFSet:
         # Create an array of x and q of equal length for LHAPDF
         xarr, qarr = (g.ravel() for g in np.meshgrid(xgrid, qgrid))
         # Ask LHAPDF for the values and swap the flavours and xgrid-qgrid axes
-        raw = np.array([member.xfxQ(flavors, xarr, qarr) for member in self.members]).swapaxes(1, 2)
+        if members is None:
+            member_pdfs = self.members
+        else:
+            member_pdfs = [self.members[i] for i in members]
+        raw = np.array([member.xfxQ(flavors, xarr, qarr) for member in member_pdfs]).swapaxes(1, 2)
         # Unroll the xgrid-qgrid axes
-        return raw.reshape(self.n_members, len(flavors), len(xgrid), len(qgrid))
+        return raw.reshape(len(member_pdfs), len(flavors), len(xgrid), len(qgrid))
@@ -2,11 +2,15 @@
 A module that reads and writes LHAPDF grids.
 """
 
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import functools
 import logging
 import os
 import os.path as osp
 import pathlib
 import shutil
+import tempfile
 
 import lhapdf
 import numpy as np
@@ -14,7 +18,6 @@ import pandas as pd
 
 from reportengine.compat import yaml
 from validphys import lhaindex
-from validphys.core import PDF
 
 log = logging.getLogger(__name__)
 
@@ -24,6 +27,19 @@ def split_sep(f):
             break
         yield line
 
+def _parse_subgrid(block):
+    """Parse the text of one subgrid into a Series indexed by (x, Q, flavour),
+    or return ``None`` if the block does not contain a subgrid."""
+    parts = block.split(b'\n', 3)
+    if len(parts) < 4:
+        return None
+    xtext, qtext, ftext, valtext = parts
+    xvals = np.fromstring(xtext, sep=" ")
+    qvals = np.fromstring(qtext, sep=" ")
+    fvals = np.fromstring(ftext, sep=" ", dtype=int)
+    vals = np.fromstring(valtext, sep=" ")
+    return pd.Series(vals, index=pd.MultiIndex.from_product((xvals, qvals, fvals)))
+
 def read_xqf_from_file(f):
 
     lines = split_sep(f)
@@ -31,31 +47,52 @@ def read_xqf_from_file(f):
         (xtext, qtext, ftext) = [next(lines) for _ in range(3)]
     except StopIteration:
         return None
-    xvals = np.fromstring(xtext, sep = " ")
-    qvals = np.fromstring(qtext, sep = " ")
-    fvals = np.fromstring(ftext, sep = " ", dtype=np.int)
-    vals = np.fromstring(b''.join(lines), sep= " ")
-    return pd.Series(vals, index = pd.MultiIndex.from_product((xvals, qvals, fvals)))
+    return _parse_subgrid(xtext + qtext + ftext + b''.join(lines))
 
 
 def read_xqf_from_lhapdf(pdf, replica, kin_grids):
-    indexes = tuple(kin_grids.index)
+    """Evaluate the member ``replica`` of ``pdf`` with LHAPDF on the
+    (subgrid, x, Q, flavour) nodes of ``kin_grids``. Each subgrid of
+    ``kin_grids`` is evaluated with a single call to LHAPDF."""
     #Use LHAPDF directly to avoid the insanely deranged replica 0 convention
     #of libnnpdf.
     #TODO: Find a way around this
-    import lhapdf
-
-    xfxQ = lhapdf.mkPDF(pdf.name, int(replica)).xfxQ
-
-    vals = []
-    for x in indexes:
-        #TODO: Change this for a faster grid_values call
-        vals += [xfxQ(x[3],x[1],x[2])]
-    return pd.Series(vals, index = kin_grids.index)
+    member = lhapdf.mkPDF(pdf.name, int(replica))
+
+    index = kin_grids.index
+    # Boundaries of the runs of nodes belonging to the same subgrid
+    bounds = list(np.flatnonzero(np.diff(index.codes[0])) + 1)
+    vals = np.empty(len(index))
+    for start, stop in zip([0, *bounds], [*bounds, len(index)]):
+        xs, qs, fls = (
+            np.asarray(index.get_level_values(i)[start:stop]) for i in (1, 2, 3)
+        )
+        fvals = pd.unique(fls)
+        nfl = len(fvals)
+        npoints, rem = divmod(stop - start, nfl)
+        if (
+            not rem
+            and np.array_equal(fls.reshape(npoints, nfl), np.broadcast_to(fvals, (npoints, nfl)))
+            and np.all(xs.reshape(npoints, nfl) == xs[::nfl, np.newaxis])
+            and np.all(qs.reshape(npoints, nfl) == qs[::nfl, np.newaxis])
+        ):
+            # All the flavours are listed for each (x, Q) node, so LHAPDF can
+            # evaluate the whole subgrid at once
+            res = member.xfxQ(fvals.tolist(), xs[::nfl].tolist(), qs[::nfl].tolist())
+            vals[start:stop] = np.ravel(res)
+        else:
+            for i, (x, q, fl) in enumerate(zip(xs, qs, fls), start):
+                vals[i] = member.xfxQ(int(fl), x, q)
+    return pd.Series(vals, index=kin_grids.index)
 
 def read_all_xqf(f):
-    while True:
-        result = read_xqf_from_file(f)
+    """Parse all the subgrids remaining in the file object ``f``"""
+    # Subgrids are separated by lines starting with ---
+    blocks = (b'\n' + f.read()).split(b'\n---')
+    for i, block in enumerate(blocks):
+        # Drop the rest of the separator line
+        block = block[1:] if i == 0 else block.partition(b'\n')[2]
+        result = _parse_subgrid(block)
         if result is None:
             return
         yield result
@@ -82,28 +119,42 @@ def load_replica(pdf, rep, kin_grids=None):
             xfqs = pd.concat(xfqs, keys=range(len(xfqs)))
     return header, xfqs
 
+def _format_block(fmt, values, sep, end):
+    """Format all the ``values`` with ``fmt`` at once, separating rows with
+    ``end`` and the columns of each row with ``sep``, the same way as
+    ``np.savetxt`` would."""
+    values = np.asarray(values)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    nrows, ncols = values.shape
+    rowfmt = sep.join([fmt] * ncols) + end
+    return ((rowfmt * nrows) % tuple(values.ravel().tolist())).encode()
+
 #Split this to debug easily
 def _rep_to_buffer(out, header, subgrids):
     sep = b'---'
     out.write(header)
     out.write(sep)
-    for _,g in subgrids.groupby(level=0):
+    index = subgrids.index
+    values = np.asarray(subgrids.values)
+    codes = index.codes[0]
+    # Process the subgrids in the order of their keys, like groupby would
+    for key in np.unique(codes):
+        selected = np.flatnonzero(codes == key)
+        xs, qs, fls = (
+            pd.unique(np.asarray(index.get_level_values(i))[selected]) for i in (1, 2, 3)
+        )
         out.write(b'\n')
-        ind = g.index.get_level_values(1).unique()
-        np.savetxt(out, ind, fmt='%.7E',delimiter=' ', newline=' ')
+        out.write(_format_block('%.7E', xs, ' ', ' '))
         out.write(b'\n')
-        ind = g.index.get_level_values(2).unique()
-        np.savetxt(out, ind, fmt='%.7E',delimiter=' ', newline=' ')
+        out.write(_format_block('%.7E', qs, ' ', ' '))
         out.write(b'\n')
         #Integer format
-        ind = g.index.get_level_values(3).unique()
-        np.savetxt(out, ind, delimiter=' ', fmt="%d",
-                      newline=' ')
+        out.write(_format_block('%d', fls, ' ', ' '))
         out.write(b'\n ')
         #Reshape so printing is easy
-        reshaped = g.values.reshape((len(g.groupby(level=1))*len(g.groupby(level=2)),
-                              len(g.groupby(level=3))))
-        np.savetxt(out, reshaped, delimiter=" ", newline="\n", fmt='%14.7E')
+        reshaped = values[selected].reshape((len(xs) * len(qs), len(fls)))
+        out.write(_format_block('%14.7E', reshaped, ' ', '\n'))
         out.write(sep)
 
 def write_replica(rep, set_root, header, subgrids):
@@ -114,7 +165,13 @@ def write_replica(rep, set_root, header, subgrids):
     with open(target_file, 'wb') as out:
         _rep_to_buffer(out, header, subgrids)
 
-def load_all_replicas(pdf, db=None):
+def load_all_replicas(pdf, db=None, max_workers=None):
+    """Load the header and the grid values of all the members of ``pdf``.
+
+    The grids of replica 0 are read from the file and all the other members
+    are evaluated with LHAPDF on the same nodes. If ``max_workers`` is given,
+    the members are loaded in parallel by a pool with that many processes.
+    """
     if db is not None:
         #removing str() will crash as it casts to unicode due to pdf name
         key = str("(load_all_replicas, %s)" % pdf.get_key())
@@ -122,13 +179,89 @@ def load_all_replicas(pdf, db=None):
             return db[key]
     rep0headers, rep0grids = load_replica(pdf, 0)
 
-    headers, grids = zip(*[load_replica(pdf, rep, rep0grids)
-                         for rep in range(1, len(pdf))])
+    reps = range(1, len(pdf))
+    loader = functools.partial(load_replica, pdf, kin_grids=rep0grids)
+    if max_workers is None or max_workers <= 1 or len(reps) <= 1:
+        loaded = [loader(rep) for rep in reps]
+    else:
+        log.info(f"Loading {len(reps)} members of {pdf} using {max_workers} processes")
+        chunksize = max(1, len(reps) // (4 * max_workers))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            loaded = list(executor.map(loader, reps, chunksize=chunksize))
+    headers, grids = zip(*loaded) if loaded else ((), ())
     result = [rep0headers] + list(headers), [rep0grids] + list(grids)
     if db is not None:
         db[key] = result
     return result
 
+def _executor_map(stack, fn, max_workers, *iterables):
+    """Map ``fn`` over ``iterables``, using a pool of ``max_workers``
+    processes (entered in the ``stack`` context) if more than one worker
+    is requested"""
+    njobs = min(len(i) for i in iterables)
+    if max_workers is None or max_workers <= 1 or njobs <= 1:
+        return map(fn, *iterables)
+    executor = stack.enter_context(ProcessPoolExecutor(max_workers=max_workers))
+    chunksize = max(1, njobs // (4 * max_workers))
+    return executor.map(fn, *iterables, chunksize=chunksize)
+
+def load_replicas_matrix(pdf, members, kin_grids=None, max_workers=None, memmap_dir=None):
+    """Load the grid values of the ``members`` of ``pdf`` as the columns of
+    a ``(npoints, len(members))`` float64 array.
+
+    If ``kin_grids`` is given the members are evaluated with LHAPDF on its
+    nodes, otherwise they are read from the files, in which case all of them
+    must share the same grid. The members are loaded (by a pool of
+    ``max_workers`` processes if given) and written into the array one by one,
+    so only the array is kept in memory. If ``memmap_dir`` is given, the
+    array is a memory-mapped file in that directory instead.
+
+    Returns
+    -------
+    index : pd.MultiIndex
+        The (subgrid, x, Q, flavour) nodes corresponding to the rows of the array.
+    matrix : np.ndarray
+        The values of the grids, one member per column.
+    """
+    members = list(members)
+    index = None if kin_grids is None else kin_grids.index
+    matrix = None
+    loader = functools.partial(load_replica, pdf, kin_grids=kin_grids)
+    with contextlib.ExitStack() as stack:
+        loaded = _executor_map(stack, loader, max_workers, members)
+        for i, (_header, grid) in enumerate(loaded):
+            if index is None:
+                index = grid.index
+            elif grid.index is not index and not grid.index.equals(index):
+                raise ValueError("Incompatible grid specifications")
+            if matrix is None:
+                shape = (len(index), len(members))
+                if memmap_dir is None:
+                    matrix = np.empty(shape)
+                else:
+                    matrix = np.lib.format.open_memmap(
+                        osp.join(memmap_dir, f"{pdf}_grids.npy"),
+                        mode="w+",
+                        dtype=np.float64,
+                        shape=shape,
+                    )
+            matrix[:, i] = grid.values
+    return index, matrix
+
+def _write_column(set_root, header, index, rep, values):
+    write_replica(rep, set_root, header, pd.Series(values, index=index))
+
+def write_replicas_matrix(set_root, header, index, matrix, first_member=1, max_workers=None):
+    """Write each column of ``matrix`` as a member of the LHAPDF set in
+    ``set_root``, starting from ``first_member``. The rows of ``matrix``
+    correspond to the nodes of ``index``. If ``max_workers`` is given, the
+    members are written in parallel by a pool with that many processes."""
+    writer = functools.partial(_write_column, set_root, header, index)
+    reps = range(first_member, first_member + matrix.shape[1])
+    with contextlib.ExitStack() as stack:
+        # Consume the iterator so that all the members are written
+        list(_executor_map(stack, writer, max_workers, reps, list(matrix.T)))
+
 def big_matrix(gridlist):
     """Return a properly indexes matrix of the differences between each member
     and the central value"""
@@ -174,25 +307,22 @@ def generate_replica0(pdf, kin_grids=None, extra_fields=None):
     if not set_root.exists():
         raise RuntimeError(f"Target directory {set_root} does not exist")
 
-    loaded_grids = {}
-    grids = []
+    index, mean = _members_mean(pdf, range(1, len(pdf)), kin_grids=kin_grids)
+    header = b'PdfType: central\nFormat: lhagrid1\n'
+    write_replica(0, set_root, header, pd.Series(mean, index=index))
 
-    for irep in range(1, len(pdf)):
-        if irep in loaded_grids:
-            grid = loaded_grids[irep]
-        else:
-            _header, grid = load_replica(pdf, irep, kin_grids=kin_grids)
-            loaded_grids[irep] = grid
-        grids.append(grid)
+def _members_mean(pdf, members, kin_grids=None):
+    """Compute the mean of the grids of the (possibly repeated) ``members``
+    of ``pdf``. Each member is only loaded once."""
+    members, counts = np.unique(np.asarray(members, dtype=int), return_counts=True)
     # This takes care of failing if headers don't match
     try:
-        M = rep_matrix(grids)
+        index, M = load_replicas_matrix(pdf, members, kin_grids=kin_grids)
     except ValueError as e:
-        raise ValueError("Null values found in replica grid matrix. "
-                         "This may indicate that the headers don't match"
+        raise ValueError("Incompatible grids found in the replicas. "
+                         "This may indicate that the headers don't match. "
                          "If this is intentional try using use_rep0grid=True") from e
-    header = b'PdfType: central\nFormat: lhagrid1\n'
-    write_replica(0, set_root, header, M.mean(axis=1))
+    return index, M @ (counts / counts.sum())
 
 def new_pdf_from_indexes(
         pdf, indexes, set_name=None, folder=None,
@@ -264,14 +394,10 @@ def new_pdf_from_indexes(
         new_path = _index_to_path(set_root, set_name, newindex)
         shutil.copy(original_path, new_path)
 
-    # Generate replica 0
-    oldpaths = lhapdf.paths()
-    try:
-        lhapdf.setPaths([str(folder)])
-        generatedPDF = PDF(set_name)
-        generate_replica0(generatedPDF, rep0grid)
-    finally:
-        lhapdf.setPaths(oldpaths)
+    # Generate replica 0 as the mean of the selected replicas
+    index, mean = _members_mean(pdf, indexes, kin_grids=rep0grid)
+    header = b'PdfType: central\nFormat: lhagrid1\n'
+    write_replica(0, set_root, header, pd.Series(mean, index=index))
 
     if installgrid:
         newpath = pathlib.Path(lhaindex.get_lha_datapath()) /  set_name
@@ -279,8 +405,16 @@ def new_pdf_from_indexes(
         shutil.copytree(set_root, newpath)
 
 
-def hessian_from_lincomb(pdf, V, set_name=None, folder = None, extra_fields=None):
-    """Construct a new LHAPDF grid from a linear combination of members"""
+def hessian_from_lincomb(pdf, V, set_name=None, folder = None, extra_fields=None,
+                         max_workers=None, memmap=False):
+    """Construct a new LHAPDF grid from a linear combination of members
+
+    All the members are evaluated on the grid of replica 0 and stored in a
+    single ``(npoints, nrep)`` array, (backed by a temporary file if
+    ``memmap`` is ``True``), such that the eigenvectors are computed as one
+    matrix product. If ``max_workers`` is given, the members are loaded and
+    the eigenvectors written by a pool with that many processes.
+    """
 
     # preparing output folder
     neig = V.shape[1]
@@ -317,10 +451,19 @@ def hessian_from_lincomb(pdf, V, set_name=None, folder = None, extra_fields=None
         if extra_fields is not None:
             yaml.dump(extra_fields, out, default_flow_style=False)
 
-    _headers, grids = load_all_replicas(pdf)
-    result  = (big_matrix(grids).dot(V)).add(grids[0], axis=0, )
+    _header, rep0grid = load_replica(pdf, 0)
+    central = rep0grid.values[:, np.newaxis]
+    with contextlib.ExitStack() as stack:
+        memmap_dir = stack.enter_context(tempfile.TemporaryDirectory()) if memmap else None
+        index, X = load_replicas_matrix(
+            pdf, range(1, len(pdf)), kin_grids=rep0grid,
+            max_workers=max_workers, memmap_dir=memmap_dir
+        )
+        # Differences with respect to the central value, in place
+        X -= central
+        result = X @ V + central
+        del X
     hess_header = b"PdfType: error\nFormat: lhagrid1\n"
-    for column in result.columns:
-        write_replica(column + 1, set_root, hess_header, result[column])
+    write_replicas_matrix(set_root, hess_header, index, result, max_workers=max_workers)
     log.info("Hessian PDF stored at %s", set_root)
     return set_root
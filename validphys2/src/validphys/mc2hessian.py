@@ -15,12 +15,18 @@ from reportengine.checks import check, check_positive, make_argcheck
 
 from validphys import lhaindex
 from validphys.lhio import hessian_from_lincomb
-from validphys.pdfgrids import xplotting_grid
+from validphys.pdfbases import check_basis
 
 from validphys.checks import check_pdf_is_montecarlo
 
 log = logging.getLogger(__name__)
 
+#: Number of PDF members evaluated at once when building the matrix of differences
+GRID_CHUNK_SIZE = 100
+
+#: Methods available to compute the singular vectors of the matrix of differences
+SVD_METHODS = ("full", "randomized")
+
 
 def gridname(pdf, Neig, mc2hname: (str, type(None)) = None):
     """If no custom `mc2hname' is specified, the name of the Hessian PDF is automatically generated.
@@ -60,9 +66,27 @@ def mc2hessian_xgrid(
     )
 
 
+@make_argcheck
+def _check_svd_method(svd_method):
+    check(
+        svd_method in SVD_METHODS,
+        f"Invalid svd_method {svd_method!r}, the allowed values are {SVD_METHODS}",
+    )
+
+
 @check_pdf_is_montecarlo
+@_check_svd_method
 def mc2hessian(
-    pdf, Q, Neig: int, mc2hessian_xgrid, output_path, gridname, installgrid: bool = False
+    pdf,
+    Q,
+    Neig: int,
+    mc2hessian_xgrid,
+    output_path,
+    gridname,
+    installgrid: bool = False,
+    svd_method: str = "full",
+    mc2hessian_workers: (int, type(None)) = None,
+    mc2hessian_memmap: bool = False,
 ):
     """Produces a Hessian PDF by transfroming a Monte Carlo PDF set.
 
@@ -82,9 +106,28 @@ def mc2hessian(
         Name of the Hessian PDF set
     installgrid : bool, optional, default=``False``
         Whether to copyt the Hessian grid to the LHAPDF path
+    svd_method : str, optional, default=``"full"``
+        Either ``"full"``, to compute the full SVD of the matrix of differences
+        between the replicas and the central value, or ``"randomized"``, to
+        compute only the ``Neig`` leading singular vectors with a randomized
+        algorithm, which is much cheaper for large sets.
+    mc2hessian_workers : int, optional
+        If given, number of processes used to read the replicas and write the
+        eigenvectors of the Hessian set (see :py:func:`validphys.lhio.hessian_from_lincomb`)
+    mc2hessian_memmap : bool, optional, default=``False``
+        Whether the grids of all the replicas are stored in a temporary file,
+        instead of in memory, while the eigenvectors are computed
     """
     result_path = _create_mc2hessian(
-        pdf, Q=Q, xgrid=mc2hessian_xgrid, Neig=Neig, output_path=output_path, name=gridname
+        pdf,
+        Q=Q,
+        xgrid=mc2hessian_xgrid,
+        Neig=Neig,
+        output_path=output_path,
+        name=gridname,
+        svd_method=svd_method,
+        max_workers=mc2hessian_workers,
+        memmap=mc2hessian_memmap,
     )
     if installgrid:
         lhafolder = pathlib.Path(lhaindex.get_lha_datapath())
@@ -102,27 +145,82 @@ def mc2hessian(
         log.info("Hessian PDF set installed at %s", dest)
 
 
-def _create_mc2hessian(pdf, Q, xgrid, Neig, output_path, name=None):
+def _create_mc2hessian(
+    pdf, Q, xgrid, Neig, output_path, name=None, svd_method="full", max_workers=None, memmap=False
+):
     X = _get_X(pdf, Q, xgrid, reshape=True)
-    vec = _compress_X(X, Neig)
+    vec = _compress_X(X, Neig, method=svd_method)
     norm = _pdf_normalization(pdf)
-    return hessian_from_lincomb(pdf, vec / norm, folder=output_path, set_name=name)
+    return hessian_from_lincomb(
+        pdf,
+        vec / norm,
+        folder=output_path,
+        set_name=name,
+        max_workers=max_workers,
+        memmap=memmap,
+    )
 
 
 def _get_X(pdf, Q, xgrid, reshape=False):
-    pdf_grid = xplotting_grid(pdf, Q, xgrid=xgrid)
-    pdf_grid_values = pdf_grid.grid_values
-    replicas = pdf_grid_values.error_members()
-    mean = pdf_grid_values.central_value()
-    Xt = replicas - mean
-    if reshape:
-        Xt = Xt.reshape(Xt.shape[0], Xt.shape[1] * Xt.shape[2])
-    return Xt.T
-
+    """Return the differences between each replica and the central value of
+    ``pdf`` in the flavour basis at the scale ``Q`` and the points ``xgrid``.
 
-def _compress_X(X, neig):
-    _U, _S, V = np.linalg.svd(X, full_matrices=False)
-    vec = V[:neig, :].T
+    The replicas are evaluated in chunks of :py:data:`GRID_CHUNK_SIZE` members,
+    which are written directly into the output array. The result has shape
+    ``(flavours*x, replicas)`` if ``reshape`` is ``True`` or
+    ``(x, flavours, replicas)`` otherwise.
+    """
+    checked = check_basis("flavour", None)
+    basis, flavours = checked["basis"], checked["flavours"]
+    xgrid = np.asarray(xgrid)
+    central = basis.grid_values(pdf, flavours, xgrid, Q, members=[0])[0, ..., 0]
+    nrep = len(pdf) - 1
+    X = np.empty((*central.shape, nrep))
+    for start in range(1, nrep + 1, GRID_CHUNK_SIZE):
+        members = range(start, min(start + GRID_CHUNK_SIZE, nrep + 1))
+        values = basis.grid_values(pdf, flavours, xgrid, Q, members=members)
+        X[..., start - 1 : start - 1 + len(members)] = np.moveaxis(values[..., 0], 0, -1)
+    X -= central[..., np.newaxis]
+    if reshape:
+        return X.reshape(-1, nrep)
+    return X.transpose(1, 0, 2)
+
+
+def _randomized_right_singular_vectors(X, neig, oversampling=10, power_iterations=4, seed=0):
+    """Compute an approximation to the ``neig`` leading singular values and
+    right singular vectors of ``X`` with a randomized range finder refined by
+    ``power_iterations`` power iterations (see Halko, Martinsson and Tropp,
+    arXiv:0909.4061)."""
+    rng = np.random.default_rng(seed)
+    nsamples = min(neig + oversampling, min(X.shape))
+    Q, _ = np.linalg.qr(X @ rng.standard_normal((X.shape[1], nsamples)))
+    for _ in range(power_iterations):
+        Q, _ = np.linalg.qr(X.T @ Q)
+        Q, _ = np.linalg.qr(X @ Q)
+    _U, S, V = np.linalg.svd(Q.T @ X, full_matrices=False)
+    return S[:neig], V[:neig, :]
+
+
+def _compress_X(X, neig, method="full"):
+    """Return the ``neig`` leading right singular vectors of ``X`` as columns,
+    computed with the full SVD of ``X`` or with a randomized algorithm,
+    depending on ``method``. The fraction of the variance of ``X`` retained by
+    them is logged."""
+    if method == "full":
+        _U, S, V = np.linalg.svd(X, full_matrices=False)
+        S, V = S[:neig], V[:neig, :]
+    elif method == "randomized":
+        S, V = _randomized_right_singular_vectors(X, neig)
+    else:
+        raise ValueError(f"Unknown SVD method {method!r}, expected one of {SVD_METHODS}")
+    retained = np.sum(S ** 2) / np.vdot(X, X)
+    log.info(
+        "The %d eigenvectors retain %.4f%% of the variance (%s SVD)",
+        neig,
+        100 * retained,
+        method,
+    )
+    vec = V.T
     return vec
 
 
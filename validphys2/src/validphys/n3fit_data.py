@@ -149,7 +149,13 @@ def kfold_masks(kpartitions, data):
 
 def _mask_fk_tables(dataset_dicts, tr_masks):
     """
-    Internal function which masks the fktables for a group of datasets.
+    Internal function which attaches the training and validation masks to each
+    dataset of a group of datasets.
+
+    The fktables are not masked, instead every dataset gets a reference to its full
+    fktables (``ex_fktables``) which is shared by the training, validation and
+    experimental observables, the masks (``tr_mask`` and ``vl_mask``) are applied
+    to the output of the convolution.
 
     Parameters
     ----------
@@ -169,18 +175,9 @@ def _mask_fk_tables(dataset_dicts, tr_masks):
     """
     trmask_partial = tr_masks
     for dataset_dict, tr_mask in zip(dataset_dicts, trmask_partial):
-        # Generate the training and validation fktables
-        tr_fks = []
-        vl_fks = []
-        ex_fks = []
-        vl_mask = ~tr_mask
-        for fktable_dict in dataset_dict["fktables"]:
-            tr_fks.append(fktable_dict["fktable"][tr_mask])
-            vl_fks.append(fktable_dict["fktable"][vl_mask])
-            ex_fks.append(fktable_dict.get("fktable"))
-        dataset_dict["tr_fktables"] = tr_fks
-        dataset_dict["vl_fktables"] = vl_fks
-        dataset_dict["ex_fktables"] = ex_fks
+        dataset_dict["tr_mask"] = tr_mask
+        dataset_dict["vl_mask"] = ~tr_mask
+        dataset_dict["ex_fktables"] = [i["fktable"] for i in dataset_dict["fktables"]]
 
     return np.concatenate(trmask_partial)
 
@@ -216,6 +213,8 @@ def fitting_data_dict(
             mask for the training data
         'invcovmat'
             inverse of the covmat for the training data
+        'covmat_tr'
+            covmat for the training data
         'ndata'
             number of datapoints for the training data
         'expdata'
@@ -224,6 +223,8 @@ def fitting_data_dict(
             (same as above for validation)
         'invcovmat_vl'
             (same as above for validation)
+        'covmat_vl'
+            (same as above for validation)
         'ndata_vl'
             (same as above for validation)
         'expdata_vl'
@@ -306,10 +307,12 @@ def fitting_data_dict(
         "covmat": covmat,
         "trmask": tr_mask,
         "invcovmat": invcovmat_tr,
+        "covmat_tr": covmat_tr,
         "ndata": ndata_tr,
         "expdata": expdata_tr,
         "vlmask": vl_mask,
         "invcovmat_vl": invcovmat_vl,
+        "covmat_vl": covmat_vl,
         "ndata_vl": ndata_vl,
         "expdata_vl": expdata_vl,
         "positivity": False,
@@ -246,7 +246,7 @@ class Basis(abc.ABC):
         """
         ...
 
-    def grid_values(self, pdf, vmat, xmat, qmat):
+    def grid_values(self, pdf, vmat, xmat, qmat, members=None):
         """Like :py:func:`validphys.gridvalues.grid_values`, but taking  and
         returning `vmat` in terms of the vectors in this base.
 
@@ -260,6 +260,9 @@ class Basis(abc.ABC):
             A list of x values
         qmat: iterable
             A list of values in Q, expressed in GeV.
+        members: iterable, optional
+            The indexes of the PDF members to evaluate. By default all the
+            members are used.
 
         Returns
         -------
@@ -281,7 +284,7 @@ class Basis(abc.ABC):
             >>> np.median(gv[:,0,...]/gv[:,1,...], axis=0)
             array([[0.56694959, 0.53782002, 0.60348812]])
         """
-        func = functools.partial(grid_values, pdf)
+        func = functools.partial(grid_values, pdf, members=members)
         return self.apply_grid_values(func, vmat, xmat, qmat)
 
     def central_grid_values(self, pdf, vmat, xmat, qmat):
@@ -101,6 +101,15 @@ def read_replica_pseudodata(fit, context_index, replica):
     return DataTrValSpec(pseudodata.drop("type", axis=1), tr.index, val.index)
 
 
+def _replica_rng(groups_dataset_inputs_loaded_cd_with_cuts, replica_mcseed):
+    """Return the random number generator used to produce the pseudodata
+    replica with seed ``replica_mcseed``. The seed is salted with the names
+    of the datasets in this run."""
+    name_salt = "-".join(i.setname for i in groups_dataset_inputs_loaded_cd_with_cuts)
+    name_seed = int(hashlib.sha256(name_salt.encode()).hexdigest(), 16) % 10 ** 8
+    return np.random.default_rng(seed=replica_mcseed+name_seed)
+
+
 def make_replica(groups_dataset_inputs_loaded_cd_with_cuts, replica_mcseed, genrep=True):
     """Function that takes in a list of :py:class:`validphys.coredata.CommonData`
     objects and returns a pseudodata replica accounting for
@@ -145,9 +154,7 @@ def make_replica(groups_dataset_inputs_loaded_cd_with_cuts, replica_mcseed, genr
         return np.concatenate([cd.central_values for cd in groups_dataset_inputs_loaded_cd_with_cuts])
 
     # Seed the numpy RNG with the seed and the name of the datasets in this run
-    name_salt = "-".join(i.setname for i in groups_dataset_inputs_loaded_cd_with_cuts)
-    name_seed = int(hashlib.sha256(name_salt.encode()).hexdigest(), 16) % 10 ** 8
-    rng = np.random.default_rng(seed=replica_mcseed+name_seed)
+    rng = _replica_rng(groups_dataset_inputs_loaded_cd_with_cuts, replica_mcseed)
 
     # The inner while True loop is for ensuring a positive definite
     # pseudodata replica
@@ -225,6 +232,171 @@ def make_replica(groups_dataset_inputs_loaded_cd_with_cuts, replica_mcseed, genr
     return all_pseudodata
 
 
+class _ReplicaSampler:
+    """Decomposition of the uncertainties of a list of
+    :py:class:`validphys.coredata.CommonData` objects, computed once so that
+    many pseudodata replicas can be generated with vectorised operations.
+
+    The random numbers needed for one attempt at generating a replica with
+    :py:func:`make_replica` are drawn in a fixed order, with a total of
+    ``ndraws`` numbers. :py:meth:`_ReplicaSampler.pseudodata` consumes the
+    same numbers, in the same order, for a block of replicas at once.
+    """
+
+    def __init__(self, cds):
+        self.datasets = []
+        special_add = []
+        special_mult = []
+        check_positive_masks = []
+        ndraws = 0
+        for cd in cds:
+            add_errors = cd.additive_errors
+            mult_errors = cd.multiplicative_errors
+            dataset = {
+                "central": cd.central_values.to_numpy(copy=True),
+                "stat": cd.stat_errors.to_numpy(),
+                "add_uncorr": add_errors.loc[:, add_errors.columns == "UNCORR"].to_numpy(),
+                "add_corr": add_errors.loc[:, add_errors.columns == "CORR"].to_numpy(),
+                "mult_uncorr": mult_errors.loc[:, mult_errors.columns == "UNCORR"].to_numpy(),
+                "mult_corr": mult_errors.loc[:, mult_errors.columns == "CORR"].to_numpy(),
+            }
+            # Number of random numbers used for each contribution, in the
+            # order in which they are drawn.
+            ndata = cd.ndata
+            sizes = (
+                ndata,
+                dataset["add_uncorr"].size,
+                dataset["add_corr"].shape[1],
+                dataset["mult_uncorr"].size,
+                dataset["mult_corr"].shape[1],
+            )
+            dataset["slices"] = [slice(ndraws + a, ndraws + b) for a, b in zip(
+                np.cumsum((0, *sizes[:-1])), np.cumsum(sizes)
+            )]
+            ndraws += sum(sizes)
+            self.datasets.append(dataset)
+            special_add.append(
+                add_errors.loc[:, ~add_errors.columns.isin(INTRA_DATASET_SYS_NAME)]
+            )
+            special_mult.append(
+                mult_errors.loc[:, ~mult_errors.columns.isin(INTRA_DATASET_SYS_NAME)]
+            )
+            check_positive_masks.append(np.full(ndata, "ASY" not in cd.commondataproc))
+
+        # non-overlapping systematics are set to NaN by concat, fill with 0 instead.
+        self.special_add = pd.concat(special_add, axis=0, sort=True).fillna(0).to_numpy()
+        self.special_mult = pd.concat(special_mult, axis=0, sort=True).fillna(0).to_numpy()
+        nadd = self.special_add.shape[1]
+        nmult = self.special_mult.shape[1]
+        self.special_add_slice = slice(ndraws, ndraws + nadd)
+        self.special_mult_slice = slice(ndraws + nadd, ndraws + nadd + nmult)
+        self.ndraws = ndraws + nadd + nmult
+        self.check_positive_mask = np.concatenate(check_positive_masks)
+
+    def pseudodata(self, normals):
+        """Compute the pseudodata for a block of replicas from the normally
+        distributed random numbers ``normals``, of shape ``(nreplicas,
+        ndraws)``. Returns an array of shape ``(nreplicas, ndata)``."""
+        nrep = len(normals)
+        pseudodatas = []
+        mult_shifts = []
+        for dataset in self.datasets:
+            stat, add_uncorr, add_corr, mult_uncorr, mult_corr = (
+                normals[:, sl] for sl in dataset["slices"]
+            )
+            pseudodata = dataset["central"] + dataset["stat"] * stat
+            pseudodata += (
+                dataset["add_uncorr"] * add_uncorr.reshape(nrep, *dataset["add_uncorr"].shape)
+            ).sum(axis=-1)
+            pseudodata += add_corr @ dataset["add_corr"].T
+            pseudodatas.append(pseudodata)
+            # convert to from percent to fraction
+            mult_shift = (
+                1
+                + dataset["mult_uncorr"]
+                * mult_uncorr.reshape(nrep, *dataset["mult_uncorr"].shape)
+                / 100
+            ).prod(axis=-1)
+            mult_shift *= (
+                1 + dataset["mult_corr"] * mult_corr[:, np.newaxis, :] / 100
+            ).prod(axis=-1)
+            mult_shifts.append(mult_shift)
+
+        special_add = normals[:, self.special_add_slice]
+        special_mult = normals[:, self.special_mult_slice]
+        return (
+            np.concatenate(pseudodatas, axis=1) + special_add @ self.special_add.T
+        ) * (
+            np.concatenate(mult_shifts, axis=1)
+            * (1 + self.special_mult * special_mult[:, np.newaxis, :] / 100).prod(axis=-1)
+        )
+
+
+def make_replicas_batch(
+    groups_dataset_inputs_loaded_cd_with_cuts, replica_mcseeds, genrep=True, batch_size=100
+):
+    """Vectorised version of :py:func:`make_replica`, which generates the
+    pseudodata for several replicas at once.
+
+    The decomposition of the uncertainties is computed once and the replicas
+    are generated in blocks of ``batch_size``. Each replica uses its own random
+    number generator, seeded exactly as in :py:func:`make_replica`, so that
+    the pseudodata for a given seed is the same (up to floating point
+    rounding) as that produced by :py:func:`make_replica`. When the positivity
+    requirement is not met, only the offending replicas are regenerated.
+
+    Parameters
+    ----------
+    groups_dataset_inputs_loaded_cd_with_cuts: list[:py:class:`validphys.coredata.CommonData`]
+        List of CommonData objects which stores information about systematic errors,
+        their treatment and description, for each dataset.
+    replica_mcseeds: list[int]
+        The seed of each replica, as given by
+        :py:func:`validphys.n3fit_data.replica_mcseed`.
+    genrep: bool
+        If ``False``, return the central values for each replica.
+    batch_size: int
+        Number of replicas generated at the same time.
+
+    Returns
+    -------
+    pseudodata: np.array
+        Array of shape ``(len(replica_mcseeds), N_dat)`` with one pseudodata
+        replica per row.
+    """
+    cds = groups_dataset_inputs_loaded_cd_with_cuts
+    if not genrep:
+        central = np.concatenate([cd.central_values for cd in cds])
+        return np.tile(central, (len(replica_mcseeds), 1))
+
+    sampler = _ReplicaSampler(cds)
+    res = np.empty((len(replica_mcseeds), len(sampler.check_positive_mask)))
+    for start in range(0, len(replica_mcseeds), batch_size):
+        seeds = replica_mcseeds[start:start + batch_size]
+        rngs = [_replica_rng(cds, seed) for seed in seeds]
+        block = res[start:start + len(seeds)]
+        pending = np.arange(len(seeds))
+        while len(pending):
+            normals = np.stack([rngs[i].normal(size=sampler.ndraws) for i in pending])
+            pseudodata = sampler.pseudodata(normals)
+            passed = np.all(pseudodata[:, sampler.check_positive_mask] >= 0, axis=1)
+            block[pending[passed]] = pseudodata[passed]
+            pending = pending[~passed]
+    return res
+
+
+replicas_mcseed = collect('replica_mcseed', ('replicas',))
+
+
+def batched_make_replicas(groups_dataset_inputs_loaded_cd_with_cuts, replicas_mcseed, genrep=True):
+    """Like ``make_replicas``, but generating all the replicas with
+    :py:func:`make_replicas_batch`. Returns an array of shape
+    ``(nreplicas, N_dat)``."""
+    return make_replicas_batch(
+        groups_dataset_inputs_loaded_cd_with_cuts, replicas_mcseed, genrep=genrep
+    )
+
+
 def indexed_make_replica(groups_index, make_replica):
     """Index the make_replica pseudodata appropriately
     """
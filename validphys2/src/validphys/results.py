@@ -35,6 +35,7 @@ from validphys.calcutils import (
     bootstrap_values,
 )
 from validphys.convolution import (
+    group_predictions,
     predictions,
     PredictionsRequireCutsError,
 )
@@ -131,7 +132,13 @@ class ThPredictionsResult(StatsResult):
         return label
 
     @classmethod
-    def from_convolution(cls, pdf, dataset):
+    def from_convolution(cls, pdf, dataset, max_workers=None, member_chunk_size=None):
+        """Compute the predictions for ``dataset``, which can be either a
+        single dataset or a group. If ``max_workers`` is given, the FKTables
+        of a group are convolved in a pool of that many threads (see
+        :py:func:`validphys.convolution.group_predictions`). If
+        ``member_chunk_size`` is given, the PDF members are convolved at most
+        that many at a time (see :py:func:`validphys.convolution.predictions`)."""
         # This should work for both single dataset and whole groups
         try:
             datasets = dataset.datasets
@@ -139,7 +146,15 @@ class ThPredictionsResult(StatsResult):
             datasets = (dataset,)
 
         try:
-            th_predictions = pd.concat([predictions(d, pdf) for d in datasets])
+            if max_workers is not None and hasattr(dataset, "datasets"):
+                all_predictions, _ = group_predictions(
+                    dataset, pdf, max_workers=max_workers, member_chunk_size=member_chunk_size
+                )
+            else:
+                all_predictions = [
+                    predictions(d, pdf, member_chunk_size=member_chunk_size) for d in datasets
+                ]
+            th_predictions = pd.concat(all_predictions)
         except PredictionsRequireCutsError as e:
             raise PredictionsRequireCutsError(
                 "Predictions from FKTables always require cuts, "
@@ -453,7 +468,14 @@ def procs_corrmat(procs_covmat):
     return groups_corrmat(procs_covmat)
 
 
-def results(dataset: (DataSetSpec), pdf: PDF, covariance_matrix, sqrt_covmat):
+def results(
+    dataset: (DataSetSpec),
+    pdf: PDF,
+    covariance_matrix,
+    sqrt_covmat,
+    convolution_threads=None,
+    member_chunk_size=None,
+):
     """Tuple of data and theory results for a single pdf. The data will have an associated
     covariance matrix, which can include a contribution from the theory covariance matrix which
     is constructed from scale variation. The inclusion of this covariance matrix by default is used
@@ -461,21 +483,40 @@ def results(dataset: (DataSetSpec), pdf: PDF, covariance_matrix, sqrt_covmat):
 
     The theory is specified as part of the dataset.
     A group of datasets is also allowed.
-    (as a result of the C++ code layout)."""
+    (as a result of the C++ code layout).
+
+    If ``convolution_threads`` is set in the runcard, the FKTables of a group of datasets
+    are convolved in a pool of that many threads
+    (see :py:func:`validphys.convolution.group_predictions`).
+    If ``member_chunk_size`` is set, the PDF members are convolved at most that many
+    at a time, which bounds the memory used for sets with many members
+    (see :py:func:`validphys.convolution.predictions`)."""
     data = dataset.load()
     return (
         DataResult(data, covariance_matrix, sqrt_covmat),
-        ThPredictionsResult.from_convolution(pdf, dataset),
+        ThPredictionsResult.from_convolution(
+            pdf, dataset, max_workers=convolution_threads, member_chunk_size=member_chunk_size
+        ),
     )
 
 
 
 def dataset_inputs_results(
-    data, pdf: PDF, dataset_inputs_covariance_matrix, dataset_inputs_sqrt_covmat
+    data,
+    pdf: PDF,
+    dataset_inputs_covariance_matrix,
+    dataset_inputs_sqrt_covmat,
+    convolution_threads=None,
+    member_chunk_size=None,
 ):
     """Like `results` but for a group of datasets"""
     return results(
-        data, pdf, dataset_inputs_covariance_matrix, dataset_inputs_sqrt_covmat
+        data,
+        pdf,
+        dataset_inputs_covariance_matrix,
+        dataset_inputs_sqrt_covmat,
+        convolution_threads=convolution_threads,
+        member_chunk_size=member_chunk_size,
     )
 
 
@@ -487,11 +528,19 @@ def pdf_results(
     pdfs: Sequence,
     covariance_matrix,
     sqrt_covmat,
+    convolution_threads=None,
+    member_chunk_size=None,
 ):
     """Return a list of results, the first for the data and the rest for
-    each of the PDFs."""
+    each of the PDFs. See :py:func:`results` for ``convolution_threads``
+    and ``member_chunk_size``."""
 
-    th_results = [ThPredictionsResult.from_convolution(pdf, dataset) for pdf in pdfs]
+    th_results = [
+        ThPredictionsResult.from_convolution(
+            pdf, dataset, max_workers=convolution_threads, member_chunk_size=member_chunk_size
+        )
+        for pdf in pdfs
+    ]
 
     return (DataResult(dataset.load(), covariance_matrix, sqrt_covmat), *th_results)
 
@@ -504,15 +553,21 @@ def one_or_more_results(
     sqrt_covmat,
     pdfs: (type(None), Sequence) = None,
     pdf: (type(None), PDF) = None,
+    convolution_threads=None,
+    member_chunk_size=None,
 ):
     """Generate a list of results, where the first element is the data values,
     and the next is either the prediction for pdf or for each of the pdfs.
     Which of the two is selected intelligently depending on the namespace,
     when executing as an action."""
     if pdf:
-        return results(dataset, pdf, covariance_matrix, sqrt_covmat)
+        return results(
+            dataset, pdf, covariance_matrix, sqrt_covmat, convolution_threads, member_chunk_size
+        )
     else:
-        return pdf_results(dataset, pdfs, covariance_matrix, sqrt_covmat)
+        return pdf_results(
+            dataset, pdfs, covariance_matrix, sqrt_covmat, convolution_threads, member_chunk_size
+        )
     raise ValueError("Either 'pdf' or 'pdfs' is required")
 
 
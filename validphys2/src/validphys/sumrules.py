@@ -7,6 +7,7 @@ Note that this contains only the code for the computation of sum rules from
 scratch using LHAPDF tables. The code reading the sum rule information output
 from the fit is present in fitinfo.py
 """
+import logging
 import numbers
 
 import numpy as np
@@ -20,10 +21,54 @@ from reportengine.floatformatting import format_error_value_columns
 from validphys.core import PDF
 from validphys.pdfbases import parse_flarr
 
+log = logging.getLogger(__name__)
 
-def _momentum_sum_rule_integrand(x, lpdf, Q):
-    xqvals = lpdf.xfxQ(x, Q)
-    return sum([xqvals[f] for f in lpdf.flavors()])
+#: Regions in x in which the integrals are split.
+SUM_RULE_REGIONS = ((1e-9, 1e-5), (1e-5, 1e-3), (1e-3, 1))
+#: Number of Gauss-Legendre nodes in log(x) used for each region.
+SUM_RULE_NODES = 128
+#: Absolute and relative tolerances of the integration. Sum rules with a
+#: larger estimated error are integrated again with ``scipy.integrate.quad``.
+SUM_RULE_EPSABS = 1e-4
+SUM_RULE_EPSREL = 1e-4
+
+
+class _SumRuleIntegrand:
+    """The integrand of a sum rule, ``sum(multiplier*x*flavour(x))`` over the
+    entries of ``flavour_weights``, divided by ``x`` if ``divide_by_x`` is
+    set. If ``flavour_weights`` is ``None``, all the flavours in the PDF are
+    summed.
+
+    Instances are called with the value of ``x``, a PDF member and ``Q``, for
+    the use of :py:func:`scipy.integrate.quad`, and the weights are used
+    directly for the fixed grid integration in :py:func:`_sum_rules`.
+    """
+
+    def __init__(self, flavour_weights, divide_by_x):
+        self.flavour_weights = flavour_weights
+        self.divide_by_x = divide_by_x
+
+    def weights(self, flavours):
+        """Return an array with the multiplier for each of ``flavours``"""
+        if self.flavour_weights is None:
+            return np.ones(len(flavours))
+        return np.array([self.flavour_weights.get(fl, 0) for fl in flavours], dtype=float)
+
+    def __call__(self, x, lpdf, Q):
+        xqvals = lpdf.xfxQ(x, Q)
+        if self.flavour_weights is None:
+            res = sum([xqvals[f] for f in lpdf.flavors()])
+        else:
+            res = sum(
+                multiplier * xqvals[flavour]
+                for flavour, multiplier in self.flavour_weights.items()
+            )
+        if self.divide_by_x:
+            return res / x
+        return res
+
+
+_momentum_sum_rule_integrand = _SumRuleIntegrand(None, divide_by_x=False)
 
 def _make_momentum_fraction_integrand(fldict):
     """Make a suitable integrand function, which takes x to be integrated over
@@ -47,14 +92,7 @@ def _make_momentum_fraction_integrand(fldict):
     """
     # Do this outside to aid integration time
     fldict = {parse_flarr([k])[0]: v for k, v in fldict.items()}
-
-    def f(x, lpdf, Q):
-        return sum(
-            multiplier * lpdf.xfxQ(x, Q)[flavour]
-            for flavour, multiplier in fldict.items()
-        )
-
-    return f
+    return _SumRuleIntegrand(fldict, divide_by_x=False)
 
 def _make_pdf_integrand(fldict):
     """Make a suitable integrand function, which takes x to be integrated over
@@ -78,17 +116,7 @@ def _make_pdf_integrand(fldict):
     """
     # Do this outsde to aid integration time
     fldict = {parse_flarr([k])[0]: v for k, v in fldict.items()}
-
-    def f(x, lpdf, Q):
-        return (
-            sum(
-                multiplier * lpdf.xfxQ(x, Q)[flavour]
-                for flavour, multiplier in fldict.items()
-            )
-            / x
-        )
-
-    return f
+    return _SumRuleIntegrand(fldict, divide_by_x=True)
 
 
 KNOWN_SUM_RULES = {
@@ -126,17 +154,85 @@ def _integral(rule_f, pdf_member, Q, config=None):
     separating the regions of integration. Uses quad.
     """
     if config is None:
-        config = {"limit":1000, "epsabs": 1e-4, "epsrel": 1e-4}
+        config = {"limit":1000, "epsabs": SUM_RULE_EPSABS, "epsrel": SUM_RULE_EPSREL}
     res = 0.0
-    lims = [(1e-9, 1e-5), (1e-5, 1e-3), (1e-3, 1)]
-    for lim in lims:
+    for lim in SUM_RULE_REGIONS:
         res += quad(rule_f, *lim, args=(pdf_member, Q), **config)[0]
     return res
 
 
+def _log_gauss_legendre(npoints):
+    """Return the nodes in x and the weights of a Gauss-Legendre quadrature
+    in log(x) with ``npoints`` in each of the :py:data:`SUM_RULE_REGIONS`.
+    The weights include the Jacobian, so that they integrate in dx."""
+    nodes, weights = np.polynomial.legendre.leggauss(npoints)
+    xs, ws = [], []
+    for a, b in SUM_RULE_REGIONS:
+        la, lb = np.log(a), np.log(b)
+        half_width = (lb - la) / 2
+        x = np.exp((la + lb) / 2 + half_width * nodes)
+        xs.append(x)
+        ws.append(half_width * weights * x)
+    return np.concatenate(xs), np.concatenate(ws)
+
+
+def _fixed_grid_sum_rules(rules_dict, lpdf, Q):
+    """Integrate all the rules for all the members of ``lpdf`` with a fixed
+    Gauss-Legendre quadrature (see :py:func:`_log_gauss_legendre`), evaluating
+    the PDF with a single call to ``grid_values``.
+
+    Returns two dictionaries mapping the rules to arrays with the value of
+    the integral for each member and to the estimate of the error, obtained by
+    comparing with a quadrature with half as many points.
+    """
+    x, w = _log_gauss_legendre(SUM_RULE_NODES)
+    low_x, low_w = _log_gauss_legendre(SUM_RULE_NODES // 2)
+    all_x = np.concatenate([x, low_x])
+
+    flavours = set()
+    for rule in rules_dict.values():
+        if rule.flavour_weights is None:
+            flavours.update(lpdf.flavors)
+        else:
+            flavours.update(rule.flavour_weights)
+    flavours = sorted(flavours)
+    # Shape (members, flavours, x)
+    gv = lpdf.grid_values(np.array(flavours), all_x, np.array([Q]))[..., 0]
+
+    results, errors = {}, {}
+    for k, rule in rules_dict.items():
+        integrand = np.einsum("f,mfx->mx", rule.weights(flavours), gv)
+        if rule.divide_by_x:
+            integrand = integrand / all_x
+        results[k] = integrand[:, : len(x)] @ w
+        errors[k] = np.abs(results[k] - integrand[:, len(x) :] @ low_w)
+    return results, errors
+
+
 def _sum_rules(rules_dict, lpdf, Q):
-    """Compute a SumRulesGrid from the loaded PDF, at Q"""
-    return {k: [_integral(r, m, Q) for m in lpdf.members] for k,r in rules_dict.items()}
+    """Compute a SumRulesGrid from the loaded PDF, at Q
+
+    The integrals are computed with :py:func:`_fixed_grid_sum_rules`. The
+    members for which the estimated error of some rule is larger than
+    :py:data:`SUM_RULE_EPSABS` and :py:data:`SUM_RULE_EPSREL` are integrated
+    again adaptively with :py:func:`_integral`, and a warning is emitted.
+    """
+    results, errors = _fixed_grid_sum_rules(rules_dict, lpdf, Q)
+    res = {}
+    for k, rule in rules_dict.items():
+        values = results[k]
+        tolerance = np.maximum(SUM_RULE_EPSABS, SUM_RULE_EPSREL * np.abs(values))
+        bad = np.flatnonzero(~(errors[k] <= tolerance))
+        if len(bad):
+            log.warning(
+                f"The estimated error of the {k} sum rule is {np.nanmax(errors[k]):.2g} "
+                f"for {len(bad)} members, which is larger than the tolerance. "
+                "Integrating them adaptively instead."
+            )
+            for i in bad:
+                values[i] = _integral(rule, lpdf.members[i], Q)
+        res[k] = values.tolist()
+    return res
 
 
 @check_positive('Q')
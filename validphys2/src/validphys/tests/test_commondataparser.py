@@ -61,3 +61,20 @@ def test_commondata_with_cuts():
     bad_cuts = l.check_fit_cuts(fit=FIT, commondata=cd_bad)
     with pytest.raises(ValueError):
         loaded_cd.with_cuts(bad_cuts)
+
+
+def test_commondata_cache(tmp):
+    l = Loader()
+    cd = l.check_commondata(setname="NMC")
+    parsed = load_commondata(cd, cache_dir=False)
+    first = load_commondata(cd, cache_dir=tmp)
+    (cache_path,) = tmp.iterdir()
+    cached = load_commondata(cd, cache_dir=tmp)
+    for res in (first, cached):
+        pd.testing.assert_frame_equal(res.commondata_table, parsed.commondata_table)
+        pd.testing.assert_frame_equal(res.systype_table, parsed.systype_table)
+    # A cache that does not match the files is ignored
+    with open(cache_path, "wb") as f:
+        f.write(b"garbage")
+    reparsed = load_commondata(cd, cache_dir=tmp)
+    pd.testing.assert_frame_equal(reparsed.commondata_table, parsed.commondata_table)
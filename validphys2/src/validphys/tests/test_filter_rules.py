@@ -1,11 +1,17 @@
+import numpy as np
 import pytest
 
 from validphys.api import API
+from validphys.core import InternalCutsWrapper
 from validphys.loader import FallbackLoader as Loader
 from validphys.filters import (
     Rule,
     RuleProcessingError,
     default_filter_settings_input,
+    default_filter_rules_input,
+    get_cuts_for_dataset,
+    load_internal_cuts,
+    cuts_cache_key,
     PerturbativeOrder,
     BadPerturbativeOrder,
 )
@@ -37,11 +43,12 @@ good_rules = [
 ]
 
 
-def mkrule(inp):
+def mkrule(inp, defaults=None):
     l = Loader()
     th = l.check_theoryID(THEORYID)
     desc = th.get_description()
-    defaults = default_filter_settings_input()
+    if defaults is None:
+        defaults = default_filter_settings_input()
     return Rule(initial_data=inp, defaults=defaults, theory_parameters=desc)
 
 
@@ -93,3 +100,56 @@ def test_good_rules():
     for dsname in dsnames:
         ds = l.check_dataset(dsname, cuts='internal', rules=rules, theoryid=THEORYID)
         assert ds.cuts.load() is not None
+
+
+def test_vectorised_rules():
+    """Check that the vectorised evaluation of the rules gives the same cuts
+    as applying every rule to every point"""
+    l = Loader()
+    rules = [mkrule(inp) for inp in default_filter_rules_input()]
+    rules += [
+        mkrule({'dataset': 'NMC', 'rule': 'x > 0.1 and not 2 < Q2 < 8 or idat < 3'}),
+        mkrule({'dataset': 'NMC', 'rule': 'Q2 if x > 0.01 else fabs(central_value) > 0.2'}),
+    ]
+    for dsname in ['NMC', 'LHCBWZMU8TEV', 'ATLAS1JET11', 'CMSDY2D11']:
+        cd = l.check_commondata(dsname)
+        dataset = cd.load()
+        reference = []
+        for idat in range(dataset.GetNData()):
+            results = (rule(dataset, idat) for rule in rules)
+            if all(result is None or result for result in results):
+                reference.append(idat)
+        assert get_cuts_for_dataset(cd, rules) == reference
+
+
+def test_cuts_cache(tmp_path):
+    l = Loader()
+    cd = l.check_commondata('NMC')
+    rules = [mkrule(inp) for inp in good_rules]
+    rules.append(mkrule({'dataset': 'NMC', 'rule': 'x > 0.1'}))
+    cuts = load_internal_cuts(cd, rules, cache_dir=tmp_path)
+    np.testing.assert_array_equal(cuts, get_cuts_for_dataset(cd, rules))
+    cache_files = list(tmp_path.iterdir())
+    assert len(cache_files) == 1
+    # The second time the cuts are read from the cache
+    np.testing.assert_array_equal(load_internal_cuts(cd, rules, cache_dir=tmp_path), cuts)
+    assert list(tmp_path.iterdir()) == cache_files
+    # Changing the rules changes the key
+    other_rules = rules[:-1] + [mkrule({'dataset': 'NMC', 'rule': 'x > 0.2'})]
+    assert cuts_cache_key(cd, rules) != cuts_cache_key(cd, other_rules)
+
+
+def test_internal_cuts_defaults():
+    """Rules which differ only in their defaults compare equal, but the
+    internal cuts computed from them must not be shared"""
+    cd = Loader().check_commondata('NMC')
+    inp = {'dataset': 'NMC', 'rule': 'Q2 > q2min'}
+    defaults = default_filter_settings_input()
+    rules = [mkrule(inp, defaults)]
+    other_rules = [mkrule(inp, dict(defaults, q2min=10.0))]
+    assert rules == other_rules
+    cuts = InternalCutsWrapper(cd, rules).load()
+    other_cuts = InternalCutsWrapper(cd, other_rules).load()
+    np.testing.assert_array_equal(cuts, get_cuts_for_dataset(cd, rules))
+    np.testing.assert_array_equal(other_cuts, get_cuts_for_dataset(cd, other_rules))
+    assert len(other_cuts) < len(cuts)
@@ -0,0 +1,42 @@
+"""
+test_gridvalues.py
+
+Test the caching of PDF grid values.
+"""
+import numpy as np
+
+from validphys.api import API
+from validphys.gridvalues import GRID_VALUES_CACHE, GridValuesCache, grid_values
+from validphys.tests.conftest import PDF
+
+
+def test_grid_values_cache():
+    pdf = API.pdf(pdf=PDF)
+    GRID_VALUES_CACHE.clear()
+    xgrid = np.geomspace(1e-4, 0.9, 10)
+    first = grid_values(pdf, [21, 1, 2], xgrid, [1.65, 10])
+    second = grid_values(pdf, [21, 1, 2], xgrid.copy(), [1.65, 10])
+    assert second is first
+    assert not first.flags.writeable
+    stats = GRID_VALUES_CACHE.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    members = grid_values(pdf, [21, 1, 2], xgrid, [1.65, 10], members=[0, 3])
+    np.testing.assert_array_equal(members, first[[0, 3]])
+    # The evaluation of a subset of members is not cached
+    assert GRID_VALUES_CACHE.stats() == stats
+
+
+def test_grid_values_cache_eviction():
+    cache = GridValuesCache(maxbytes=100)
+    cache.put("a", np.zeros(5))
+    cache.put("b", np.zeros(5))
+    assert cache.get("a") is not None
+    # "b" is now the least recently used entry
+    cache.put("c", np.zeros(5))
+    assert cache.get("b") is None
+    assert cache.nbytes == 80
+    # Arrays larger than the cache are not stored
+    cache.put("d", np.zeros(20))
+    assert cache.get("d") is None
+    assert len(cache) == 2
@@ -0,0 +1,63 @@
+"""
+test_lhio.py
+
+Tests for reading and writing LHAPDF grids with :py:mod:`validphys.lhio`
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from validphys import lhaindex, lhio
+from validphys.lhio import _rep_to_buffer, read_all_xqf, split_sep
+
+
+def _random_subgrids():
+    rng = np.random.default_rng(42)
+    flavours = [-3, -2, -1, 1, 2, 3, 21]
+    xgrid = np.geomspace(1e-9, 1, 30)
+    qgrids = (np.geomspace(1.65, 4.92, 5), np.geomspace(4.92, 1e5, 10))
+    grids = [
+        pd.Series(
+            rng.normal(size=len(xgrid) * len(qgrid) * len(flavours)),
+            index=pd.MultiIndex.from_product((xgrid, qgrid, flavours)),
+        )
+        for qgrid in qgrids
+    ]
+    return pd.concat(grids, keys=range(len(grids)))
+
+
+def test_replica_roundtrip():
+    header = b"PdfType: replica\nFormat: lhagrid1\n"
+    grids = _random_subgrids()
+    out = io.BytesIO()
+    _rep_to_buffer(out, header, grids)
+    out.seek(0)
+    assert b"".join(split_sep(out)) == header
+    subgrids = list(read_all_xqf(out))
+    read = pd.concat(subgrids, keys=range(len(subgrids)))
+    # The files store 8 significant digits
+    pd.testing.assert_index_equal(read.index, grids.index, check_exact=False, rtol=1e-7)
+    np.testing.assert_allclose(read.values, grids.values, rtol=1e-7)
+    # Writing what was read gives back the same file
+    again = io.BytesIO()
+    _rep_to_buffer(again, header, read)
+    assert again.getvalue() == out.getvalue()
+
+
+def test_replicas_matrix_roundtrip(tmp_path, monkeypatch):
+    set_name = "TESTSET"
+    set_root = tmp_path / set_name
+    set_root.mkdir()
+    monkeypatch.setattr(lhaindex, "finddir", lambda _: str(set_root))
+    header = b"PdfType: replica\nFormat: lhagrid1\n"
+    index = _random_subgrids().index
+    rng = np.random.default_rng(7)
+    matrix = rng.normal(size=(len(index), 4))
+    lhio.write_replicas_matrix(set_root, header, index, matrix, max_workers=2)
+    read_index, read = lhio.load_replicas_matrix(set_name, range(1, 5), memmap_dir=tmp_path)
+    pd.testing.assert_index_equal(read_index, index, check_exact=False, rtol=1e-7)
+    np.testing.assert_allclose(read, matrix, rtol=1e-7)
+    # Repeated members are weighted accordingly in the mean
+    _, mean = lhio._members_mean(set_name, [1, 2, 2, 4])
+    np.testing.assert_allclose(mean, (read[:, 0] + 2 * read[:, 1] + read[:, 3]) / 4)
@@ -0,0 +1,53 @@
+"""
+test_lumigrids.py
+
+Test that the vectorised luminosity grids agree with the point by point
+evaluation of the luminosity.
+"""
+import numpy as np
+from numpy.testing import assert_allclose
+import scipy.integrate as integrate
+
+from validphys.api import API
+from validphys.gridvalues import LUMI_CHANNELS, evaluate_luminosity, evaluate_luminosities
+from validphys.tests.conftest import PDF
+
+SQRTS = 13000
+
+
+def test_evaluate_luminosities():
+    pdf = API.pdf(pdf=PDF)
+    lpdf = pdf.load()
+    x1 = np.array([1e-3, 0.01, 0.2])
+    x2 = np.array([0.3, 0.05, 1e-4])
+    mx = 100
+    for channel in LUMI_CHANNELS:
+        res = evaluate_luminosities(lpdf, SQRTS ** 2, mx, x1, x2, channel)
+        for irep in (0, 1):
+            expected = [
+                evaluate_luminosity(lpdf, irep, SQRTS ** 2, mx, a, b, channel)
+                for a, b in zip(x1, x2)
+            ]
+            assert_allclose(res[irep], expected, rtol=1e-10)
+
+
+def test_lumigrid1d_quadrature():
+    """Check the Gauss-Legendre integration in rapidity against an adaptive
+    quadrature for the central member"""
+    pdf = API.pdf(pdf=PDF)
+    lpdf = pdf.load()
+    for channel in ("gg", "qqbar"):
+        grid = API.lumigrid1d(pdf=PDF, lumi_channel=channel, sqrts=SQRTS, nbins_m=4)
+        for im, mx in enumerate(grid.m):
+            sqrt_tau = mx / SQRTS
+            y_max = np.log(1 / sqrt_tau)
+            expected = integrate.quad(
+                lambda y: evaluate_luminosity(
+                    lpdf, 0, SQRTS ** 2, mx, sqrt_tau * np.exp(y), sqrt_tau * np.exp(-y), channel
+                ),
+                -y_max,
+                y_max,
+                epsrel=5e-4,
+                limit=50,
+            )[0]
+            assert_allclose(grid.grid_values.data[0, im], expected, rtol=5e-4)
@@ -3,7 +3,10 @@
 """
 import contextlib
 import lhapdf
+import numpy as np
+import pytest
 from validphys.api import API
+from validphys.mc2hessian import _compress_X
 
 NEIG = 5
 
@@ -19,7 +22,8 @@ def temp_lhapdf_path(folder):
         lhapdf.setPaths(oldpaths)
 
 
-def test_mc2hessian(data_config, tmp):
+@pytest.mark.parametrize("workers,memmap", [(None, False), (2, True)])
+def test_mc2hessian(data_config, tmp, workers, memmap):
     """Tests that the generated hessian PDF is indeed marked as such
     and that the metadata is not obviously broken
     """
@@ -28,6 +32,8 @@ def test_mc2hessian(data_config, tmp):
 
     config["Neig"] = NEIG
     config["output_path"] = tmp
+    config["mc2hessian_workers"] = workers
+    config["mc2hessian_memmap"] = memmap
     API.mc2hessian(**config)
 
     # Save a reference to the original pdf
@@ -52,3 +58,15 @@ def test_mc2hessian(data_config, tmp):
                 assert item != new_item
             else:
                 assert item == new_item
+
+
+def test_randomized_compression():
+    """Check that the randomized SVD finds the same leading eigenvectors
+    as the full SVD for a matrix with a decaying spectrum"""
+    rng = np.random.default_rng(1)
+    spectrum = np.diag(np.geomspace(10, 1e-2, 30))
+    X = rng.normal(size=(500, 30)) @ spectrum @ rng.normal(size=(30, 200))
+    full = _compress_X(X, NEIG)
+    randomized = _compress_X(X, NEIG, method="randomized")
+    # The singular vectors are only defined up to a sign
+    np.testing.assert_allclose(np.abs(np.sum(full * randomized, axis=0)), 1, rtol=1e-8)
@@ -6,8 +6,17 @@ from numpy.testing import assert_allclose
 from validphys.api import API
 from validphys.loader import Loader
 from validphys.results import ThPredictionsResult, PositivityResult
-from validphys.fkparser import load_fktable
-from validphys.convolution import predictions, central_predictions, linear_predictions
+from validphys import fkparser
+from validphys.fkparser import load_fktable, open_fkpath, parse_fktable, read_fk_cache, write_fk_cache
+from validphys.coredata import FKTableData
+from validphys.convolution import (
+    NFK,
+    SparseFKKernel,
+    predictions,
+    central_predictions,
+    linear_predictions,
+    group_predictions,
+)
 from validphys.tests.conftest import PDF, HESSIAN_PDF, THEORYID, POSITIVITIES
 
 
@@ -30,6 +39,40 @@ def test_basic_loading():
     assert res.ndata == 1
 
 
+def test_fktable_cache(tmp):
+    """Check that the binary cache roundtrips the parsed FKTables"""
+    l = Loader()
+    for setname in ("ATLASTTBARTOT", "H1HERAF2B"):
+        fk = l.check_fktable(setname=setname, theoryID=THEORYID, cfac=())
+        with open_fkpath(fk.fkpath) as handle:
+            parsed = parse_fktable(handle)
+        write_fk_cache(parsed, tmp / setname)
+        cached = read_fk_cache(tmp / setname)
+        pd.testing.assert_frame_equal(parsed.sigma, cached.sigma, check_dtype=False)
+        assert_allclose(parsed.xgrid, cached.xgrid)
+        assert cached.ndata == parsed.ndata
+        assert cached.Q0 == parsed.Q0
+        assert cached.hadronic == parsed.hadronic
+        assert cached.metadata == parsed.metadata
+
+
+def test_corrupt_fktable_cache(monkeypatch):
+    """Check that a cache entry that cannot be read is replaced by a new one"""
+    monkeypatch.setattr(fkparser, "USE_FK_CACHE", True)
+    l = Loader()
+    fk = l.check_fktable(setname="H1HERAF2B", theoryID=THEORYID, cfac=())
+    with open_fkpath(fk.fkpath) as handle:
+        parsed = parse_fktable(handle)
+    cache_path = fkparser.fk_cache_path(fk)
+    cache_path.mkdir(parents=True, exist_ok=True)
+    (cache_path / "info.pkl").write_bytes(b"not a pickle")
+    # Bypass the in-memory cache of load_fktable
+    res = load_fktable.__wrapped__(fk)
+    pd.testing.assert_frame_equal(parsed.sigma, res.sigma, check_dtype=False)
+    cached = read_fk_cache(cache_path)
+    pd.testing.assert_frame_equal(parsed.sigma, cached.sigma, check_dtype=False)
+
+
 def test_cuts():
     l = Loader()
     ds = l.check_dataset("ATLASTTBARTOT", theoryid=THEORYID, cfac=("QCD",))
@@ -46,6 +89,13 @@ def test_cuts():
     table = load_fktable(ds.fkspecs[0])
     newtable = table.with_cuts(ds.cuts)
     assert len(newtable.sigma.index.get_level_values(0).unique()) == len(ds.cuts.load())
+    # Check that the cuts select the same rows as .loc, in the order of the
+    # cuts, and that the result is cached
+    for cuts in (ds.cuts.load(), [0, 1, 2], [5, 0, 3, 3], []):
+        pd.testing.assert_frame_equal(table.with_cuts(cuts).sigma, table.sigma.loc[cuts])
+    assert table.with_cuts(ds.cuts) is newtable
+    with pytest.raises(KeyError):
+        table.with_cuts([table.ndata])
 
 
 @pytest.mark.parametrize("pdf_name", [PDF, HESSIAN_PDF])
@@ -80,6 +130,89 @@ def test_predictions(pdf_name):
         assert_allclose(core_predictions.central_value, stats_predictions.central_value(), rtol=1e-2)
 
 
+def test_chunked_predictions():
+    """Test that evaluating the PDF members in chunks gives the same result as
+    evaluating all of them at once"""
+    l = Loader()
+    pdf = l.check_pdf(PDF)
+    for name in ("ATLASTTBARTOT", "H1HERAF2B", "D0ZRAP"):
+        ds = l.check_dataset(name, theoryid=THEORYID)
+        for func in (predictions, linear_predictions):
+            full = func(ds, pdf)
+            chunked = func(ds, pdf, member_chunk_size=7)
+            pd.testing.assert_frame_equal(full, chunked, check_exact=True)
+
+
+def test_group_predictions():
+    """Test that the predictions computed in a thread pool match the serial
+    ones"""
+    l = Loader()
+    pdf = l.check_pdf(PDF)
+    names = ("ATLASTTBARTOT", "H1HERAF2B", "D0ZRAP", "D0WEASY")
+    data = l.check_experiment(
+        "group", [l.check_dataset(name, theoryid=THEORYID) for name in names]
+    )
+    preds, timings = group_predictions(data, pdf, max_workers=2)
+    assert list(timings.index) == list(names)
+    for ds, pred in zip(data.datasets, preds):
+        pd.testing.assert_frame_equal(pred, predictions(ds, pdf))
+
+
+def test_convolution_threads(data_internal_cuts_config):
+    """Test that the ``convolution_threads`` runcard key gives the same results
+    as the serial convolution"""
+    serial = API.dataset_inputs_results(**data_internal_cuts_config)
+    threaded = API.dataset_inputs_results(**data_internal_cuts_config, convolution_threads=2)
+    assert_allclose(serial[1].rawdata, threaded[1].rawdata)
+
+
+def test_member_chunk_size(data_internal_cuts_config):
+    """Test that the ``member_chunk_size`` runcard key gives the same results
+    as convolving all the members at once, also in a thread pool"""
+    full = API.dataset_inputs_results(**data_internal_cuts_config)
+    for threads in (None, 2):
+        chunked = API.dataset_inputs_results(
+            **data_internal_cuts_config, convolution_threads=threads, member_chunk_size=7
+        )
+        assert_allclose(full[1].rawdata, chunked[1].rawdata)
+
+
+def test_sparse_kernel_zero_points():
+    """Check that the data points whose FKTable entries are all zero are kept
+    by the sparse kernel, with a prediction of zero"""
+    rng = np.random.default_rng(0)
+    nx, ndata, nmembers = 4, 3, 2
+    xgrid = np.linspace(0.1, 0.9, nx)
+    # DIS table, with flavours 1 and 3
+    index = pd.MultiIndex.from_product([range(ndata), range(nx)], names=["data", "x"])
+    sigma = pd.DataFrame(rng.random((len(index), 2)), index=index, columns=[1, 3])
+    sigma.loc[1] = 0.0
+    kernel = SparseFKKernel(FKTableData(False, 1.65, ndata, xgrid, sigma))
+    gv = rng.random((nmembers, 2, nx))
+    expected = np.einsum("dxf,mfx->dm", sigma.to_numpy().reshape(ndata, nx, 2), gv)
+    assert list(kernel.data) == list(range(ndata))
+    assert_allclose(kernel.convolve(gv), expected)
+    assert_allclose(kernel.convolve(gv)[1], 0.0)
+
+    # Hadronic table, with flavour combinations (1, 1) and (1, 3)
+    index = pd.MultiIndex.from_product(
+        [range(ndata), range(nx), range(nx)], names=["data", "x1", "x2"]
+    )
+    columns = [1 * NFK + 1, 1 * NFK + 3]
+    sigma = pd.DataFrame(rng.random((len(index), 2)), index=index, columns=columns)
+    for zero_point in (0, 1, 2):
+        zero_sigma = sigma.copy()
+        zero_sigma.loc[zero_point] = 0.0
+        kernel = SparseFKKernel(FKTableData(True, 1.65, ndata, xgrid, zero_sigma))
+        gv = rng.random((nmembers, 2, nx))
+        table = zero_sigma.to_numpy().reshape(ndata, nx, nx, 2)
+        expected = np.einsum("dab,ma,mb->dm", table[..., 0], gv[:, 0], gv[:, 0])
+        expected += np.einsum("dab,ma,mb->dm", table[..., 1], gv[:, 0], gv[:, 1])
+        assert list(kernel.data) == list(range(ndata))
+        assert_allclose(kernel.convolve(gv), expected)
+        assert_allclose(kernel.convolve(gv)[zero_point], 0.0)
+
+
 @pytest.mark.parametrize("pdf_name", [PDF, HESSIAN_PDF])
 def test_positivity(pdf_name):
     """Test that the PositivityResult is sensible and like test_predictions
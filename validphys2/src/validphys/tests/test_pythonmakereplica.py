@@ -11,7 +11,7 @@ from pandas.testing import assert_frame_equal, assert_series_equal
 import pytest
 
 from validphys.api import API
-from validphys.pseudodata import make_replica
+from validphys.pseudodata import make_replica, make_replicas_batch
 from validphys.tests.conftest import DATA
 from validphys.tests.test_covmats import CORR_DATA
 
@@ -102,3 +102,18 @@ def test_genrep_off(data_config, dataset_inputs, use_cuts):
     not_replica = API.make_replica(**config)
     central_data = np.concatenate([d.central_values for d in ld_cds])
     np.testing.assert_allclose(not_replica, central_data)
+
+
+@pytest.mark.parametrize("use_cuts", ["nocuts", "internal"])
+@pytest.mark.parametrize("dataset_inputs", [DATA, CORR_DATA, SINGLE_SYS_DATASETS])
+def test_batched_replicas_match(data_config, dataset_inputs, use_cuts):
+    """Check that generating the replicas in batches reproduces the replicas
+    generated one at a time with the same seeds."""
+    config = dict(data_config)
+    config["dataset_inputs"] = dataset_inputs
+    config["use_cuts"] = use_cuts
+    ld_cds = API.dataset_inputs_loaded_cd_with_cuts(**config)
+    seeds = [SEED + i for i in range(10)]
+    batch = make_replicas_batch(ld_cds, seeds, batch_size=3)
+    for seed, replica in zip(seeds, batch):
+        np.testing.assert_allclose(replica, make_replica(ld_cds, seed), rtol=1e-12)
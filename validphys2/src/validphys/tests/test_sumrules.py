@@ -4,6 +4,8 @@
 import pytest
 import pandas as pd
 from validphys.api import API
+from validphys.loader import Loader
+from validphys.sumrules import KNOWN_SUM_RULES, _integral, _sum_rules
 from validphys.tableloader import sane_load
 
 from .conftest import PDF, HESSIAN_PDF
@@ -25,6 +27,15 @@ def test_central_value(pdf_name):
     pd.testing.assert_series_equal(cv_sr.squeeze(), all_sr["mean"], atol=1e-5, check_names=False)
 
 
+def test_fixed_grid_matches_quad():
+    """Check that the fixed grid integration agrees with quad"""
+    lpdf = Loader().check_pdf(PDF).load_t0()
+    fixed = _sum_rules(KNOWN_SUM_RULES, lpdf, Q)
+    for name, rule in KNOWN_SUM_RULES.items():
+        adaptive = _integral(rule, lpdf.members[0], Q)
+        assert fixed[name][0] == pytest.approx(adaptive, abs=1e-5)
+
+
 def _regression_sum_rules(pdf_name):
     known_sumrules = API.sum_rules_table(pdf=pdf_name, Q=Q)
     central_val = API.central_sum_rules_table(pdf=pdf_name, Q=Q)
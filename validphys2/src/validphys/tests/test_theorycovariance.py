@@ -0,0 +1,148 @@
+"""
+test_theorycovariance.py
+
+Tests for the construction of the theory covariance matrix
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from validphys.theorycovariance.construction import (
+    covmat_cache_path,
+    covs_pt_prescrip,
+    fromfile_covmat,
+    load_covmat_file,
+    parse_covmat_file,
+    theory_covmat_custom,
+)
+
+# Number of points of each process
+PROCESS_SIZES = {"DIS NC": 5, "DIS CC": 3, "DY": 4, "JETS": 2}
+# Points of the covariance matrix file
+FILE_POINTS = [("DIS NC", "NMC", i) for i in range(4)] + [("DY", "CDFZRAP", i) for i in range(3)]
+
+
+def _reference_reorder(covs, covmap, matlength):
+    """Reorder the theory covmat from process to experiment ordering one element
+    at a time, as it was done before ``theory_covmat_custom`` used a permutation"""
+    mat = np.zeros((matlength, matlength), dtype=np.float32)
+    cov_by_exp = np.zeros((matlength, matlength), dtype=np.float32)
+    for locs in covs:
+        cov = covs[locs]
+        mat[locs[0] : (len(cov) + locs[0]), locs[1] : (len(cov.T) + locs[1])] = cov
+    for i in range(matlength):
+        for j in range(matlength):
+            cov_by_exp[covmap[i]][covmap[j]] = mat[i][j]
+    return cov_by_exp
+
+
+@pytest.mark.parametrize(
+    "ntheories,point_prescription,fivetheories,seventheories",
+    [
+        (3, "3 point", None, None),
+        (3, "3f point", None, None),
+        (3, "3r point", None, None),
+        (5, "5 point", "nobar", None),
+        (5, "5bar point", "bar", None),
+        (7, "7 point", None, "original"),
+        (7, "7 point", None, None),
+        (9, "9 point", None, None),
+    ],
+)
+def test_theory_covmat_custom_order(ntheories, point_prescription, fivetheories, seventheories):
+    """Check that the theory covmat reordered with a permutation is identical to the one
+    reordered element by element, for every point prescription"""
+    rng = np.random.default_rng(seed=ntheories)
+    ProcessInfo = namedtuple("ProcessInfo", ("theory",))
+    theory = {
+        name: [rng.random(size) for _ in range(ntheories)] for name, size in PROCESS_SIZES.items()
+    }
+    starting_points = dict(zip(PROCESS_SIZES, np.cumsum([0, *PROCESS_SIZES.values()])))
+    covs = covs_pt_prescrip(
+        ProcessInfo(theory),
+        starting_points,
+        list(range(ntheories)),
+        point_prescription,
+        fivetheories,
+        seventheories,
+    )
+    matlength = sum(PROCESS_SIZES.values())
+    covmap = dict(enumerate(rng.permutation(matlength)))
+    procs_index = pd.RangeIndex(matlength)
+
+    result = theory_covmat_custom(covs, covmap, procs_index)
+    reference = _reference_reorder(covs, covmap, matlength)
+    np.testing.assert_array_equal(result.values, reference)
+
+
+def _write_covmat(path, sep=","):
+    """Write a random covariance matrix with the points ``FILE_POINTS`` as the
+    ``user_covmat`` files are written"""
+    index = pd.MultiIndex.from_tuples(FILE_POINTS, names=["group", "dataset", "id"])
+    values = np.random.rand(len(index), len(index))
+    covmat = pd.DataFrame(values @ values.T, index=index, columns=index)
+    covmat.to_csv(path, sep=sep)
+    return covmat
+
+
+@pytest.mark.parametrize("sep", [",", "\t"])
+def test_parse_covmat_file(tmp_path, sep):
+    covmat_path = tmp_path / "covmat.csv"
+    covmat = _write_covmat(covmat_path, sep=sep)
+    values, index = parse_covmat_file(covmat_path)
+    np.testing.assert_array_equal(values, covmat.values)
+    pd.testing.assert_index_equal(index, covmat.index)
+
+
+def test_load_covmat_file(tmp_path):
+    covmat_path = tmp_path / "covmat.csv"
+    covmat = _write_covmat(covmat_path)
+    # The first call parses the file and writes the cache
+    values, index = load_covmat_file(covmat_path)
+    cache_path = covmat_cache_path(covmat_path)
+    assert cache_path.is_dir()
+    np.testing.assert_array_equal(values, covmat.values)
+    # The second call reads the memory mapped cache
+    values, index = load_covmat_file(covmat_path)
+    assert isinstance(values, np.memmap)
+    np.testing.assert_array_equal(values, covmat.values)
+    pd.testing.assert_index_equal(index, covmat.index)
+    # A corrupt cache is ignored and the file parsed again
+    (cache_path / "values.npy").write_bytes(b"not a numpy file")
+    values, index = load_covmat_file(covmat_path)
+    assert not isinstance(values, np.memmap)
+    np.testing.assert_array_equal(values, covmat.values)
+    pd.testing.assert_index_equal(index, covmat.index)
+
+
+def test_fromfile_covmat(tmp_path):
+    covmat_path = tmp_path / "covmat.csv"
+    covmat = _write_covmat(covmat_path)
+    # Some points of the datasets in the file are cut, and some datasets are not in the file
+    points = [
+        ("DIS NC", "NMC", 0),
+        ("DIS NC", "NMC", 2),
+        ("DIS NC", "NMC", 3),
+        ("DIS CC", "CHORUSNU", 0),
+        ("DIS CC", "CHORUSNU", 1),
+        ("DY", "CDFZRAP", 1),
+    ]
+    procs_index = pd.MultiIndex.from_tuples(points, names=["process", "dataset", "id"])
+    result = fromfile_covmat(covmat_path, None, procs_index)
+    pd.testing.assert_index_equal(result.index, procs_index)
+    pd.testing.assert_index_equal(result.columns, procs_index)
+    for point1 in points:
+        for point2 in points:
+            if point1 in FILE_POINTS and point2 in FILE_POINTS:
+                expected = covmat.loc[point1, point2]
+            else:
+                expected = 0.0
+            assert result.loc[point1, point2] == expected
+
+    # All points of the datasets in the file must be in the file
+    missing = points + [("DY", "CDFZRAP", 7)]
+    procs_index = pd.MultiIndex.from_tuples(missing, names=["process", "dataset", "id"])
+    with pytest.raises(ValueError):
+        fromfile_covmat(covmat_path, None, procs_index)
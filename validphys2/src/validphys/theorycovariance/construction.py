@@ -5,7 +5,13 @@ Tools for constructing theory covariance matrices and computing their chi2s.
 """
 from __future__ import generator_stop
 
+import hashlib
 import logging
+import os
+import pathlib
+import pickle
+import shutil
+import tempfile
 
 from collections import defaultdict, namedtuple
 import numpy as np
@@ -30,6 +36,10 @@ from validphys.theorycovariance.theorycovarianceutils import (
 
 log = logging.getLogger(__name__)
 
+#: Name of the folder, created next to covariance matrix files, where the
+#: binary cache written by :py:func:`load_covmat_file` is stored.
+COVMAT_CACHE_DIRNAME = ".covmatcache"
+
 theoryids_procs_central_values = collect(procs_central_values, ("theoryids",))
 
 theoryids_procs_central_values_no_table = collect(
@@ -357,12 +367,15 @@ def covs_pt_prescrip(
     start_proc = process_starting_points
     process_info = combine_by_type
     covmats = defaultdict(list)
+    # The shifts only depend on the process, so compute them once
+    deltas = {}
+    for name, theory in process_info.theory.items():
+        central, *others = theory
+        deltas[name] = [other - central for other in others]
     for name1 in process_info.theory:
         for name2 in process_info.theory:
-            central1, *others1 = process_info.theory[name1]
-            deltas1 = list((other - central1 for other in others1))
-            central2, *others2 = process_info.theory[name2]
-            deltas2 = list((other - central2 for other in others2))
+            deltas1 = deltas[name1]
+            deltas2 = deltas[name2]
             if l == 3:
                 if point_prescription == "3f point":
                     s = covmat_3fpt(name1, name2, deltas1, deltas2)
@@ -407,108 +420,127 @@ def theory_covmat_custom(covs_pt_prescrip, covmap, procs_index):
     for locs in covs_pt_prescrip:
         cov = covs_pt_prescrip[locs]
         mat[locs[0] : (len(cov) + locs[0]), locs[1] : (len(cov.T) + locs[1])] = cov
-    for i in range(matlength):
-        for j in range(matlength):
-            cov_by_exp[covmap[i]][covmap[j]] = mat[i][j]
+    # Position of each process ordered point in the experiment ordering
+    perm = np.array([covmap[i] for i in range(matlength)], dtype=int)
+    cov_by_exp[np.ix_(perm, perm)] = mat
     df = pd.DataFrame(cov_by_exp, index=procs_index, columns=procs_index)
     return df
 
 
+def parse_covmat_file(covmatpath):
+    """Parse a covariance matrix written with ``pandas.DataFrame.to_csv``,
+    with a (group, dataset, id) MultiIndex on both axes and either commas or
+    tabs as separators.
+
+    Returns
+    -------
+    values: np.ndarray
+        The matrix, in the order of the file.
+    index: pd.MultiIndex
+        The (group, dataset, id) index of the rows, which is also used for
+        the columns.
+    """
+    with open(covmatpath) as f:
+        lines = f.read().replace("\t", ",").splitlines()
+    # Three rows with the column index, possibly followed by one with the
+    # names of the row index levels
+    nheader = 3
+    if len(lines) > nheader and not any(lines[nheader].split(",")[3:]):
+        nheader += 1
+    rows = [line for line in lines[nheader:] if line]
+    labels = [row.split(",", 3)[:3] for row in rows]
+    groups, datasets, ids = zip(*labels) if labels else ((), (), ())
+    index = pd.MultiIndex.from_arrays(
+        [list(groups), list(datasets), np.array(ids, dtype=int)],
+        names=["group", "dataset", "id"],
+    )
+    values = np.loadtxt(rows, delimiter=",", usecols=range(3, 3 + len(rows)), ndmin=2)
+    if values.shape != (len(index), len(index)):
+        raise ValueError(f"The covariance matrix in {covmatpath} is not square")
+    return values, index
+
+
+def covmat_cache_path(covmatpath):
+    """Return the path of the folder where the binary cache of the covariance
+    matrix file ``covmatpath`` is stored. The name of the folder contains a
+    hash of the path, modification time and size of the file."""
+    covmatpath = pathlib.Path(covmatpath)
+    st = covmatpath.stat()
+    key = f"{covmatpath.resolve()}:{st.st_mtime_ns}:{st.st_size}".encode()
+    return (
+        covmatpath.parent
+        / COVMAT_CACHE_DIRNAME
+        / f"{covmatpath.name}-{hashlib.sha1(key).hexdigest()}"
+    )
+
+
+def _write_covmat_cache(values, index, path):
+    """Store the output of :py:func:`parse_covmat_file` in the folder
+    ``path``, which is written atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix=".tmp-", dir=path.parent))
+    try:
+        np.save(tmp / "values.npy", values)
+        with open(tmp / "index.pkl", "wb") as f:
+            pickle.dump(index, f)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # Another process got there first.
+            if not path.is_dir():
+                raise
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def load_covmat_file(covmatpath):
+    """Like :py:func:`parse_covmat_file`, but reading the result from a
+    binary cache (see :py:func:`covmat_cache_path`) if it exists, and
+    otherwise writing it. The values are memory mapped from the cache."""
+    cache_path = covmat_cache_path(covmatpath)
+    if cache_path.is_dir():
+        try:
+            with open(cache_path / "index.pkl", "rb") as f:
+                index = pickle.load(f)
+            values = np.load(cache_path / "values.npy", mmap_mode="r")
+            return values, index
+        except Exception as e:
+            log.warning(f"Could not read covmat cache at {cache_path}: {e}")
+    values, index = parse_covmat_file(covmatpath)
+    try:
+        _write_covmat_cache(values, index, cache_path)
+    except OSError as e:
+        log.debug(f"Could not write covmat cache at {cache_path}: {e}")
+    return values, index
+
+
 @table
 def fromfile_covmat(covmatpath, procs_data, procs_index):
     """Reads a general theory covariance matrix from file. Then
     1: Applies cuts to match experiment covariance matrix
     2: Expands dimensions to match experiment covariance matrix
-       by filling additional entries with 0."""
-    # Load covmat as pandas DataFrame
-    filecovmat = pd.read_csv(
-        covmatpath, index_col=[0, 1, 2], header=[0, 1, 2], sep="\t|,", engine="python"
-    )
-    # Remove string in column id
-    filecovmat.columns = filecovmat.index
-    # Reordering covmat to match exp order in runcard
-    # Datasets in exp covmat
-    dslist = []
-    for group in procs_data:
-        for ds in group.datasets:
-            dslist.append(ds.name)
-    # Datasets in filecovmat in exp covmat order
-    shortlist = []
-    for ds in dslist:
-        if ds in filecovmat.index.get_level_values(level="dataset"):
-            shortlist.append(ds)
-    filecovmat = filecovmat.reindex(shortlist, level="dataset")
-    filecovmat = filecovmat.reindex(shortlist, level="dataset", axis=1)
-    # ------------- #
-    # 1: Apply cuts #
-    # ------------- #
-    # Loading cuts to apply to covariance matrix
-    indextuples = []
-    for group in procs_data:
-        for ds in group.datasets:
-            # Load cuts for each dataset in the covmat
-            if ds.name in filecovmat.index.get_level_values(1):
-                cuts = ds.cuts
-                # Creating new index for post cuts
-                lcuts = cuts.load()
-                if lcuts is not None:
-                    for keeploc in lcuts:
-                        indextuples.append((group.name, ds.name, keeploc))
-                # If loaded cuts are None, keep all index points for that dataset
-                else:
-                    for ind in filecovmat.index():
-                        if ind[1] == ds:
-                            indextuples.append(ind)
-    newindex = pd.MultiIndex.from_tuples(
-        indextuples, names=["group", "dataset", "index"], sortorder=0
-    )
-    # Reindex covmat with the new cut index
-    cut_df = filecovmat.reindex(newindex).T
-    cut_df = cut_df.reindex(newindex).T
-    # Elements where cuts are applied will become NaN - remove these rows and columns
-    cut_df = cut_df.dropna(0).dropna(1)
-    # -------------------- #
-    # 2: Expand dimensions #
-    # -------------------- #
-    # First make empty df of exp covmat dimensions
-    empty_df = pd.DataFrame(0, index=procs_index, columns=procs_index)
-    covmats = []
-    # Make a piece of the covmat for each combination of two datasetes
-    for ds1 in dslist:
-        for ds2 in dslist:
-            if (ds1 in shortlist) and (ds2 in shortlist):
-                # If both datasets in the fromfile covmat, use the piece of the fromfile covmat
-                covmat = (
-                    cut_df.xs(ds1, level=1, drop_level=False)
-                    .T.xs(ds2, level=1, drop_level=False)
-                    .T
-                )
-            else:
-                # Otherwise use a covmat of 0s
-                covmat = (
-                    empty_df.xs(ds1, level=1, drop_level=False)
-                    .T.xs(ds2, level=1, drop_level=False)
-                    .T
-                )
-            covmats.append(covmat)
-    chunks = []
-    # Arrange into chunks, each chunk is a list of pieces of covmat which are associated with
-    # one dataset in particular
-    for x in range(0, len(covmats), len(dslist)):
-        chunk = covmats[x : x + len(dslist)]
-        chunks.append(chunk)
-    strips = []
-    # Concatenate each chunk into a strip of the covariance matrix
-    for chunk in chunks:
-        strip = pd.concat(chunk, axis=1)
-        strips.append(strip.T)
-    # strips.reverse()
-    # Concatenate the strips to make the full matrix
-    full_df = pd.concat(strips, axis=1)
-    # Reindex to align with experiment covmat index
-    full_df = full_df.reindex(procs_index)
-    full_df = full_df.reindex(procs_index, axis=1)
-    return full_df
+       by filling additional entries with 0.
+
+    The points of the datasets present in the file are matched to the rows of
+    the file by their (group, dataset, id) label, and the corresponding
+    entries are scattered into a matrix of zeros indexed by ``procs_index``.
+    """
+    values, fileindex = load_covmat_file(covmatpath)
+    filedatasets = set(fileindex.get_level_values("dataset"))
+    # Points of procs_index belonging to datasets in the file. If the dataset
+    # is in the file, all the points surviving the cuts must be there too.
+    target = np.flatnonzero(procs_index.get_level_values(1).isin(filedatasets))
+    source = fileindex.get_indexer(procs_index[target])
+    if (source < 0).any():
+        missing = list(procs_index[target][source < 0])
+        raise ValueError(
+            f"The covariance matrix in {covmatpath} does not contain the points {missing}"
+        )
+    full = np.zeros((len(procs_index), len(procs_index)))
+    full[np.ix_(target, target)] = values[np.ix_(source, source)]
+    return pd.DataFrame(full, index=procs_index, columns=procs_index)
 
 
 @table